@@ -0,0 +1,428 @@
+import re
+import os
+import json
+import hashlib
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse  # type: ignore
+    from re import _constants as sre_constants  # type: ignore
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse  # type: ignore
+    import sre_constants  # type: ignore
+
+# ----------------------------
+# Pattern packs
+#
+# A pack is a YAML or JSON file shaped like the built-in tables:
+#
+#   name: relationship-v2
+#   patterns:
+#     HARM_LANGUAGE:
+#       TOKEN: ['\bhurt\b', ...]
+#       PHRASE: ['\bi was\b.*\bscared\b', ...]
+#   sequences:
+#     - [HARM_LANGUAGE, PROTECTOR_CLAIM]
+#
+# Several packs can be combined; their labels/tiers/sequences are merged in
+# the order given.
+# ----------------------------
+
+TIERS = ("PHRASE", "TOKEN")
+FLAGS = re.IGNORECASE
+
+# Bump when the artifact layout or the compile step changes.
+ARTIFACT_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PATTERN_SCAN_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pattern_scan"),
+)
+
+Patterns = Dict[str, Dict[str, List[str]]]
+
+
+def _lazy_import_yaml():
+    try:
+        import yaml  # type: ignore
+    except ImportError as exc:
+        raise SystemExit(
+            "The 'PyYAML' package is required to load YAML pattern packs.\n"
+            "Run 'pip install pyyaml' or use a JSON pack."
+        ) from exc
+    return yaml
+
+
+def parse_pack(text: str, path: str) -> dict:
+    if path.endswith((".yaml", ".yml")):
+        data = _lazy_import_yaml().safe_load(text)
+    else:
+        data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("patterns"), dict):
+        raise ValueError(f"{path}: a pattern pack needs a 'patterns' mapping")
+
+    patterns: Patterns = {}
+    for label, tiers in data["patterns"].items():
+        if not isinstance(tiers, dict):
+            raise ValueError(f"{path}: {label} must map tiers to expression lists")
+        unknown = set(tiers) - set(TIERS)
+        if unknown:
+            raise ValueError(f"{path}: {label} has unknown tiers {sorted(unknown)}")
+        patterns[str(label)] = {
+            tier: [str(exp) for exp in tiers.get(tier) or []] for tier in TIERS
+        }
+
+    sequences = [tuple(pair) for pair in data.get("sequences") or []]
+    for pair in sequences:
+        if len(pair) != 2:
+            raise ValueError(f"{path}: sequence {list(pair)} must be a pair")
+
+    return {
+        "name": str(data.get("name") or os.path.splitext(os.path.basename(path))[0]),
+        "patterns": patterns,
+        "sequences": sequences,
+    }
+
+
+def merge_packs(packs: Sequence[dict]) -> dict:
+    patterns: Patterns = {}
+    sequences: List[Tuple[str, str]] = []
+    for pack in packs:
+        for label, tiers in pack["patterns"].items():
+            merged = patterns.setdefault(label, {tier: [] for tier in TIERS})
+            for tier in TIERS:
+                merged[tier].extend(
+                    exp for exp in tiers.get(tier, []) if exp not in merged[tier]
+                )
+        for pair in pack["sequences"]:
+            if tuple(pair) not in sequences:
+                sequences.append(tuple(pair))
+    return {
+        "name": "+".join(pack["name"] for pack in packs),
+        "patterns": patterns,
+        "sequences": sequences,
+    }
+
+
+# ----------------------------
+# Compiled matcher
+# ----------------------------
+
+
+def _combine(expressions: List[str]) -> List[str]:
+    """
+    Fold a tier into a single alternation when that is equivalent to trying
+    each expression in turn (no backreferences / inline global flags).
+    """
+    if len(expressions) < 2:
+        return list(expressions)
+    combined = "|".join(f"(?:{exp})" for exp in expressions)
+    try:
+        compiled = re.compile(combined, FLAGS)
+    except re.error:
+        return list(expressions)
+    if compiled.groups and re.search(r"\\[1-9]|\(\?P=", combined):
+        return list(expressions)
+    return [combined]
+
+
+def build_artifact(pack: dict, pack_hash: str) -> dict:
+    """Compile-check a pack and fold every label/tier into its matcher form."""
+    for label, tiers in pack["patterns"].items():
+        for tier in TIERS:
+            for exp in tiers.get(tier, []):
+                try:
+                    re.compile(exp, FLAGS)
+                except re.error as exc:
+                    raise ValueError(f"{label} {tier} {exp!r}: {exc}") from exc
+    labels = set(pack["patterns"])
+    for start, end in pack["sequences"]:
+        if start not in labels or end not in labels:
+            raise ValueError(f"sequence {start} -> {end} references an unknown label")
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "pack_hash": pack_hash,
+        "name": pack["name"],
+        "sequences": [list(pair) for pair in pack["sequences"]],
+        "matchers": {
+            label: {tier: _combine(tiers.get(tier, [])) for tier in TIERS}
+            for label, tiers in sorted(pack["patterns"].items())
+        },
+    }
+
+
+class PatternMatcher:
+    """
+    detect_hits() over a compiled pack: at most one search per label and tier
+    in the common case, PHRASE checked before TOKEN.
+    """
+
+    def __init__(self, artifact: dict):
+        self.name = artifact["name"]
+        self.pack_hash = artifact["pack_hash"]
+        self.artifact = artifact
+        self.labels: List[str] = sorted(artifact["matchers"])
+        self.sequences: List[Tuple[str, str]] = [
+            (start, end) for start, end in artifact["sequences"]
+        ]
+        self._compiled = [
+            (
+                label,
+                [re.compile(exp, FLAGS) for exp in tiers["PHRASE"]],
+                [re.compile(exp, FLAGS) for exp in tiers["TOKEN"]],
+            )
+            for label, tiers in sorted(artifact["matchers"].items())
+        ]
+
+    @classmethod
+    def from_patterns(
+        cls, patterns: Patterns, sequences: List[Tuple[str, str]], name: str = "builtin"
+    ) -> "PatternMatcher":
+        pack = {"name": name, "patterns": patterns, "sequences": sequences}
+        return cls(build_artifact(pack, pack_hash=_hash_pack(pack)))
+
+    def detect(self, text: str) -> Tuple[List[str], Dict[str, str]]:
+        label_strength: Dict[str, str] = {}
+        for label, phrases, tokens in self._compiled:
+            if any(exp.search(text) for exp in phrases):
+                label_strength[label] = "PHRASE"
+            elif any(exp.search(text) for exp in tokens):
+                label_strength[label] = "TOKEN"
+        return list(label_strength), label_strength
+
+    def __reduce__(self):
+        # Ship the artifact to worker processes, not the compiled objects.
+        return (PatternMatcher, (self.artifact,))
+
+
+def _hash_pack(pack: dict) -> str:
+    payload = json.dumps(
+        [ARTIFACT_FORMAT, pack["patterns"], [list(p) for p in pack["sequences"]]],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pack_files_hash(paths: Sequence[str]) -> str:
+    digest = hashlib.sha256(str(ARTIFACT_FORMAT).encode("ascii"))
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def read_packs(paths: Sequence[str]) -> dict:
+    packs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            packs.append(parse_pack(f.read(), path))
+    return merge_packs(packs)
+
+
+def load_matcher(paths: Sequence[str], cache_dir: Optional[str] = None) -> PatternMatcher:
+    """
+    Build a matcher for the given pack files, reusing the on-disk artifact
+    cached under their content hash when one exists.
+    """
+    pack_hash = pack_files_hash(paths)
+    artifact_path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{pack_hash}.json")
+
+    try:
+        with open(artifact_path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+        if artifact.get("format") == ARTIFACT_FORMAT:
+            return PatternMatcher(artifact)
+    except (OSError, ValueError):
+        pass
+
+    artifact = build_artifact(read_packs(paths), pack_hash)
+    _write_atomic(artifact_path, artifact)
+    return PatternMatcher(artifact)
+
+
+def _write_atomic(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+# ----------------------------
+# Validation
+# ----------------------------
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+_POSSESSIVE = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+_UNBOUNDED = sre_constants.MAXREPEAT
+
+
+def _is_unbounded_repeat(op, av) -> bool:
+    return op in _REPEATS and av[1] == _UNBOUNDED
+
+
+def _children(op, av):
+    if op in _REPEATS or op == _POSSESSIVE:
+        yield av[2]
+    elif op == sre_constants.SUBPATTERN:
+        yield av[-1]
+    elif op == sre_constants.BRANCH:
+        yield from av[1]
+    elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        yield av[1]
+    elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+        yield av
+
+
+def _walk(parsed):
+    for op, av in parsed:
+        yield op, av
+        for child in _children(op, av):
+            yield from _walk(child)
+
+
+def _contains_unbounded(parsed) -> bool:
+    return any(_is_unbounded_repeat(op, av) for op, av in _walk(parsed))
+
+
+def _is_wildcard(parsed) -> bool:
+    """True for single-item bodies like '.', '\\w', '\\s' or a negated set."""
+    if len(parsed) != 1:
+        return False
+    op, av = parsed[0]
+    if op == sre_constants.ANY:
+        return True
+    if op == sre_constants.IN:
+        return any(
+            item_op in (sre_constants.CATEGORY, sre_constants.NEGATE)
+            for item_op, _ in av
+        )
+    return False
+
+
+def backtracking_risks(expression: str) -> List[str]:
+    """
+    Static checks for the usual catastrophic-backtracking shapes:
+    nested unbounded quantifiers, alternation under an unbounded quantifier,
+    and three or more unbounded wildcards in one expression.
+    """
+    risks = []
+    parsed = sre_parse.parse(expression, FLAGS)
+    wildcards = 0
+    for op, av in _walk(parsed):
+        if not _is_unbounded_repeat(op, av):
+            continue
+        body = av[2]
+        if _contains_unbounded(body):
+            risks.append("nested unbounded quantifier (exponential backtracking)")
+        elif any(child_op == sre_constants.BRANCH for child_op, _ in _walk(body)):
+            risks.append("alternation inside unbounded quantifier")
+        if _is_wildcard(body):
+            wildcards += 1
+    if wildcards >= 3:
+        risks.append(f"{wildcards} unbounded wildcards (polynomial backtracking)")
+    return sorted(set(risks))
+
+
+def _sample(parsed) -> str:
+    """Build one short string the parsed expression should match."""
+    out = []
+    for op, av in parsed:
+        if op == sre_constants.LITERAL:
+            out.append(chr(av))
+        elif op == sre_constants.NOT_LITERAL:
+            out.append("x" if chr(av) != "x" else "y")
+        elif op == sre_constants.ANY:
+            out.append(" ")
+        elif op == sre_constants.IN:
+            out.append(_sample_in(av))
+        elif op == sre_constants.BRANCH:
+            out.append(_sample(av[1][0]))
+        elif op == sre_constants.SUBPATTERN:
+            out.append(_sample(av[-1]))
+        elif op in _REPEATS or op == _POSSESSIVE:
+            out.append(_sample(av[2]) * max(av[0], 1))
+    return "".join(out)
+
+
+def _sample_in(items) -> str:
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            return "x"
+        if op == sre_constants.LITERAL:
+            return chr(av)
+        if op == sre_constants.RANGE:
+            return chr(av[0])
+        if op == sre_constants.CATEGORY:
+            name = str(av).lower()
+            if "digit" in name:
+                return "0"
+            if "space" in name:
+                return " "
+            return "a"
+    return "x"
+
+
+def validate_pack(pack: dict) -> List[Tuple[str, str]]:
+    """
+    Return (severity, message) findings for a pack.
+
+    ERROR: expressions that do not compile, sequences naming unknown labels,
+    and expressions with catastrophic-backtracking shapes.
+    WARN: the same expression listed twice, and expressions whose sample
+    match also triggers a different label (overlapping labels).
+    """
+    findings: List[Tuple[str, str]] = []
+    compiled: List[Tuple[str, str, str, re.Pattern]] = []
+    seen: Dict[str, Tuple[str, str]] = {}
+
+    for label, tiers in sorted(pack["patterns"].items()):
+        for tier in TIERS:
+            for exp in tiers.get(tier, []):
+                where = f"{label} {tier} {exp!r}"
+                try:
+                    regex = re.compile(exp, FLAGS)
+                except re.error as exc:
+                    findings.append(("ERROR", f"{where}: does not compile ({exc})"))
+                    continue
+                for risk in backtracking_risks(exp):
+                    findings.append(("ERROR", f"{where}: {risk}"))
+                key = exp.lower()
+                if key in seen:
+                    first = seen[key]
+                    findings.append(
+                        ("WARN", f"{where}: duplicate of {first[0]} {first[1]}")
+                    )
+                else:
+                    seen[key] = (label, tier)
+                compiled.append((label, tier, exp, regex))
+
+    for label, tier, exp, regex in compiled:
+        sample = _sample(sre_parse.parse(exp, FLAGS))
+        if not sample.strip() or not regex.search(sample):
+            continue
+        for other_label, other_tier, other_exp, other in compiled:
+            if other_label != label and other.search(sample):
+                findings.append(
+                    (
+                        "WARN",
+                        f"{label} {tier} {exp!r} overlaps {other_label} "
+                        f"{other_tier} {other_exp!r} (both match {sample!r})",
+                    )
+                )
+
+    labels = set(pack["patterns"])
+    for start, end in pack["sequences"]:
+        for name in (start, end):
+            if name not in labels:
+                findings.append(
+                    ("ERROR", f"sequence {start} -> {end}: unknown label {name}")
+                )
+    return findings
@@ -1,9 +1,22 @@
 import re
 import os
 import csv
+import sys
+import json
+import glob
+import time
+import codecs
+import socket
+import threading
+import fnmatch
+import argparse
 import hashlib
-from collections import defaultdict, Counter
-from typing import List, Dict, Tuple
+from collections import defaultdict, deque, Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pattern_packs import PatternMatcher, load_matcher, read_packs, validate_pack
 
 # ----------------------------
 # CONFIG
@@ -12,10 +25,9 @@ from typing import List, Dict, Tuple
 INPUT_FILE = "chat_log.txt"
 OUT_DIR = "output"
 
-EVENTS_CSV = os.path.join(OUT_DIR, "events.csv")
-SEQUENCES_CSV = os.path.join(OUT_DIR, "sequences.csv")
-SUMMARY_TXT = os.path.join(OUT_DIR, "pattern_summary.txt")
-CONTEXT_SUMMARY_CSV = os.path.join(OUT_DIR, "context_summary.csv")
+ROW_GROUP_SIZE = 64_000  # parquet rows buffered before each row-group flush
+NORMALIZE_BATCH = 1024  # blocks normalized/fingerprinted per bulk pass
+FOLLOW_MAX_BUFFER = 1 << 20  # chars --follow holds while waiting for a blank line
 
 # Anchors like: "Iowa 2017" / "Iowa, 2017" / "Iowa — 2017"
 ANCHOR_RE = re.compile(
@@ -141,50 +153,129 @@ SEQUENCES: List[Tuple[str, str]] = [
 # ----------------------------
 
 
-def ensure_outdir():
-    os.makedirs(OUT_DIR, exist_ok=True)
+NORMALIZE_TABLE = str.maketrans({"—": "-", "’": "'", "“": '"', "”": '"'})
+
+# Separator used to lower()/translate() a whole batch as one string; it is not
+# whitespace, is untouched by both calls and cannot occur inside a block that
+# normalize_many() accepts for the joined path.
+_BATCH_SEP = "\x00"
 
 
 def normalize(text: str) -> str:
-    t = text.lower()
-    t = t.replace("—", "-").replace("’", "'").replace("“", '"').replace("”", '"')
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
+    return " ".join(text.lower().translate(NORMALIZE_TABLE).split())
 
 
-def fingerprint(text_norm: str) -> str:
+def normalize_many(texts: List[str]) -> List[str]:
+    """
+    normalize() over a batch: one lower() and one translate() call for the
+    whole batch, then per-block whitespace collapsing.
+    """
+    if not texts:
+        return []
+    if any(_BATCH_SEP in t for t in texts):
+        return [normalize(t) for t in texts]
+    joined = _BATCH_SEP.join(texts).lower().translate(NORMALIZE_TABLE)
+    return [" ".join(t.split()) for t in joined.split(_BATCH_SEP)]
+
+
+def _fingerprint_sha256(text_norm: str) -> str:
     return hashlib.sha256(text_norm.encode("utf-8")).hexdigest()[:16]
 
 
+def _fingerprint_blake2b(text_norm: str) -> str:
+    return hashlib.blake2b(text_norm.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _fingerprint_xxhash(text_norm: str) -> str:
+    try:
+        import xxhash  # type: ignore
+    except ImportError as exc:
+        raise SystemExit(
+            "The 'xxhash' package is required for --fingerprint xxhash.\n"
+            "Run 'pip install xxhash' or use --fingerprint blake2b."
+        ) from exc
+    return xxhash.xxh3_64_hexdigest(text_norm.encode("utf-8"))
+
+
+# All variants produce 16 hex chars. "sha256" is the compatibility mode: it
+# keeps the fingerprints of earlier runs so outputs can be joined across them.
+FINGERPRINTS: Dict[str, Callable[[str], str]] = {
+    "sha256": _fingerprint_sha256,
+    "blake2b": _fingerprint_blake2b,
+    "xxhash": _fingerprint_xxhash,
+}
+
+
+def get_fingerprinter(name: str) -> Callable[[str], str]:
+    if name == "xxhash":
+        _fingerprint_xxhash("")  # fail fast when xxhash is missing
+    return FINGERPRINTS[name]
+
+
+def fingerprint(text_norm: str) -> str:
+    return _fingerprint_sha256(text_norm)
+
+
+BLOCK_SPLIT_RE = re.compile(r"\n\s*\n+")
+# Old Mac line endings; replacing them keeps every byte offset intact.
+LONE_CR_RE = re.compile(r"\r(?!\n)")
+
+
 def chunk_into_entries(raw: str) -> List[str]:
     # Split on blank lines → paragraph-ish chunks
-    return [b.strip() for b in re.split(r"\n\s*\n+", raw) if b.strip()]
+    return [b.strip() for b in BLOCK_SPLIT_RE.split(raw) if b.strip()]
+
+
+def chunk_with_offsets(raw: str) -> Tuple[List[str], List[int]]:
+    """
+    chunk_into_entries() plus the UTF-8 byte offset of the first character of
+    each block in *raw*.
+    """
+    blocks: List[str] = []
+    offsets: List[int] = []
+    bounds = [m.span() for m in BLOCK_SPLIT_RE.finditer(raw)]
+    bounds.append((len(raw), len(raw)))
+
+    start = 0
+    char_pos = 0
+    byte_pos = 0
+    for sep_start, sep_end in bounds:
+        segment = raw[start:sep_start]
+        block = segment.strip()
+        if block:
+            block_start = start + len(segment) - len(segment.lstrip())
+            byte_pos += len(raw[char_pos:block_start].encode("utf-8"))
+            char_pos = block_start
+            blocks.append(block)
+            offsets.append(byte_pos)
+        start = sep_end
+    return blocks, offsets
 
 
 def strip_timestamp_prefix(line: str) -> str:
     return TIMESTAMP_PREFIX_RE.sub("", line).strip()
 
 
-def detect_hits(text: str) -> Tuple[List[str], Dict[str, str]]:
+_builtin_matcher: Optional[PatternMatcher] = None
+
+
+def builtin_matcher() -> PatternMatcher:
+    """Matcher for the PATTERNS/SEQUENCES tables above, compiled once."""
+    global _builtin_matcher
+    if _builtin_matcher is None:
+        _builtin_matcher = PatternMatcher.from_patterns(PATTERNS, SEQUENCES)
+    return _builtin_matcher
+
+
+def detect_hits(
+    text: str, matcher: Optional[PatternMatcher] = None
+) -> Tuple[List[str], Dict[str, str]]:
     """
     Returns:
       - labels hit (unique)
       - label_strength map: label -> 'PHRASE' or 'TOKEN' (PHRASE wins)
     """
-    label_strength: Dict[str, str] = {}
-    for label, tiers in PATTERNS.items():
-        phrase_hit = any(
-            re.search(exp, text, re.IGNORECASE) for exp in tiers.get("PHRASE", [])
-        )
-        token_hit = any(
-            re.search(exp, text, re.IGNORECASE) for exp in tiers.get("TOKEN", [])
-        )
-        if phrase_hit:
-            label_strength[label] = "PHRASE"
-        elif token_hit:
-            label_strength[label] = "TOKEN"
-    labels = sorted(label_strength.keys())
-    return labels, label_strength
+    return (matcher or builtin_matcher()).detect(text)
 
 
 def parse_speaker(block: str) -> Tuple[str, str]:
@@ -204,152 +295,781 @@ def context_key(place: str, year: str) -> str:
 
 
 # ----------------------------
-# Main
+# Streaming scan
 # ----------------------------
 
+EVENT_FIELDS = [
+    "entry_index",
+    "raw_block_index",
+    "context_place",
+    "context_year",
+    "context_key",
+    "speaker",
+    "fingerprint",
+    "patterns",
+    "strengths",
+    "text",
+]
 
-def main():
-    ensure_outdir()
+# Prepended to events/sequences in corpus mode.
+PROVENANCE_FIELDS = ["source_file", "byte_offset"]
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        raw = f.read()
+SEQUENCE_FIELDS = [
+    "sequence",
+    "context_key",
+    "from_entry",
+    "to_entry",
+    "from_fp",
+    "to_fp",
+    "from_excerpt",
+    "to_excerpt",
+]
 
-    blocks = chunk_into_entries(raw)
 
-    context_place = ""
-    context_year = ""
+def escape_text(text: str) -> str:
+    return text.replace("\n", "\\n")
 
-    seen = set()
 
-    events = []
-    pattern_counts = Counter()
-    strength_counts = Counter()
-    by_context = defaultdict(Counter)
+class Scanner:
+    """
+    Stateful block scanner: tracks the context anchor, the dedup index and
+    entry numbering across calls, so blocks can be fed in batches.
 
-    for raw_index, block in enumerate(blocks):
-        block = block.strip()
-        if not block:
-            continue
-
-        m = ANCHOR_RE.match(block)
-        if m:
-            context_place = m.group(1).strip()
-            context_year = m.group(2).strip()
-            continue
-
-        speaker, msg = parse_speaker(block)
-        msg = strip_timestamp_prefix(msg)
-
-        normalized = normalize(msg)
-        fp = fingerprint(normalized)
-        if fp in seen:
-            continue
-        seen.add(fp)
-
-        labels, label_strength = detect_hits(msg)
-        if not labels:
-            continue
-
-        pattern_counts.update(labels)
-        for label in labels:
-            strength_counts[label_strength[label]] += 1
-        ctx_key = context_key(context_place, context_year)
-        by_context[ctx_key].update(labels)
-
-        events.append(
-            {
-                "entry_index": len(events),
-                "raw_block_index": raw_index,
-                "context_place": context_place,
-                "context_year": context_year,
-                "context_key": ctx_key,
-                "speaker": speaker,
-                "fingerprint": fp,
-                "patterns": ";".join(labels),
-                "strengths": ";".join(
-                    [f"{label}:{label_strength[label]}" for label in labels]
-                ),
-                "text": msg.replace("\n", "\\n"),
-            }
-        )
+    Each batch is split into anchors and messages first; the messages are
+    then normalized and fingerprinted in bulk before the in-order pass that
+    dedups and detects hits.
+    """
+
+    def __init__(
+        self,
+        fingerprint_fn: Callable[[str], str] = fingerprint,
+        matcher: Optional[PatternMatcher] = None,
+        source_file: Optional[str] = None,
+        seen=None,
+        track_first_seen: bool = False,
+    ):
+        self.fingerprint_fn = fingerprint_fn
+        self.matcher = matcher or builtin_matcher()
+        self.source_file = source_file
+        self.context_place = ""
+        self.context_year = ""
+        self.seen = seen if seen is not None else set()
+        self.first_seen: Optional[List[str]] = [] if track_first_seen else None
+        self.entry_index = 0
+        self.raw_index = 0
+
+    def scan(self, blocks: List[str], offsets: Optional[List[int]] = None) -> List[dict]:
+        """
+        Scan one batch. With *offsets* (one per block) events also carry
+        source_file/byte_offset provenance.
+        """
+        items = []
+        messages = []
+        for i, block in enumerate(blocks):
+            offset = offsets[i] if offsets is not None else None
+            raw_index = self.raw_index
+            self.raw_index += 1
+            block = block.strip()
+            if not block:
+                continue
+
+            m = ANCHOR_RE.match(block)
+            if m:
+                items.append((raw_index, offset, m, "", ""))
+                continue
 
-    with open(EVENTS_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "entry_index",
-                "raw_block_index",
-                "context_place",
-                "context_year",
-                "context_key",
-                "speaker",
-                "fingerprint",
-                "patterns",
-                "strengths",
-                "text",
-            ],
+            speaker, msg = parse_speaker(block)
+            msg = strip_timestamp_prefix(msg)
+            items.append((raw_index, offset, None, speaker, msg))
+            messages.append(msg)
+
+        fingerprints = iter(
+            [self.fingerprint_fn(t) for t in normalize_many(messages)]
         )
-        writer.writeheader()
-        writer.writerows(events)
-
-    sequences = []
-    for i, event in enumerate(events):
-        hitset = set(event["patterns"].split(";"))
-        for start_label, end_label in SEQUENCES:
-            if start_label not in hitset:
+
+        events = []
+        for raw_index, offset, anchor, speaker, msg in items:
+            if anchor:
+                self.context_place = anchor.group(1).strip()
+                self.context_year = anchor.group(2).strip()
+                continue
+
+            fp = next(fingerprints)
+            if fp in self.seen:
+                continue
+            self.seen.add(fp)
+            if self.first_seen is not None:
+                self.first_seen.append(fp)
+
+            labels, label_strength = self.matcher.detect(msg)
+            if not labels:
                 continue
 
-            for j in range(i + 1, min(i + 1 + WINDOW, len(events))):
-                next_event = events[j]
-                if next_event["context_key"] != event["context_key"]:
+            event = {}
+            if offsets is not None:
+                event["source_file"] = self.source_file
+                event["byte_offset"] = offset
+            event.update(
+                {
+                    "entry_index": self.entry_index,
+                    "raw_block_index": raw_index,
+                    "context_place": self.context_place,
+                    "context_year": self.context_year,
+                    "context_key": context_key(self.context_place, self.context_year),
+                    "speaker": speaker,
+                    "fingerprint": fp,
+                    "labels": labels,
+                    "label_strength": label_strength,
+                    "text": msg,
+                }
+            )
+            events.append(event)
+            self.entry_index += 1
+        return events
+
+
+def iter_events(
+    blocks: Iterable[str],
+    fingerprint_fn: Callable[[str], str] = fingerprint,
+    batch_size: int = NORMALIZE_BATCH,
+    matcher: Optional[PatternMatcher] = None,
+) -> Iterator[dict]:
+    """
+    Yield one event per deduped block that hits at least one pattern.
+
+    Events carry the raw message under "text" and the hit map under
+    "label_strength"; sinks decide how to serialize them.
+    """
+    scanner = Scanner(fingerprint_fn, matcher)
+    blocks = iter(blocks)
+    while True:
+        batch = list(islice(blocks, batch_size))
+        if not batch:
+            return
+        yield from scanner.scan(batch)
+
+
+# ----------------------------
+# Corpus mode
+# ----------------------------
+
+
+def resolve_corpus(specs: List[str], pattern: str) -> List[str]:
+    """Expand directories (recursively, filtered by *pattern*) and globs."""
+    paths: List[str] = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            for root, dirs, files in os.walk(spec):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if fnmatch.fnmatch(name, pattern)
+                )
+        else:
+            paths.extend(p for p in sorted(glob.glob(spec, recursive=True)) if os.path.isfile(p))
+    return list(dict.fromkeys(paths))
+
+
+def scan_corpus_file(
+    path: str, fingerprint_name: str, matcher: PatternMatcher
+) -> Tuple[str, List[dict], List[str], Optional[str]]:
+    """
+    Worker: scan one file with its own anchor context.
+
+    Returns (path, events, first-seen fingerprints in file order, error).
+    Dedup inside the file happens here; the parent replays first_seen against
+    the corpus-wide index so the first occurrence across the corpus wins.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read().decode("utf-8")
+    except (OSError, UnicodeDecodeError) as exc:
+        return path, [], [], str(exc)
+
+    # Same line endings as the text-mode read in single-file mode.
+    blocks, offsets = chunk_with_offsets(LONE_CR_RE.sub("\n", raw))
+    blocks = [block.replace("\r\n", "\n") for block in blocks]
+    scanner = Scanner(
+        get_fingerprinter(fingerprint_name),
+        matcher,
+        source_file=path,
+        track_first_seen=True,
+    )
+    events = scanner.scan(blocks, offsets)
+    return path, events, scanner.first_seen, None
+
+
+def iter_corpus_events(
+    paths: List[str],
+    fingerprint_name: str,
+    matcher: PatternMatcher,
+    workers: int,
+    errors: List[Tuple[str, str]],
+) -> Iterator[dict]:
+    """
+    Scan *paths* concurrently and yield their events in path order, deduped
+    by fingerprint against one corpus-wide index and renumbered globally.
+    Unreadable files are recorded in *errors* and skipped.
+    """
+    seen = set()
+    entry_index = 0
+
+    def merge(results):
+        nonlocal entry_index
+        for path, events, first_seen, error in results:
+            if error:
+                errors.append((path, error))
+                continue
+            by_fp = {event["fingerprint"]: event for event in events}
+            for fp in first_seen:
+                if fp in seen:
                     continue
-                next_hitset = set(next_event["patterns"].split(";"))
-                if end_label in next_hitset:
-                    sequences.append(
-                        {
-                            "sequence": f"{start_label} -> {end_label}",
-                            "context_key": event["context_key"],
-                            "from_entry": event["entry_index"],
-                            "to_entry": next_event["entry_index"],
-                            "from_fp": event["fingerprint"],
-                            "to_fp": next_event["fingerprint"],
-                            "from_excerpt": event["text"][:180],
-                            "to_excerpt": next_event["text"][:180],
-                        }
-                    )
-                    break
-
-    with open(SEQUENCES_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "sequence",
-                "context_key",
-                "from_entry",
-                "to_entry",
-                "from_fp",
-                "to_fp",
-                "from_excerpt",
-                "to_excerpt",
-            ],
-        )
-        writer.writeheader()
-        writer.writerows(sequences)
-
-    all_patterns = sorted(PATTERNS.keys())
-    with open(CONTEXT_SUMMARY_CSV, "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["context_key"] + all_patterns
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for ctx_key, counter in sorted(
-            by_context.items(), key=lambda x: sum(x[1].values()), reverse=True
+                seen.add(fp)
+                event = by_fp.get(fp)
+                if event is None:
+                    continue
+                event["entry_index"] = entry_index
+                entry_index += 1
+                yield event
+
+    args = (paths, repeat(fingerprint_name), repeat(matcher))
+    if workers <= 1:
+        yield from merge(map(scan_corpus_file, *args))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from merge(pool.map(scan_corpus_file, *args, chunksize=1))
+
+
+# ----------------------------
+# Follow mode
+# ----------------------------
+
+
+class RecentSet:
+    """Set that forgets its oldest members past *maxlen* (bounded dedup index)."""
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
+
+    def add(self, item: str) -> None:
+        self._items[item] = None
+        if len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
+
+
+def _change_notifier(path: str):
+    """
+    Return an Event set whenever *path* changes, backed by watchdog (inotify
+    on Linux) when it is installed; None means the caller should poll.
+    """
+    try:
+        from watchdog.events import FileSystemEventHandler  # type: ignore
+        from watchdog.observers import Observer  # type: ignore
+    except ImportError:
+        return None, None
+
+    changed = threading.Event()
+    target = os.path.abspath(path)
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if os.path.abspath(event.src_path) == target:
+                changed.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), os.path.dirname(target) or ".", recursive=False)
+    observer.daemon = True
+    observer.start()
+    return changed, observer
+
+
+def follow_blocks(
+    path: str,
+    poll_interval: float,
+    from_end: bool = False,
+    max_buffer: int = FOLLOW_MAX_BUFFER,
+) -> Iterator[Tuple[List[str], List[int]]]:
+    """
+    Tail *path* and yield (blocks, byte offsets) each time new complete blocks
+    (text followed by a blank line) have been appended. A truncated file is
+    re-read from the start.
+
+    At most *max_buffer* characters of an unfinished block are held between
+    reads (and the file is read *max_buffer* bytes at a time): past that,
+    everything up to the last complete line is emitted as a block of its
+    own, so a log without blank lines does not accumulate in memory. Blocks
+    cut this way are at most about twice *max_buffer* long.
+    """
+    changed, observer = _change_notifier(path)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = os.path.getsize(path) if from_end else 0
+    buffer_offset = position  # file byte offset of buffer[0]
+
+    def take(end: int, consumed: int) -> Tuple[List[str], List[int]]:
+        """Blocks in buffer[:end]; drop buffer[:consumed]."""
+        nonlocal buffer, buffer_offset
+        blocks, offsets = chunk_with_offsets(buffer[:end])
+        blocks = [block.replace("\r\n", "\n") for block in blocks]
+        offsets = [buffer_offset + offset for offset in offsets]
+        buffer_offset += len(buffer[:consumed].encode("utf-8"))
+        buffer = buffer[consumed:]
+        return blocks, offsets
+
+    try:
+        while True:
+            size = os.path.getsize(path)
+            if size < position:
+                print(f"{path} was truncated; re-reading from the start.", file=sys.stderr)
+                decoder.reset()
+                buffer, buffer_offset, position = "", 0, 0
+
+            if size > position:
+                with open(path, "rb") as f:
+                    f.seek(position)
+                    data = f.read(min(size - position, max_buffer))
+                position += len(data)
+                buffer += decoder.decode(data)
+
+                last = None
+                for last in BLOCK_SPLIT_RE.finditer(buffer):
+                    pass
+                if last is not None:
+                    blocks, offsets = take(last.start(), last.end())
+                    if blocks:
+                        yield blocks, offsets
+                if len(buffer) > max_buffer:
+                    # No blank line in sight: flush up to the last full line
+                    # (or everything, if that line alone is over the limit).
+                    cut = buffer.rfind("\n") + 1
+                    if not cut or len(buffer) - cut > max_buffer:
+                        cut = len(buffer)
+                    blocks, offsets = take(cut, cut)
+                    if blocks:
+                        yield blocks, offsets
+                continue
+
+            if changed is None:
+                time.sleep(poll_interval)
+            else:
+                # The timeout doubles as a safety poll if a notification is missed.
+                changed.wait(timeout=max(poll_interval, 1.0))
+                changed.clear()
+    finally:
+        if observer is not None:
+            observer.stop()
+
+
+class NdjsonEmitter:
+    """
+    Write one JSON object per line to stdout, or to every client connected
+    to a listening socket ("host:port" or a unix socket path).
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address
+        self.clients: List[socket.socket] = []
+        self.lock = threading.Lock()
+        self.server: Optional[socket.socket] = None
+        if address:
+            self.server = self._listen(address)
+            threading.Thread(target=self._accept, daemon=True).start()
+
+    @staticmethod
+    def _listen(address: str) -> socket.socket:
+        host, sep, port = address.rpartition(":")
+        if sep and port.isdigit() and "/" not in address:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((host or "127.0.0.1", int(port)))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(address)
+        server.listen()
+        return server
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.clients.append(conn)
+
+    def emit(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self.server is None:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            return
+        data = line.encode("utf-8")
+        with self.lock:
+            for conn in list(self.clients):
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    self.clients.remove(conn)
+                    conn.close()
+
+    def close(self) -> None:
+        if self.server is None:
+            return
+        self.server.close()
+        with self.lock:
+            for conn in self.clients:
+                conn.close()
+        if "/" in self.address and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+def event_record(event: dict) -> dict:
+    record = {"type": "event"}
+    record.update(
+        {key: event[key] for key in PROVENANCE_FIELDS + EVENT_FIELDS if key in event}
+    )
+    record["patterns"] = event["labels"]
+    record["strengths"] = event["label_strength"]
+    return record
+
+
+def run_follow(args: argparse.Namespace, matcher: PatternMatcher) -> None:
+    """
+    Stream events and sequence matches for blocks appended to args.input.
+
+    Only the scanner's context/dedup state (dedup bounded by --dedup-window)
+    and the rolling sequence window are kept in memory.
+    """
+    scanner = Scanner(
+        get_fingerprinter(args.fingerprint),
+        matcher,
+        source_file=args.input,
+        seen=RecentSet(args.dedup_window),
+    )
+    window = SequenceWindow(matcher.sequences, WINDOW, ordered=False)
+    emitter = NdjsonEmitter(args.emit_socket)
+    where = args.emit_socket or "stdout"
+    print(f"Following {args.input} → NDJSON on {where}", file=sys.stderr)
+    try:
+        for blocks, offsets in follow_blocks(
+            args.input, args.poll_interval, from_end=args.from_end
         ):
-            row = {"context_key": ctx_key}
-            for pattern in all_patterns:
-                row[pattern] = counter.get(pattern, 0)
-            writer.writerow(row)
+            for event in scanner.scan(blocks, offsets):
+                emitter.emit(event_record(event))
+                for seq in window.push(event):
+                    emitter.emit({"type": "sequence", **seq})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emitter.close()
+
+
+class SequenceWindow:
+    """
+    Rolling matcher for SEQUENCES over a stream of events.
+
+    Each event stays pending until WINDOW later events have been seen (or all
+    of its motifs have closed), so only the last WINDOW events are held in
+    memory. Matches are released in (from_entry, SEQUENCES) order, which is
+    the same order a full pass over the event list would produce. With
+    ordered=False they are returned as soon as the closing event arrives.
+    """
+
+    def __init__(
+        self, sequences: List[Tuple[str, str]], window: int, ordered: bool = True
+    ):
+        self.sequences = sequences
+        self.window = window
+        self.ordered = ordered
+        self.pending: Deque[dict] = deque()
+
+    def push(self, event: dict) -> List[dict]:
+        hitset = set(event["labels"])
+        immediate = []
+        for item in self.pending:
+            if item["event"]["context_key"] != event["context_key"]:
+                continue
+            for pair in list(item["open"]):
+                if pair[1] in hitset:
+                    match = self._match(pair, item["event"], event)
+                    if self.ordered:
+                        item["found"][pair] = match
+                    else:
+                        immediate.append(match)
+                    item["open"].remove(pair)
+
+        released = immediate + self._release(event["entry_index"])
+
+        open_pairs = [pair for pair in self.sequences if pair[0] in hitset]
+        if open_pairs:
+            self.pending.append({"event": event, "open": open_pairs, "found": {}})
+        return released
+
+    def flush(self) -> List[dict]:
+        return self._release(None)
+
+    def _release(self, current_index: Optional[int]) -> List[dict]:
+        released = []
+        while self.pending:
+            head = self.pending[0]
+            expired = (
+                current_index is None
+                or current_index - head["event"]["entry_index"] >= self.window
+            )
+            if head["open"] and not expired:
+                break
+            self.pending.popleft()
+            released.extend(
+                head["found"][pair] for pair in self.sequences if pair in head["found"]
+            )
+        return released
+
+    @staticmethod
+    def _match(pair: Tuple[str, str], start: dict, end: dict) -> dict:
+        provenance = {}
+        if "source_file" in start:
+            provenance["source_file"] = start["source_file"]
+        return {
+            **provenance,
+            "sequence": f"{pair[0]} -> {pair[1]}",
+            "context_key": start["context_key"],
+            "from_entry": start["entry_index"],
+            "to_entry": end["entry_index"],
+            "from_fp": start["fingerprint"],
+            "to_fp": end["fingerprint"],
+            "from_excerpt": escape_text(start["text"])[:180],
+            "to_excerpt": escape_text(end["text"])[:180],
+        }
+
+
+# ----------------------------
+# Output sinks
+# ----------------------------
+
+
+class CsvSink:
+    """Row-at-a-time CSV output (the original events/sequences/context files)."""
+
+    def __init__(self, out_dir: str, provenance: bool = False):
+        event_fields = (PROVENANCE_FIELDS if provenance else []) + EVENT_FIELDS
+        sequence_fields = (["source_file"] if provenance else []) + SEQUENCE_FIELDS
+        self.event_fields = event_fields
+        self.events_path = os.path.join(out_dir, "events.csv")
+        self.sequences_path = os.path.join(out_dir, "sequences.csv")
+        self.context_path = os.path.join(out_dir, "context_summary.csv")
+
+        self._events_file = open(self.events_path, "w", newline="", encoding="utf-8")
+        self._events = csv.DictWriter(self._events_file, fieldnames=event_fields)
+        self._events.writeheader()
+
+        self._sequences_file = open(
+            self.sequences_path, "w", newline="", encoding="utf-8"
+        )
+        self._sequences = csv.DictWriter(
+            self._sequences_file, fieldnames=sequence_fields
+        )
+        self._sequences.writeheader()
+
+    def write_event(self, event: dict) -> None:
+        labels = event["labels"]
+        row = {key: event[key] for key in self.event_fields if key in event}
+        row["patterns"] = ";".join(labels)
+        row["strengths"] = ";".join(
+            [f"{label}:{event['label_strength'][label]}" for label in labels]
+        )
+        row["text"] = escape_text(event["text"])
+        self._events.writerow(row)
+
+    def write_sequence(self, seq: dict) -> None:
+        self._sequences.writerow(seq)
+
+    def write_context_summary(
+        self, by_context: Dict[str, Counter], all_patterns: List[str]
+    ) -> None:
+        with open(self.context_path, "w", newline="", encoding="utf-8") as f:
+            fieldnames = ["context_key"] + all_patterns
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for ctx_key, counter in sorted_contexts(by_context):
+                row = {"context_key": ctx_key}
+                for pattern in all_patterns:
+                    row[pattern] = counter.get(pattern, 0)
+                writer.writerow(row)
+
+    def close(self) -> None:
+        self._events_file.close()
+        self._sequences_file.close()
+
+
+def _lazy_import_pyarrow():
+    """Import pyarrow only when the parquet sink is selected."""
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as exc:
+        raise SystemExit(
+            "The 'pyarrow' package is required for --format parquet.\n"
+            "Run 'pip install pyarrow' and try again."
+        ) from exc
+    return pa, pq
+
+
+class _ParquetTable:
+    """Buffers rows column-wise and flushes one row group per batch."""
+
+    def __init__(self, pq, pa, path: str, schema, row_group_size: int):
+        self.pa = pa
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.columns: Dict[str, list] = {name: [] for name in schema.names}
+        self.writer = pq.ParquetWriter(path, schema, compression="zstd")
+
+    def append(self, row: dict) -> None:
+        for name, column in self.columns.items():
+            column.append(row[name])
+        if len(self.columns[self.schema.names[0]]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.columns[self.schema.names[0]]:
+            return
+        table = self.pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        for column in self.columns.values():
+            column.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
 
-    with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
+class ParquetSink:
+    """
+    Columnar output for notebooks and query engines.
+
+    events.parquet has one boolean column per label (plus "<LABEL>_phrase"
+    for PHRASE-strength hits) and keeps the unescaped message in its own
+    "text" column, so filters on labels/context never touch the text bytes.
+    Rows are flushed in row groups while the scan is still streaming.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        all_patterns: List[str],
+        row_group_size: int,
+        provenance: bool = False,
+    ):
+        pa, pq = _lazy_import_pyarrow()
+        self.pa = pa
+        self.pq = pq
+        self.all_patterns = all_patterns
+
+        self.events_path = os.path.join(out_dir, "events.parquet")
+        self.sequences_path = os.path.join(out_dir, "sequences.parquet")
+        self.context_path = os.path.join(out_dir, "context_summary.parquet")
+
+        source = [("source_file", pa.string())] if provenance else []
+        event_schema = pa.schema(
+            source
+            + ([("byte_offset", pa.int64())] if provenance else [])
+            + [
+                ("entry_index", pa.int64()),
+                ("raw_block_index", pa.int64()),
+                ("context_place", pa.string()),
+                ("context_year", pa.string()),
+                ("context_key", pa.string()),
+                ("speaker", pa.string()),
+                ("fingerprint", pa.string()),
+            ]
+            + [(label, pa.bool_()) for label in all_patterns]
+            + [(f"{label}_phrase", pa.bool_()) for label in all_patterns]
+            + [("text", pa.large_string())]
+        )
+        sequence_schema = pa.schema(
+            source
+            + [
+                ("sequence", pa.string()),
+                ("context_key", pa.string()),
+                ("from_entry", pa.int64()),
+                ("to_entry", pa.int64()),
+                ("from_fp", pa.string()),
+                ("to_fp", pa.string()),
+                ("from_excerpt", pa.string()),
+                ("to_excerpt", pa.string()),
+            ]
+        )
+        self._events = _ParquetTable(
+            pq, pa, self.events_path, event_schema, row_group_size
+        )
+        self._sequences = _ParquetTable(
+            pq, pa, self.sequences_path, sequence_schema, row_group_size
+        )
+
+    def write_event(self, event: dict) -> None:
+        row = {key: event[key] for key in PROVENANCE_FIELDS + EVENT_FIELDS if key in event}
+        strength = event["label_strength"]
+        for label in self.all_patterns:
+            row[label] = label in strength
+            row[f"{label}_phrase"] = strength.get(label) == "PHRASE"
+        self._events.append(row)
+
+    def write_sequence(self, seq: dict) -> None:
+        self._sequences.append(seq)
+
+    def write_context_summary(
+        self, by_context: Dict[str, Counter], all_patterns: List[str]
+    ) -> None:
+        ordered = sorted_contexts(by_context)
+        columns = {"context_key": [ctx_key for ctx_key, _ in ordered]}
+        for pattern in all_patterns:
+            columns[pattern] = [counter.get(pattern, 0) for _, counter in ordered]
+        schema = self.pa.schema(
+            [("context_key", self.pa.string())]
+            + [(pattern, self.pa.int64()) for pattern in all_patterns]
+        )
+        self.pq.write_table(
+            self.pa.Table.from_pydict(columns, schema=schema), self.context_path
+        )
+
+    def close(self) -> None:
+        self._events.close()
+        self._sequences.close()
+
+
+def sorted_contexts(by_context: Dict[str, Counter]) -> List[Tuple[str, Counter]]:
+    return sorted(by_context.items(), key=lambda x: sum(x[1].values()), reverse=True)
+
+
+def open_sink(
+    fmt: str,
+    out_dir: str,
+    row_group_size: int,
+    labels: List[str],
+    provenance: bool = False,
+):
+    if fmt == "parquet":
+        return ParquetSink(out_dir, labels, row_group_size, provenance)
+    return CsvSink(out_dir, provenance)
+
+
+def write_summary(
+    path: str,
+    pattern_counts: Counter,
+    strength_counts: Counter,
+    seq_counts: Counter,
+    sequences_name: str,
+    context_name: str,
+    extra_notes: Iterable[str] = (),
+) -> None:
+    with open(path, "w", encoding="utf-8") as f:
         f.write("PATTERN SUMMARY (deduped, paragraph-chunked)\n")
         f.write("==========================================\n")
         for key, value in pattern_counts.most_common():
@@ -362,7 +1082,6 @@ def main():
 
         f.write("\nSEQUENCE SUMMARY (same-context, windowed)\n")
         f.write("========================================\n")
-        seq_counts = Counter([seq["sequence"] for seq in sequences])
         for key, value in seq_counts.most_common():
             f.write(f"{key}: {value}\n")
 
@@ -370,14 +1089,231 @@ def main():
         f.write("-----\n")
         f.write("- Anchors: lines like 'Iowa 2017' / 'Iowa, 2017' / 'Iowa — 2017'\n")
         f.write(f"- Sequence lookahead window: {WINDOW} entries\n")
-        f.write("- sequences.csv only counts sequences within the same context anchor\n")
-        f.write("- context_summary.csv is pattern counts by context_key (place+year)\n")
+        f.write(
+            f"- {sequences_name} only counts sequences within the same context anchor\n"
+        )
+        f.write(
+            f"- {context_name} is pattern counts by context_key (place+year)\n"
+        )
+        for note in extra_notes:
+            f.write(f"- {note}\n")
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Scan a chat log for neutral language patterns and sequences."
+    )
+    parser.add_argument("--input", default=INPUT_FILE, help="Chat log to scan.")
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Tail --input and stream events/sequences as NDJSON as blocks arrive "
+        f"(text without a blank line is cut into blocks past {FOLLOW_MAX_BUFFER:,} chars).",
+    )
+    parser.add_argument(
+        "--from-end",
+        action="store_true",
+        help="With --follow, skip the existing content and only scan new blocks.",
+    )
+    parser.add_argument(
+        "--emit-socket",
+        default=None,
+        help="With --follow, serve NDJSON on this host:port or unix socket path "
+        "instead of stdout.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.2,
+        help="Seconds between size checks when watchdog/inotify is unavailable.",
+    )
+    parser.add_argument(
+        "--dedup-window",
+        type=int,
+        default=100_000,
+        help="With --follow, number of recent fingerprints kept for dedup.",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=[],
+        help="Directory or glob of chat logs to scan as one corpus instead of "
+        "--input (repeatable).",
+    )
+    parser.add_argument(
+        "--corpus-pattern",
+        default="*.txt",
+        help="Filename pattern used when a --corpus entry is a directory.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for --corpus.",
+    )
+    parser.add_argument("--out-dir", default=OUT_DIR, help="Output directory.")
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Output backend for events, sequences and context summary.",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=ROW_GROUP_SIZE,
+        help="Rows per Parquet row group (parquet format only).",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        choices=sorted(FINGERPRINTS),
+        default="sha256",
+        help="Dedup hash; sha256 keeps fingerprints compatible with earlier runs.",
+    )
+    parser.add_argument(
+        "--pack",
+        action="append",
+        default=[],
+        help="YAML/JSON pattern pack to use instead of the built-in tables "
+        "(repeat to merge several packs).",
+    )
+    parser.add_argument(
+        "--pack-cache",
+        default=None,
+        help="Directory for compiled pack artifacts (default: $PATTERN_SCAN_CACHE "
+        "or ~/.cache/pattern_scan).",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Report overlapping or backtracking-prone expressions in the selected "
+        "packs (or the built-in tables) and exit.",
+    )
+    return parser.parse_args()
+
+
+def run_validate(pack_paths: List[str]) -> int:
+    if pack_paths:
+        pack = read_packs(pack_paths)
+    else:
+        pack = {"name": "builtin", "patterns": PATTERNS, "sequences": SEQUENCES}
+
+    findings = validate_pack(pack)
+    for severity, message in findings:
+        print(f"{severity}: {message}")
+    errors = sum(1 for severity, _ in findings if severity == "ERROR")
+    print(f"{pack['name']}: {errors} error(s), {len(findings) - errors} warning(s)")
+    return 1 if errors else 0
+
+
+def main():
+    args = parse_args()
+    if args.validate:
+        raise SystemExit(run_validate(args.pack))
+
+    if args.pack:
+        try:
+            matcher = load_matcher(args.pack, args.pack_cache)
+        except ValueError as exc:
+            raise SystemExit(f"Invalid pattern pack: {exc}") from exc
+    else:
+        matcher = builtin_matcher()
+
+    if args.follow:
+        if args.corpus:
+            raise SystemExit("--follow tails a single --input file; drop --corpus.")
+        run_follow(args, matcher)
+        return
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    summary_txt = os.path.join(args.out_dir, "pattern_summary.txt")
+
+    corpus_errors: List[Tuple[str, str]] = []
+    extra_notes: List[str] = []
+    if args.corpus:
+        paths = resolve_corpus(args.corpus, args.corpus_pattern)
+        if not paths:
+            raise SystemExit(f"No files matched {args.corpus}")
+        events = iter_corpus_events(
+            paths, args.fingerprint, matcher, args.workers, corpus_errors
+        )
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            raw = f.read()
+        fingerprint_fn = get_fingerprinter(args.fingerprint)
+        events = iter_events(chunk_into_entries(raw), fingerprint_fn, matcher=matcher)
+
+    pattern_counts = Counter()
+    strength_counts = Counter()
+    seq_counts = Counter()
+    by_context = defaultdict(Counter)
+
+    sink = open_sink(
+        args.format,
+        args.out_dir,
+        args.row_group_size,
+        matcher.labels,
+        provenance=bool(args.corpus),
+    )
+    window = SequenceWindow(matcher.sequences, WINDOW)
+    source_file = None
+    try:
+        for event in events:
+            # Sequences never span files: close the window at each boundary.
+            if event.get("source_file") != source_file:
+                for seq in window.flush():
+                    seq_counts[seq["sequence"]] += 1
+                    sink.write_sequence(seq)
+                source_file = event.get("source_file")
+
+            labels = event["labels"]
+            pattern_counts.update(labels)
+            for label in labels:
+                strength_counts[event["label_strength"][label]] += 1
+            by_context[event["context_key"]].update(labels)
+
+            sink.write_event(event)
+            for seq in window.push(event):
+                seq_counts[seq["sequence"]] += 1
+                sink.write_sequence(seq)
+
+        for seq in window.flush():
+            seq_counts[seq["sequence"]] += 1
+            sink.write_sequence(seq)
+
+        sink.write_context_summary(by_context, matcher.labels)
+    finally:
+        sink.close()
+
+    if args.corpus:
+        extra_notes.append(
+            f"Corpus: {len(paths) - len(corpus_errors)} file(s) scanned, "
+            "deduped by fingerprint across the corpus (first occurrence wins)"
+        )
+        for path, error in corpus_errors:
+            extra_notes.append(f"Skipped {path}: {error}")
+            print(f"Skipped {path}: {error}")
+
+    write_summary(
+        summary_txt,
+        pattern_counts,
+        strength_counts,
+        seq_counts,
+        os.path.basename(sink.sequences_path),
+        os.path.basename(sink.context_path),
+        extra_notes,
+    )
 
     print("Analysis complete.")
-    print(f"- Events: {EVENTS_CSV}")
-    print(f"- Sequences: {SEQUENCES_CSV}")
-    print(f"- Context summary: {CONTEXT_SUMMARY_CSV}")
-    print(f"- Summary: {SUMMARY_TXT}")
+    print(f"- Events: {sink.events_path}")
+    print(f"- Sequences: {sink.sequences_path}")
+    print(f"- Context summary: {sink.context_path}")
+    print(f"- Summary: {summary_txt}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+"""Approximate nearest‑neighbour search for the density clustering path.
+
+``cluster_prompts.py`` uses this to estimate DBSCAN's *eps* and to build a
+sparse radius graph without exact O(n²) neighbour search. Backends, in the
+order ``"auto"`` tries them:
+
+* ``hnswlib`` – HNSW graph index (``pip install hnswlib``)
+* ``faiss``   – ``IndexHNSWFlat`` from ``faiss-cpu``
+* ``numpy``   – dependency‑free fallback: a small random‑projection forest;
+  neighbours are searched exactly within the leaves a point falls into.
+
+All backends return Euclidean distances, nearest first, with the query point
+itself included when it is part of the index (distance 0).
+"""
+
+from __future__ import annotations
+
+import importlib.util
+
+import numpy as np
+
+BACKENDS = ("hnswlib", "faiss", "numpy")
+
+
+def available_backend(preferred: str = "auto") -> str:
+    """Resolve ``"auto"`` to the best installed backend."""
+
+    if preferred != "auto":
+        if preferred != "numpy" and importlib.util.find_spec(preferred) is None:
+            raise SystemExit(
+                f"The '{preferred}' package is required for --ann {preferred} but not installed."
+            )
+        return preferred
+    for name in BACKENDS[:-1]:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return "numpy"
+
+
+class AnnIndex:
+    """k‑NN index over the rows of *matrix* (float32, Euclidean)."""
+
+    def __init__(self, matrix: np.ndarray, backend: str = "auto", *, seed: int = 42):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.backend = available_backend(backend)
+        self.seed = seed
+        n, dim = self.matrix.shape
+
+        if self.backend == "hnswlib":
+            import hnswlib  # type: ignore
+
+            self._index = hnswlib.Index(space="l2", dim=dim)
+            self._index.init_index(max_elements=n, ef_construction=200, M=16, random_seed=seed)
+            self._index.add_items(self.matrix, np.arange(n))
+        elif self.backend == "faiss":
+            import faiss  # type: ignore
+
+            self._index = faiss.IndexHNSWFlat(dim, 32)
+            self._index.hnsw.efConstruction = 200
+            self._index.add(self.matrix)
+        else:
+            self._build_forest()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(distances, indices)`` of the *k* nearest neighbours of the
+        indexed points *rows*; both arrays have shape ``(len(rows), k)``."""
+
+        k = min(k, len(self.matrix))
+        queries = self.matrix[rows]
+        if self.backend == "hnswlib":
+            self._index.set_ef(max(2 * k, 64))
+            indices, sq = self._index.knn_query(queries, k=k)
+            return np.sqrt(np.maximum(sq, 0)), indices.astype(np.int64)
+        if self.backend == "faiss":
+            self._index.hnsw.efSearch = max(2 * k, 64)
+            sq, indices = self._index.search(queries, k)
+            return np.sqrt(np.maximum(sq, 0)), indices.astype(np.int64)
+        return self._query_forest(np.asarray(rows), k)
+
+    # ------------------------------------------------------------------
+    # NumPy fallback
+    # ------------------------------------------------------------------
+
+    def _build_forest(self, n_trees: int = 8, leaf_size: int = 256) -> None:
+        """Random‑projection trees: split at the median along a random
+        direction until leaves hold at most *leaf_size* points."""
+
+        rng = np.random.default_rng(self.seed)
+        n, dim = self.matrix.shape
+        self._leaves: list[list[np.ndarray]] = []
+        for _ in range(n_trees):
+            leaves, stack = [], [np.arange(n)]
+            while stack:
+                members = stack.pop()
+                if len(members) <= leaf_size:
+                    leaves.append(members)
+                    continue
+                direction = rng.standard_normal(dim).astype(np.float32)
+                projected = self.matrix[members] @ direction
+                order = np.argsort(projected, kind="stable")
+                half = len(members) // 2
+                stack.extend((members[order[:half]], members[order[half:]]))
+            self._leaves.append(leaves)
+
+    def _query_forest(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        n = len(self.matrix)
+        # Position of every queried point in the output arrays (-1 = not queried).
+        slot = np.full(n, -1, dtype=np.int64)
+        slot[rows] = np.arange(len(rows))
+        best_d = np.full((len(rows), k), np.inf, dtype=np.float32)
+        best_i = np.full((len(rows), k), -1, dtype=np.int64)
+        sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+        for leaves in self._leaves:
+            for members in leaves:
+                queries = members[slot[members] >= 0]
+                if not len(queries):
+                    continue
+                # Exact squared distances inside the leaf.
+                sq = (
+                    sq_norms[queries, None]
+                    - 2 * self.matrix[queries] @ self.matrix[members].T
+                    + sq_norms[None, members]
+                )
+                out = slot[queries]
+                cand_d = np.concatenate([best_d[out], np.sqrt(np.maximum(sq, 0))], axis=1)
+                cand_i = np.concatenate([best_i[out], np.broadcast_to(members, sq.shape)], axis=1)
+                # A neighbour found by several trees must only count once.
+                by_index = np.argsort(cand_i, axis=1, kind="stable")
+                sorted_i = np.take_along_axis(cand_i, by_index, axis=1)
+                dup = np.zeros_like(sorted_i, dtype=bool)
+                dup[:, 1:] = (sorted_i[:, 1:] == sorted_i[:, :-1]) & (sorted_i[:, 1:] >= 0)
+                np.put_along_axis(cand_d, by_index, np.where(dup, np.inf, np.take_along_axis(cand_d, by_index, axis=1)), axis=1)
+
+                kk = min(k, cand_d.shape[1])
+                top = np.argpartition(cand_d, kk - 1, axis=1)[:, :kk]
+                top_d = np.take_along_axis(cand_d, top, axis=1)
+                order = np.argsort(top_d, axis=1)
+                best_d[out, :kk] = np.take_along_axis(top_d, order, axis=1)
+                best_i[out, :kk] = np.take_along_axis(np.take_along_axis(cand_i, top, axis=1), order, axis=1)
+        return best_d, best_i
+
+
+# ---------------------------------------------------------------------------
+# Density clustering helpers
+# ---------------------------------------------------------------------------
+
+
+def estimate_eps(index: AnnIndex, min_samples: int, *, sample: int = 5_000, percentile: float = 90) -> float:
+    """*percentile* of the ``min_samples``‑th neighbour distance on a sample."""
+
+    n = len(index.matrix)
+    rng = np.random.default_rng(index.seed)
+    rows = rng.choice(n, size=min(sample, n), replace=False) if sample and sample < n else np.arange(n)
+    distances, _ = index.query(rows, k=min_samples)
+    return float(np.percentile(distances[:, -1], percentile))
+
+
+def radius_graph(index: AnnIndex, eps: float | None, n_neighbors: int, *, chunk: int = 50_000):
+    """Symmetric sparse (CSR) distance graph linking every point to its ANN
+    neighbours within *eps* (all *n_neighbors* of them when *eps* is ``None``).
+
+    Absent entries mean "not a neighbour". Exact duplicates are stored with a
+    tiny positive distance rather than 0 so the edge is not dropped as an
+    implicit zero; self loops are left out (DBSCAN adds them itself).
+    """
+
+    from scipy import sparse  # type: ignore – ships with scikit‑learn
+
+    n = len(index.matrix)
+    rows_all, cols_all, data_all = [], [], []
+    for start in range(0, n, chunk):
+        rows = np.arange(start, min(start + chunk, n))
+        distances, indices = index.query(rows, k=n_neighbors)
+        keep = (indices >= 0) & (indices != rows[:, None])
+        if eps is not None:
+            keep &= distances <= eps
+        rows_all.append(np.repeat(rows, keep.sum(axis=1)))
+        cols_all.append(indices[keep])
+        data_all.append(np.maximum(distances[keep], np.finfo(np.float32).tiny))
+
+    graph = sparse.csr_matrix(
+        (np.concatenate(data_all), (np.concatenate(rows_all), np.concatenate(cols_all))),
+        shape=(n, n),
+    )
+    # k‑NN is not symmetric; keep an edge if either end found the other.
+    graph = graph.maximum(graph.T).tocsr()
+    graph.sort_indices()
+    return graph
+
+
+def connect_components(graph, distance: float):
+    """Chain the connected components of *graph* together with edges of
+    length *distance* (HDBSCAN refuses disconnected graphs). With *distance*
+    above every real edge the components only merge at the root."""
+
+    from scipy import sparse  # type: ignore
+    from scipy.sparse.csgraph import connected_components  # type: ignore
+
+    n_components, component = connected_components(graph, directed=False)
+    if n_components == 1:
+        return graph
+    first = np.unique(component, return_index=True)[1]
+    a, b = first[:-1], first[1:]
+    bridges = sparse.csr_matrix(
+        (np.full(2 * len(a), distance, dtype=graph.dtype), (np.r_[a, b], np.r_[b, a])),
+        shape=graph.shape,
+    )
+    graph = (graph + bridges).tocsr()
+    graph.sort_indices()
+    return graph
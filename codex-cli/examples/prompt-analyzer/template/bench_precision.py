@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Benchmark reduced‑precision / reduced‑dimension embedding matrices.
+
+Clusters the same embeddings under several storage types (``--embedding-dtype``)
+and reductions (``--reduce-dim`` / ``--reduce-method``) and compares each run
+with the full‑precision, full‑dimension baseline:
+
+* bytes stored per corpus (cache file size) and the size of the matrix the
+  clusterer works on
+* wall time of reduction + K‑Means
+* silhouette score (sampled, measured on the *full‑precision* vectors so runs
+  are comparable) and the adjusted Rand index against the baseline labels
+
+Vectors come from an existing embedding cache, so no API calls are made:
+
+    python bench_precision.py --csv prompts.csv --cache .cache/embeddings
+
+or, without a cache, from synthetic unit‑norm clusters:
+
+    python bench_precision.py --synthetic 50000 --dim 1536
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from embedding_cache import dequantize, open_cache, quantize, text_hash
+from reduction import reduce_rows
+
+CONFIGS = [
+    # (storage dtype, reduce method, n_components)
+    ("float32", None, 0),
+    ("float16", None, 0),
+    ("int8", None, 0),
+    ("float32", "pca", 128),
+    ("float32", "pca", 64),
+    ("float32", "random", 256),
+    ("float16", "pca", 128),
+    ("int8", "pca", 128),
+]
+
+
+def parse_cli() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--csv", type=Path, default=Path("prompts.csv"), help="Prompts to look up in the cache.")
+    parser.add_argument("--cache", type=Path, default=None, help="Existing embedding cache directory.")
+    parser.add_argument("--embedding-model", default="text-embedding-3-small")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of a cache.")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimensionality of synthetic vectors.")
+    parser.add_argument("--k", type=int, default=10, help="Clusters for K‑Means.")
+    parser.add_argument("--silhouette-sample", type=int, default=5_000)
+    return parser.parse_args()
+
+
+def load_vectors(args: argparse.Namespace) -> np.ndarray:
+    if args.synthetic:
+        from sklearn.datasets import make_blobs  # type: ignore – heavy, lazy import.
+
+        mat, _ = make_blobs(args.synthetic, n_features=args.dim, centers=args.k, cluster_std=4.0, random_state=0)
+        mat = mat.astype(np.float32)
+        return mat / np.linalg.norm(mat, axis=1, keepdims=True)
+
+    if args.cache is None:
+        raise SystemExit("Pass --cache with existing embeddings, or --synthetic N.")
+    import pandas as pd
+
+    prompts = pd.read_csv(args.csv)["prompt"].astype(str).unique()
+    cache = open_cache(args.cache, args.embedding_model)
+    rows = cache.lookup([text_hash(t) for t in prompts])
+    if (rows < 0).any():
+        print(f"Skipping {(rows < 0).sum()} prompt(s) that are not cached yet.")
+    return cache.take(rows[rows >= 0])
+
+
+def main() -> None:
+    args = parse_cli()
+    from sklearn.cluster import KMeans  # type: ignore – heavy, lazy import.
+    from sklearn.metrics import adjusted_rand_score, silhouette_score  # type: ignore
+
+    full = load_vectors(args)
+    n, dim = full.shape
+    print(f"{n} vectors × {dim} dimensions\n")
+
+    sample = min(args.silhouette_sample, n)
+    baseline = None
+    lines = [
+        "| storage | reduction | stored MB | matrix MB | time s | silhouette | ARI |",
+        "|---------|-----------|----------:|----------:|-------:|-----------:|----:|",
+    ]
+    for dtype, method, n_components in CONFIGS:
+        if method and n_components >= dim:
+            continue  # nothing to reduce
+        stored, scales = quantize(full, dtype)
+        stored_bytes = stored.nbytes + (scales.nbytes if scales is not None else 0)
+
+        start = time.perf_counter()
+        take = lambda r: dequantize(stored[r], None if scales is None else scales[r])  # noqa: E731
+        rows = np.arange(n)
+        if method:
+            matrix, _ = reduce_rows(take, rows, n_components, method)
+        else:
+            matrix = take(rows)
+        labels = KMeans(n_clusters=args.k, random_state=42, n_init="auto").fit_predict(matrix)
+        elapsed = time.perf_counter() - start
+
+        silhouette = silhouette_score(full, labels, sample_size=sample, random_state=42)
+        if baseline is None:
+            baseline = labels
+        ari = adjusted_rand_score(baseline, labels)
+
+        reduction = f"{method} → {matrix.shape[1]}" if method else "–"
+        lines.append(
+            f"| {dtype} | {reduction} | {stored_bytes / 2**20:.1f} | {matrix.nbytes / 2**20:.1f} "
+            f"| {elapsed:.2f} | {silhouette:.3f} | {ari:.3f} |"
+        )
+        print(lines[-1] if len(lines) > 3 else "\n".join(lines), flush=True)
+
+
+if __name__ == "__main__":
+    main()
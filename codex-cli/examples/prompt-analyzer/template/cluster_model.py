@@ -0,0 +1,226 @@
+"""Persisted cluster model for assigning new prompts without reclustering.
+
+``cluster_prompts.py --model-out FILE`` writes the artifact after a run and
+``cluster_prompts.py assign`` loads it. The artifact is a single ``.npz``:
+
+* ``centroids``      – one row per cluster, in the space the clusterer saw
+* ``radius``         – per cluster, 95th percentile of the members' distance
+  to their centroid (density methods flag points beyond it as noise)
+* ``scaler_mean`` / ``scaler_scale`` – standardisation applied before
+  DBSCAN / HDBSCAN (empty for K‑Means)
+* ``reducer_mean`` / ``reducer_components`` – dimensionality reduction
+  applied to the embeddings first (empty without ``--reduce-dim``)
+* ``meta``           – JSON: method, embedding model, cluster ids and their
+  names / descriptions, and the share of the training prompts that the
+  assignment rule flags (the drift baseline)
+
+Assignment is nearest centroid, computed blockwise with NumPy. K‑Means flags
+a prompt as *ambiguous* when its two nearest centroids are almost equally
+close (the same rule as the report); density methods flag it as *noise*
+when it lies outside the nearest cluster's radius.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from reduction import Reducer
+
+MODEL_FORMAT = 1
+# Ambiguous when distance to the nearest / second‑nearest centroid exceeds this.
+AMBIGUOUS_RATIO = 0.9
+RADIUS_PERCENTILE = 95
+
+
+@dataclass
+class Assignment:
+    """Result of :meth:`ClusterModel.assign`."""
+
+    labels: np.ndarray  # cluster id per prompt (-1 = noise)
+    distances: np.ndarray  # distance to the assigned centroid
+    flagged: np.ndarray  # ambiguous (K‑Means) or noise (density methods)
+
+    @property
+    def flagged_rate(self) -> float:
+        return float(self.flagged.mean()) if len(self.flagged) else 0.0
+
+
+@dataclass
+class ClusterModel:
+    method: str
+    embedding_model: str
+    cluster_ids: np.ndarray
+    centroids: np.ndarray
+    radius: np.ndarray
+    scaler_mean: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    scaler_scale: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    meta: dict[int, dict[str, str]] = field(default_factory=dict)
+    baseline_flagged_rate: float = 0.0
+    reducer: Reducer | None = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def fit(
+        cls,
+        matrix: np.ndarray,
+        labels: np.ndarray,
+        *,
+        method: str,
+        embedding_model: str,
+        centroids: np.ndarray | None = None,
+        scaler: Any = None,
+        meta: dict[int, dict[str, str]] | None = None,
+        weights: np.ndarray | None = None,
+        reducer: Reducer | None = None,
+    ) -> "ClusterModel":
+        """Summarise a finished clustering of *matrix*.
+
+        *matrix* is what the clusterer saw, i.e. already reduced by *reducer*
+        when one was used. K‑Means passes its fitted ``cluster_centers_`` as *centroids*; for
+        density methods the centroids are the members' (*weights*‑weighted)
+        means in the *scaler*‑standardised space.
+        """
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if scaler is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float32)
+            scale = np.asarray(scaler.scale_, dtype=np.float32)
+            space = (matrix - mean) / scale
+        else:
+            mean = scale = np.empty(0, dtype=np.float32)
+            space = matrix
+
+        ids = np.array(sorted(int(lbl) for lbl in set(labels) if lbl != -1), dtype=np.int64)
+        if centroids is None:
+            w = np.ones(len(space)) if weights is None else np.asarray(weights, dtype=np.float64)
+            centroids = np.stack(
+                [np.average(space[labels == lbl], axis=0, weights=w[labels == lbl]) for lbl in ids]
+            )
+        centroids = np.asarray(centroids, dtype=np.float32)
+
+        radius = np.empty(len(ids), dtype=np.float32)
+        for i, lbl in enumerate(ids):
+            members = space[labels == lbl]
+            radius[i] = np.percentile(np.linalg.norm(members - centroids[i], axis=1), RADIUS_PERCENTILE)
+
+        model = cls(
+            method=method,
+            embedding_model=embedding_model,
+            cluster_ids=ids,
+            centroids=centroids,
+            radius=radius,
+            scaler_mean=mean,
+            scaler_scale=scale,
+            meta={int(k): v for k, v in (meta or {}).items()},
+        )
+        flagged = model.assign(matrix, reduced=True).flagged
+        model.reducer = reducer
+        model.baseline_flagged_rate = float(np.average(flagged, weights=weights)) if len(flagged) else 0.0
+        return model
+
+    # ------------------------------------------------------------------
+    # Assignment
+    # ------------------------------------------------------------------
+
+    def assign(self, matrix: np.ndarray, chunk: int = 8192, *, reduced: bool = False) -> Assignment:
+        """Nearest‑centroid assignment for the rows of *matrix* (full
+        embeddings, unless *reduced* says the reducer was already applied)."""
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        n = len(matrix)
+        labels = np.empty(n, dtype=np.int64)
+        distances = np.empty(n, dtype=np.float32)
+        flagged = np.zeros(n, dtype=bool)
+        c_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+        for start in range(0, n, chunk):
+            block = matrix[start : start + chunk]
+            if self.reducer is not None and not reduced:
+                block = self.reducer.transform(block)
+            if len(self.scaler_mean):
+                block = (block - self.scaler_mean) / self.scaler_scale
+            sq = np.einsum("ij,ij->i", block, block)[:, None] - 2 * block @ self.centroids.T + c_sq
+            dist = np.sqrt(np.maximum(sq, 0))
+
+            nearest = np.argmin(dist, axis=1)
+            d0 = dist[np.arange(len(block)), nearest]
+            out = slice(start, start + len(block))
+            labels[out] = self.cluster_ids[nearest]
+            distances[out] = d0
+
+            if self.method == "kmeans":
+                if dist.shape[1] > 1:
+                    d1 = np.partition(dist, 1, axis=1)[:, 1]
+                    flagged[out] = d0 / (d1 + 1e-9) > AMBIGUOUS_RATIO
+            else:
+                noise = d0 > self.radius[nearest]
+                flagged[out] = noise
+                labels[out] = np.where(noise, -1, labels[out])
+
+        return Assignment(labels=labels, distances=distances, flagged=flagged)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "format": MODEL_FORMAT,
+            "method": self.method,
+            "embedding_model": self.embedding_model,
+            "reduce_method": self.reducer.method if self.reducer else None,
+            "baseline_flagged_rate": self.baseline_flagged_rate,
+            "clusters": {str(k): v for k, v in self.meta.items()},
+        }
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            cluster_ids=self.cluster_ids,
+            centroids=self.centroids,
+            radius=self.radius,
+            scaler_mean=self.scaler_mean,
+            scaler_scale=self.scaler_scale,
+            reducer_mean=self.reducer.mean if self.reducer else np.empty(0, dtype=np.float32),
+            reducer_components=(
+                self.reducer.components if self.reducer else np.empty((0, 0), dtype=np.float32)
+            ),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ClusterModel":
+        try:
+            data = np.load(Path(path), allow_pickle=False)
+        except FileNotFoundError:
+            raise SystemExit(f"Cluster model {path} not found – run cluster_prompts.py first.")
+        meta = json.loads(str(data["meta"]))
+        if meta.get("format") != MODEL_FORMAT:
+            raise SystemExit(f"Unsupported cluster model format in {path}: {meta.get('format')}")
+        return cls(
+            method=meta["method"],
+            embedding_model=meta["embedding_model"],
+            cluster_ids=data["cluster_ids"],
+            centroids=data["centroids"],
+            radius=data["radius"],
+            scaler_mean=data["scaler_mean"],
+            scaler_scale=data["scaler_scale"],
+            meta={int(k): v for k, v in meta["clusters"].items()},
+            baseline_flagged_rate=float(meta["baseline_flagged_rate"]),
+            reducer=(
+                Reducer(meta["reduce_method"], data["reducer_mean"], data["reducer_components"])
+                if meta.get("reduce_method")
+                else None
+            ),
+        )
@@ -5,17 +5,24 @@ The script performs the following steps:
 
 1.  Read a CSV file that must contain a column named ``prompt``. If an
     ``act`` column is present it is used purely for reporting purposes.
+    The file is read in chunks and duplicate prompts are collapsed (see
+    ``ingest.py``); later steps weight each unique prompt by its row count.
 2.  Create embeddings via the OpenAI API (``text-embedding-3-small`` by
-    default).  The user can optionally provide a JSON cache path so the
-    expensive embedding step is only executed for new / unseen texts.
+    default).  The user can optionally provide a cache path so the
+    expensive embedding step is only executed for new / unseen texts.  The
+    cache is an append‑only, memory‑mapped matrix (see ``embedding_cache.py``).
 3.  Cluster the resulting vectors either with K‑Means (automatically picking
-    *k* through the silhouette score) or with DBSCAN.  Outliers are flagged
-    as cluster ``-1`` when DBSCAN is selected.
+    *k* through a sampled silhouette score or a cheaper index, fitting every
+    *k* only once) or with DBSCAN / HDBSCAN.  Outliers are flagged
+    as cluster ``-1`` when a density method is selected; large corpora use an
+    approximate neighbour index (``ann_index.py``) instead of exact search.
 4.  Ask a Chat Completion model (``gpt-4o-mini`` by default) to come up with a
-    short name and description for every cluster.
+    short name and description for every cluster.  Requests run concurrently
+    and replies are cached next to the embeddings, keyed by the sampled
+    example prompts, so unchanged clusters are not relabelled.
 5.  Write a human‑readable Markdown report (default: ``analysis.md``).
 6.  Generate a couple of diagnostic plots (cluster sizes and a t‑SNE scatter
-    plot) and store them in ``plots/``.
+    plot, or UMAP / PCA via ``projection.py``) and store them in ``plots/``.
 
 The script is intentionally opinionated yet configurable via a handful of CLI
 options – run ``python cluster_prompts.py --help`` for details.
@@ -24,18 +31,71 @@ options – run ``python cluster_prompts.py --help`` for details.
 from __future__ import annotations
 
 import argparse
-import json
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Sequence
+from typing import Any, Callable, Sequence
 
 import numpy as np
 import pandas as pd
 
+from cluster_model import AMBIGUOUS_RATIO, ClusterModel
+from embed_client import EmbedLimits, OnBatch, embed_texts_concurrently
+from embedding_cache import STORAGE_DTYPES, cache_root, dequantize, open_cache, quantize, text_hash
+from ingest import read_prompts, write_row_labels
+from label_client import PROMPT_VERSION, LabelLimits, label_with_cache
+from projection import BACKENDS as PROJECTION_BACKENDS
+from projection import project_2d
+from reduction import METHODS as REDUCE_METHODS
+from reduction import Reducer, reduce_rows
+from stages import StageRunner, StageTiming, file_digest
+
 # External, heavy‑weight libraries are imported lazily so that users running the
 # ``--help`` command do not pay the startup cost.
 
 
+def _add_embed_options(parser: argparse.ArgumentParser) -> None:
+    """Embedding request options shared by the main pipeline and ``assign``."""
+
+    parser.add_argument(
+        "--embed-batch-size", type=int, default=100, help="Prompts per embedding request."
+    )
+    parser.add_argument(
+        "--embed-concurrency",
+        type=int,
+        default=4,
+        help="Embedding requests kept in flight at once.",
+    )
+    parser.add_argument(
+        "--embed-rpm",
+        type=float,
+        default=None,
+        help="Client‑side limit on embedding requests per minute.",
+    )
+    parser.add_argument(
+        "--embed-tpm",
+        type=float,
+        default=None,
+        help="Client‑side limit on embedding tokens per minute (estimated).",
+    )
+    parser.add_argument(
+        "--embed-max-retries",
+        type=int,
+        default=6,
+        help="Retries per batch on 429 / 5xx / connection errors.",
+    )
+
+
+def _embed_limits(args: argparse.Namespace) -> EmbedLimits:
+    return EmbedLimits(
+        batch_size=args.embed_batch_size,
+        concurrency=args.embed_concurrency,
+        requests_per_minute=args.embed_rpm,
+        tokens_per_minute=args.embed_tpm,
+        max_retries=args.embed_max_retries,
+    )
+
+
 def parse_cli() -> argparse.Namespace:  # noqa: D401
     """Parse command‑line arguments."""
 
@@ -46,27 +106,70 @@ def parse_cli() -> argparse.Namespace:  # noqa: D401
     )
 
     parser.add_argument("--csv", type=Path, default=Path("prompts.csv"), help="Input CSV file.")
+    parser.add_argument(
+        "--chunksize", type=int, default=100_000, help="CSV rows read per chunk."
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Also collapse prompts that differ only in case, punctuation or whitespace.",
+    )
     parser.add_argument(
         "--cache",
         type=Path,
         default=None,
-        help="Optional JSON cache for embeddings (will be created if it does not exist).",
+        help=(
+            "Optional embedding cache directory (created if missing). A legacy "
+            "'*.json' cache is migrated once into the directory of the same name."
+        ),
     )
     parser.add_argument(
         "--embedding-model",
         default="text-embedding-3-small",
         help="OpenAI embedding model to use.",
     )
+    _add_embed_options(parser)
+    parser.add_argument(
+        "--embedding-dtype",
+        choices=STORAGE_DTYPES,
+        default="float32",
+        help="Storage type of the vectors in the cache and in memory (fixed when a cache is created).",
+    )
+    parser.add_argument(
+        "--reduce-dim",
+        type=int,
+        default=0,
+        help="Reduce embeddings to this many dimensions before clustering (0 = off).",
+    )
+    parser.add_argument(
+        "--reduce-method",
+        choices=REDUCE_METHODS,
+        default="pca",
+        help="Dimensionality reduction used with --reduce-dim.",
+    )
     parser.add_argument(
         "--chat-model",
         default="gpt-4o-mini",
         help="OpenAI chat model for cluster descriptions.",
     )
 
+    parser.add_argument(
+        "--label-concurrency",
+        type=int,
+        default=4,
+        help="Cluster labelling requests kept in flight at once.",
+    )
+    parser.add_argument(
+        "--label-batch-size",
+        type=int,
+        default=1,
+        help="Clusters described per chat request (fewer round‑trips, longer prompts).",
+    )
+
     # Clustering parameters
     parser.add_argument(
         "--cluster-method",
-        choices=["kmeans", "dbscan"],
+        choices=["kmeans", "dbscan", "hdbscan"],
         default="kmeans",
         help="Clustering algorithm to use.",
     )
@@ -76,12 +179,64 @@ def parse_cli() -> argparse.Namespace:  # noqa: D401
         default=10,
         help="Upper bound for k when the kmeans method is selected.",
     )
+    parser.add_argument(
+        "--k-criterion",
+        choices=sorted(K_CRITERIA),
+        default="silhouette",
+        help="Metric used to pick k (kmeans only).",
+    )
+    parser.add_argument(
+        "--silhouette-sample",
+        type=int,
+        default=10_000,
+        help="Points used for the silhouette score during k selection (0 = all).",
+    )
+    parser.add_argument(
+        "--minibatch",
+        action="store_true",
+        help="Use MiniBatchKMeans for the k sweep (large corpora).",
+    )
     parser.add_argument(
         "--dbscan-min-samples",
         type=int,
         default=3,
         help="min_samples parameter for DBSCAN (only relevant when dbscan is selected).",
     )
+    parser.add_argument(
+        "--ann",
+        choices=["auto", "exact", "hnswlib", "faiss", "numpy"],
+        default="auto",
+        help=(
+            "Neighbour search for dbscan/hdbscan. 'auto' stays exact below "
+            f"{ANN_AUTO_THRESHOLD} prompts, then uses hnswlib, faiss or the NumPy fallback."
+        ),
+    )
+    parser.add_argument(
+        "--eps-sample",
+        type=int,
+        default=5_000,
+        help="Prompts sampled to estimate DBSCAN's eps when an ANN index is used.",
+    )
+    parser.add_argument(
+        "--graph-neighbors",
+        type=int,
+        default=50,
+        help="Neighbours per prompt kept in the sparse ANN distance graph.",
+    )
+
+    # Plotting
+    parser.add_argument(
+        "--projection",
+        choices=PROJECTION_BACKENDS,
+        default="auto",
+        help="2‑D projection for the scatter plot ('auto' prefers openTSNE, then UMAP, then scikit‑learn t‑SNE).",
+    )
+    parser.add_argument(
+        "--plot-max-points",
+        type=int,
+        default=20_000,
+        help="Subsample (per cluster) to this many prompts before projecting (0 = all).",
+    )
 
     # Output paths
     parser.add_argument(
@@ -90,88 +245,199 @@ def parse_cli() -> argparse.Namespace:  # noqa: D401
     parser.add_argument(
         "--plots-dir", type=Path, default=Path("plots"), help="Directory that will hold PNG plots."
     )
+    parser.add_argument(
+        "--labels-csv",
+        type=Path,
+        default=None,
+        help="Optional copy of the input CSV with 'cluster' and 'cluster_name' columns per row.",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=None,
+        help="Where stage results are checkpointed (default: <cache>/checkpoints when --cache is set).",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Recompute every stage even if a matching checkpoint exists.",
+    )
+    parser.add_argument(
+        "--model-out",
+        type=Path,
+        default=None,
+        help="Save the cluster model used by the 'assign' subcommand to this .npz file.",
+    )
 
     return parser.parse_args()
 
 
-# ---------------------------------------------------------------------------
-# Embedding helpers
-# ---------------------------------------------------------------------------
-
+def parse_assign_cli(argv: Sequence[str]) -> argparse.Namespace:
+    """Parse the arguments of ``cluster_prompts.py assign``."""
 
-def _lazy_import_openai():  # noqa: D401
-    """Import *openai* only when needed to keep startup lightweight."""
+    parser = argparse.ArgumentParser(
+        prog="cluster_prompts.py assign",
+        description=(
+            "Assign new prompts to the clusters of a saved cluster model and "
+            "report whether they still fit it."
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--csv", type=Path, required=True, help="CSV with a 'prompt' column.")
+    parser.add_argument(
+        "--model", type=Path, default=Path("cluster_model.npz"), help="Saved cluster model."
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="Embedding cache directory – only prompts missing from it are embedded.",
+    )
+    _add_embed_options(parser)
+    parser.add_argument(
+        "--output-csv",
+        type=Path,
+        default=Path("assignments.csv"),
+        help="Per‑prompt cluster, name, distance and flag.",
+    )
+    parser.add_argument(
+        "--drift-tolerance",
+        type=float,
+        default=0.1,
+        help=(
+            "Report drift when the share of ambiguous (kmeans) or noise "
+            "(dbscan/hdbscan) prompts exceeds the model's baseline by more than this."
+        ),
+    )
+    parser.add_argument(
+        "--fail-on-drift",
+        action="store_true",
+        help="Exit with status 2 when drift is detected.",
+    )
+    return parser.parse_args(argv)
 
-    try:
-        import openai  # type: ignore
 
-        return openai
-    except ImportError as exc:  # pragma: no cover – we do not test missing deps.
-        raise SystemExit(
-            "The 'openai' package is required but not installed.\n"
-            "Run 'pip install openai' and try again."
-        ) from exc
+# ---------------------------------------------------------------------------
+# Embedding helpers
+# ---------------------------------------------------------------------------
 
 
-def embed_texts(texts: Sequence[str], model: str, batch_size: int = 100) -> list[list[float]]:
+def embed_texts(
+    texts: Sequence[str],
+    model: str,
+    batch_size: int = 100,
+    *,
+    limits: EmbedLimits | None = None,
+    on_batch: OnBatch | None = None,
+) -> list[list[float]] | int:
     """Embed *texts* with OpenAI and return a list of vectors.
 
-    Uses batching for efficiency but remains on the safe side regarding current
-    OpenAI rate limits (can be adjusted by changing *batch_size*).
+    Batches are sent concurrently within the client‑side request/token limits
+    in *limits* and retried on rate‑limit and transient errors (see
+    ``embed_client.py``). *on_batch* is called with ``(indices, vectors)`` as
+    each batch completes so callers can checkpoint progress; the vectors are
+    then not collected, and only the number of texts embedded is returned.
     """
 
-    openai = _lazy_import_openai()
-    client = openai.OpenAI()
+    if limits is None:
+        limits = EmbedLimits(batch_size=batch_size)
+    return embed_texts_concurrently(texts, model, limits, on_batch)
 
-    embeddings: list[list[float]] = []
 
-    for batch_start in range(0, len(texts), batch_size):
-        batch = texts[batch_start : batch_start + batch_size]
+def _embedding_source(
+    prompts: pd.Series,
+    *,
+    cache_path: Path | None,
+    model: str,
+    limits: EmbedLimits | None,
+    dtype: str,
+) -> tuple[Callable[[np.ndarray], np.ndarray], np.ndarray]:
+    """Make sure every prompt is embedded; return ``(take, rows)``.
 
-        response = client.embeddings.create(input=batch, model=model)
-        # The API returns the vectors in the same order as the input list.
-        embeddings.extend(data.embedding for data in response.data)
+    ``take(rows[i:j])`` yields the float32 vectors of prompts ``i..j`` and
+    reads them from *dtype* storage – the memory‑mapped cache, or an
+    in‑memory matrix when no cache is used.
+    """
+
+    hashes = [text_hash(t) for t in prompts.tolist()]
+
+    if cache_path is None:
+        unique = dict(zip(hashes, prompts.tolist()))
+        print(f"Embedding {len(unique)} new prompt(s)…", flush=True)
+        vectors = embed_texts(list(unique.values()), model=model, limits=limits)
+        stored, scales = quantize(np.asarray(vectors, dtype=np.float32), dtype)
+        del vectors
+        position = {h: i for i, h in enumerate(unique)}
+        rows = np.fromiter((position[h] for h in hashes), dtype=np.int64, count=len(hashes))
+        return (lambda r: dequantize(stored[r], None if scales is None else scales[r])), rows
+
+    cache = open_cache(cache_path, model, dtype)
+    rows = cache.lookup(hashes)
+
+    if (rows < 0).any():
+        missing = {h: t for h, t, r in zip(hashes, prompts.tolist(), rows) if r < 0}
+        print(f"Embedding {len(missing)} new prompt(s)…", flush=True)
+        keys = list(missing)
+        embed_texts(
+            list(missing.values()),
+            model=model,
+            limits=limits,
+            on_batch=lambda idx, vecs: cache.append([keys[i] for i in idx], vecs),
+        )
+        rows = cache.lookup(hashes)
 
-    return embeddings
+    return cache.take, rows
 
 
 def load_or_create_embeddings(
-    prompts: pd.Series, *, cache_path: Path | None, model: str
+    prompts: pd.Series,
+    *,
+    cache_path: Path | None,
+    model: str,
+    limits: EmbedLimits | None = None,
+    dtype: str = "float32",
 ) -> pd.DataFrame:
     """Return a *DataFrame* with one row per prompt and the embedding columns.
 
-    * If *cache_path* is provided and exists, known embeddings are loaded from
-      the JSON cache so they don't have to be re‑generated.
-    * Missing embeddings are requested from the OpenAI API and subsequently
-      appended to the cache.
+    * If *cache_path* is provided, known embeddings are read from the
+      memory‑mapped cache (see ``embedding_cache.py``) keyed by
+      *(model, text hash)*. A legacy JSON cache is migrated on first use.
+    * Missing embeddings are requested from the OpenAI API (once per unique
+      text) and appended to the cache batch by batch as they arrive, so an
+      interrupted run keeps everything fetched so far.
+    * *dtype* selects how vectors are stored (``float32``, ``float16`` or
+      ``int8``); the returned values are always float32.
     * The returned DataFrame has the same index as *prompts*.
     """
 
-    cache: dict[str, list[float]] = {}
-    if cache_path and cache_path.exists():
-        try:
-            cache = json.loads(cache_path.read_text())
-        except json.JSONDecodeError:  # pragma: no cover – unlikely.
-            print("⚠️  Cache file exists but is not valid JSON – ignoring.", file=sys.stderr)
-
-    missing_mask = ~prompts.isin(cache)
-
-    if missing_mask.any():
-        texts_to_embed = prompts[missing_mask].tolist()
-        print(f"Embedding {len(texts_to_embed)} new prompt(s)…", flush=True)
-        new_embeddings = embed_texts(texts_to_embed, model=model)
-
-        # Update cache (regardless of whether we persist it to disk later on).
-        cache.update(dict(zip(texts_to_embed, new_embeddings)))
-
-        if cache_path:
-            cache_path.parent.mkdir(parents=True, exist_ok=True)
-            cache_path.write_text(json.dumps(cache))
-
-    # Build a consistent embeddings matrix
-    vectors = prompts.map(cache.__getitem__).tolist()  # type: ignore[arg-type]
-    mat = np.array(vectors, dtype=np.float32)
-    return pd.DataFrame(mat, index=prompts.index)
+    take, rows = _embedding_source(
+        prompts, cache_path=cache_path, model=model, limits=limits, dtype=dtype
+    )
+    return pd.DataFrame(take(rows), index=prompts.index)
+
+
+def load_reduced_embeddings(
+    prompts: pd.Series,
+    *,
+    cache_path: Path | None,
+    model: str,
+    n_components: int,
+    method: str = "pca",
+    limits: EmbedLimits | None = None,
+    dtype: str = "float32",
+) -> tuple[np.ndarray, Reducer]:
+    """Like :func:`load_or_create_embeddings`, but reduced to *n_components*
+    dimensions block by block (see ``reduction.py``), so the full‑width
+    float32 matrix is never built. Returns the matrix and the reducer."""
+
+    take, rows = _embedding_source(
+        prompts, cache_path=cache_path, model=model, limits=limits, dtype=dtype
+    )
+    matrix, reducer = reduce_rows(take, rows, n_components, method)
+    print(
+        f"Reduced embeddings to {reducer.n_components} dimensions ({method}).", flush=True
+    )
+    return matrix, reducer
 
 
 # ---------------------------------------------------------------------------
@@ -190,58 +456,193 @@ def _lazy_import_sklearn_cluster():
     return KMeans, DBSCAN, silhouette_score, StandardScaler
 
 
-def cluster_kmeans(matrix: np.ndarray, k_max: int) -> np.ndarray:
-    """Auto‑select *k* (in ``[2, k_max]``) via Silhouette score and cluster."""
+# Selection criteria for *k*: name -> (report label, higher_is_better).
+K_CRITERIA: dict[str, tuple[str, bool]] = {
+    "silhouette": ("Silhouette score", True),
+    "calinski_harabasz": ("Calinski–Harabasz index", True),
+    "davies_bouldin": ("Davies–Bouldin index", False),
+}
+
+
+@dataclass
+class KMeansResult:
+    """Everything the k sweep computed for the winning *k*."""
+
+    labels: np.ndarray
+    model: Any
+    distances: np.ndarray  # (n_samples, k) distances to every centroid
+    k: int
+    criterion: str
+    score: float
 
-    KMeans, _, silhouette_score, _ = _lazy_import_sklearn_cluster()
 
-    best_k = None
-    best_score = -1.0
-    best_labels: np.ndarray | None = None
+def _score_clustering(
+    matrix: np.ndarray, labels: np.ndarray, criterion: str, sample_size: int | None
+) -> float:
+    from sklearn import metrics  # type: ignore – lazy
+
+    if criterion == "silhouette":
+        if sample_size and sample_size < len(matrix):
+            return float(
+                metrics.silhouette_score(matrix, labels, sample_size=sample_size, random_state=42)
+            )
+        return float(metrics.silhouette_score(matrix, labels))
+    if criterion == "calinski_harabasz":
+        return float(metrics.calinski_harabasz_score(matrix, labels))
+    return float(metrics.davies_bouldin_score(matrix, labels))
+
+
+def cluster_kmeans(
+    matrix: np.ndarray,
+    k_max: int,
+    *,
+    criterion: str = "silhouette",
+    silhouette_sample: int | None = 10_000,
+    minibatch: bool = False,
+    sample_weight: np.ndarray | None = None,
+) -> KMeansResult:
+    """Auto‑select *k* (in ``[2, k_max]``) and return the fitted winner.
+
+    Every *k* is fitted exactly once. *criterion* picks the selection metric:
+    the silhouette score (computed on at most *silhouette_sample* points, the
+    full O(n²) score when ``None``/0), or the linear‑time Calinski–Harabasz or
+    Davies–Bouldin indices. *minibatch* swaps in ``MiniBatchKMeans`` for large
+    corpora. *sample_weight* (rows per unique prompt) weights the fit; the
+    selection metrics are computed on the unweighted points.
+    """
+
+    from sklearn.cluster import KMeans, MiniBatchKMeans  # type: ignore – lazy
+
+    higher_is_better = K_CRITERIA[criterion][1]
+    best: tuple[float, int, Any] | None = None
 
     for k in range(2, k_max + 1):
-        model = KMeans(n_clusters=k, random_state=42, n_init="auto")
-        labels = model.fit_predict(matrix)
+        if minibatch:
+            model = MiniBatchKMeans(n_clusters=k, random_state=42, n_init="auto", batch_size=4096)
+        else:
+            model = KMeans(n_clusters=k, random_state=42, n_init="auto")
+        labels = model.fit_predict(matrix, sample_weight=sample_weight)
         try:
-            score = silhouette_score(matrix, labels)
+            score = _score_clustering(matrix, labels, criterion, silhouette_sample)
         except ValueError:
             # Occurs when a cluster ended up with 1 sample – skip.
             continue
 
-        if score > best_score:
-            best_k = k
-            best_score = score
-            best_labels = labels
+        key = score if higher_is_better else -score
+        if best is None or key > best[0]:
+            best = (key, k, model)
 
-    if best_labels is None:  # pragma: no cover – highly unlikely.
+    if best is None:  # pragma: no cover – highly unlikely.
         raise RuntimeError("Unable to find a suitable number of clusters.")
 
-    print(f"K‑Means selected k={best_k} (silhouette={best_score:.3f}).", flush=True)
-    return best_labels
+    best_key, best_k, best_model = best
+    best_score = best_key if higher_is_better else -best_key
+    print(f"K‑Means selected k={best_k} ({criterion}={best_score:.3f}).", flush=True)
+    return KMeansResult(
+        labels=best_model.labels_,
+        model=best_model,
+        distances=best_model.transform(matrix),
+        k=best_k,
+        criterion=criterion,
+        score=best_score,
+    )
 
 
-def cluster_dbscan(matrix: np.ndarray, min_samples: int) -> np.ndarray:
-    """Cluster with DBSCAN; *eps* is estimated via the k‑distance method."""
+@dataclass
+class DensityResult:
+    """Labels plus what is needed to place new prompts (see ``cluster_model.py``)."""
 
-    _, DBSCAN, _, StandardScaler = _lazy_import_sklearn_cluster()
+    labels: np.ndarray
+    scaler: Any  # StandardScaler fitted on the embeddings
+    eps: float | None = None  # DBSCAN only
 
-    # Scale features – DBSCAN is sensitive to feature scale.
-    scaler = StandardScaler()
-    matrix_scaled = scaler.fit_transform(matrix)
 
-    # Heuristic: use the median of the distances to the ``min_samples``‑th
-    # nearest neighbour as eps. This is a commonly used rule of thumb.
-    from sklearn.neighbors import NearestNeighbors  # type: ignore  # lazy import
+# Below this many prompts the exact neighbour search is cheap enough.
+ANN_AUTO_THRESHOLD = 20_000
 
-    neigh = NearestNeighbors(n_neighbors=min_samples)
-    neigh.fit(matrix_scaled)
-    distances, _ = neigh.kneighbors(matrix_scaled)
-    kth_distances = distances[:, -1]
-    eps = float(np.percentile(kth_distances, 90))  # choose a high‑ish value.
 
-    print(f"DBSCAN min_samples={min_samples}, eps={eps:.3f}", flush=True)
-    model = DBSCAN(eps=eps, min_samples=min_samples)
-    return model.fit_predict(matrix_scaled)
+def cluster_dbscan(
+    matrix: np.ndarray,
+    min_samples: int,
+    *,
+    method: str = "dbscan",
+    ann: str = "auto",
+    eps_sample: int = 5_000,
+    graph_neighbors: int = 50,
+    sample_weight: np.ndarray | None = None,
+) -> DensityResult:
+    """Density clustering with DBSCAN or HDBSCAN.
+
+    For DBSCAN, *eps* is estimated via the k‑distance method. With *ann* set
+    to ``"exact"`` (or ``"auto"`` on fewer than ``ANN_AUTO_THRESHOLD`` prompts)
+    the original exact neighbour search is used. Otherwise an approximate
+    index from ``ann_index.py`` estimates *eps* from *eps_sample* sampled
+    k‑distances and produces a sparse radius graph of at most
+    *graph_neighbors* neighbours per point, which is passed to the clusterer
+    as a precomputed distance matrix. DBSCAN counts *sample_weight* towards
+    ``min_samples``; HDBSCAN does not support weights and ignores it.
+    """
+
+    _, DBSCAN, _, StandardScaler = _lazy_import_sklearn_cluster()
+
+    # Scale features – DBSCAN is sensitive to feature scale.
+    scaler = StandardScaler()
+    matrix_scaled = scaler.fit_transform(matrix).astype(np.float32)
+
+    if ann == "exact" or (ann == "auto" and len(matrix) < ANN_AUTO_THRESHOLD):
+        if method == "hdbscan":
+            from sklearn.cluster import HDBSCAN  # type: ignore  # lazy import
+
+            print(f"HDBSCAN min_samples={min_samples} (exact)", flush=True)
+            labels = HDBSCAN(min_samples=min_samples).fit_predict(matrix_scaled)
+            return DensityResult(labels=labels, scaler=scaler)
+
+        # Heuristic: use the median of the distances to the ``min_samples``‑th
+        # nearest neighbour as eps. This is a commonly used rule of thumb.
+        from sklearn.neighbors import NearestNeighbors  # type: ignore  # lazy import
+
+        neigh = NearestNeighbors(n_neighbors=min_samples)
+        neigh.fit(matrix_scaled)
+        distances, _ = neigh.kneighbors(matrix_scaled)
+        kth_distances = distances[:, -1]
+        eps = float(np.percentile(kth_distances, 90))  # choose a high‑ish value.
+
+        print(f"DBSCAN min_samples={min_samples}, eps={eps:.3f}", flush=True)
+        model = DBSCAN(eps=eps, min_samples=min_samples)
+        labels = model.fit_predict(matrix_scaled, sample_weight=sample_weight)
+        return DensityResult(labels=labels, scaler=scaler, eps=eps)
+
+    from ann_index import AnnIndex, connect_components, estimate_eps, radius_graph
+
+    index = AnnIndex(matrix_scaled, backend=ann)
+    n_neighbors = max(graph_neighbors, min_samples + 1)
+
+    if method == "hdbscan":
+        from sklearn.cluster import HDBSCAN  # type: ignore  # lazy import
+
+        # HDBSCAN needs no eps – give it the plain k‑NN graph. Pairs missing
+        # from the graph count as far apart.
+        graph = radius_graph(index, None, n_neighbors)
+        far = float(graph.data.max(initial=0.0)) * 2 or 1.0
+        graph = connect_components(graph, far)
+        print(
+            f"HDBSCAN min_samples={min_samples} ({index.backend} index, "
+            f"{graph.nnz / len(matrix):.1f} neighbours/prompt)",
+            flush=True,
+        )
+        model = HDBSCAN(min_samples=min_samples, metric="precomputed", metric_params={"max_distance": far})
+        return DensityResult(labels=model.fit_predict(graph), scaler=scaler)
+
+    eps = estimate_eps(index, min_samples, sample=eps_sample)
+    graph = radius_graph(index, eps, n_neighbors)
+    print(
+        f"DBSCAN min_samples={min_samples}, eps={eps:.3f} ({index.backend} index, "
+        f"{graph.nnz / len(matrix):.1f} neighbours/prompt)",
+        flush=True,
+    )
+    model = DBSCAN(eps=eps, min_samples=min_samples, metric="precomputed")
+    labels = model.fit_predict(graph, sample_weight=sample_weight)
+    return DensityResult(labels=labels, scaler=scaler, eps=eps)
 
 
 # ---------------------------------------------------------------------------
@@ -250,17 +651,26 @@ def cluster_dbscan(matrix: np.ndarray, min_samples: int) -> np.ndarray:
 
 
 def label_clusters(
-    df: pd.DataFrame, labels: np.ndarray, chat_model: str, max_examples: int = 12
+    df: pd.DataFrame,
+    labels: np.ndarray,
+    chat_model: str,
+    max_examples: int = 12,
+    *,
+    limits: LabelLimits | None = None,
+    cache_path: Path | None = None,
 ) -> dict[int, dict[str, str]]:
     """Generate a name & description for each cluster label via ChatGPT.
 
+    Requests run concurrently (and optionally several clusters per request)
+    within *limits*; with *cache_path* set, clusters whose sampled examples
+    were already labelled by *chat_model* are served from disk (see
+    ``label_client.py``).
+
     Returns a mapping ``label -> {"name": str, "description": str}``.
     """
 
-    openai = _lazy_import_openai()
-    client = openai.OpenAI()
-
     out: dict[int, dict[str, str]] = {}
+    clusters: dict[int, list[str]] = {}
 
     for lbl in sorted(set(labels)):
         if lbl == -1:
@@ -275,53 +685,10 @@ def label_clusters(
         examples_series = df.loc[labels == lbl, "prompt"].sample(
             min(max_examples, (labels == lbl).sum()), random_state=42
         )
-        examples = examples_series.tolist()
-
-        user_content = (
-            "The following text snippets are all part of the same semantic cluster.\n"
-            "Please propose \n"
-            "1. A very short *title* for the cluster (≤ 4 words).\n"
-            "2. A concise 2–3 sentence *description* that explains the common theme.\n\n"
-            "Answer **strictly** as valid JSON with the keys 'name' and 'description'.\n\n"
-            "Snippets:\n"
-        )
-        user_content += "\n".join(f"- {t}" for t in examples)
-
-        messages = [
-            {
-                "role": "system",
-                "content": "You are an expert analyst, competent in summarising text clusters succinctly.",
-            },
-            {"role": "user", "content": user_content},
-        ]
-
-        try:
-            resp = client.chat.completions.create(model=chat_model, messages=messages)
-            reply = resp.choices[0].message.content.strip()
-
-            # Extract the JSON object even if the assistant wrapped it in markdown
-            # code fences or added other text.
+        clusters[lbl] = examples_series.tolist()
 
-            # Remove common markdown fences.
-            reply_clean = reply.strip()
-            # Take the substring between the first "{" and the last "}".
-            m_start = reply_clean.find("{")
-            m_end = reply_clean.rfind("}")
-            if m_start == -1 or m_end == -1:
-                raise ValueError("No JSON object found in model reply.")
-
-            json_str = reply_clean[m_start : m_end + 1]
-            data = json.loads(json_str)  # type: ignore[arg-type]
-
-            out[lbl] = {
-                "name": str(data.get("name", "Unnamed"))[:60],
-                "description": str(data.get("description", "")).strip(),
-            }
-        except Exception as exc:  # pragma: no cover – network / runtime errors.
-            print(f"⚠️  Failed to label cluster {lbl}: {exc}", file=sys.stderr)
-            out[lbl] = {"name": f"Cluster {lbl}", "description": "<LLM call failed>"}
-
-    return out
+    out.update(label_with_cache(clusters, chat_model, limits=limits, cache_path=cache_path))
+    return dict(sorted(out.items()))
 
 
 # ---------------------------------------------------------------------------
@@ -335,13 +702,22 @@ def generate_markdown_report(
     meta: dict[int, dict[str, str]],
     outputs: dict[str, Any],
     path_md: Path,
+    weights: np.ndarray | None = None,
+    timings: Sequence[StageTiming] = (),
 ):
-    """Write a self‑contained Markdown analysis to *path_md*."""
+    """Write a self‑contained Markdown analysis to *path_md*.
+
+    *df* holds unique prompts; *weights* (input rows per prompt) make the
+    counts refer to the original rows. *timings* adds a per‑stage profile.
+    """
 
     path_md.parent.mkdir(parents=True, exist_ok=True)
 
+    if weights is None:
+        weights = np.ones(len(labels), dtype=np.int64)
     cluster_ids = sorted(set(labels))
-    counts = {lbl: int((labels == lbl).sum()) for lbl in cluster_ids}
+    counts = {lbl: int(weights[labels == lbl].sum()) for lbl in cluster_ids}
+    unique_counts = {lbl: int((labels == lbl).sum()) for lbl in cluster_ids}
 
     lines: list[str] = []
 
@@ -349,14 +725,16 @@ def generate_markdown_report(
     lines.append(f"Generated by `cluster_prompts.py` – {pd.Timestamp.now()}\n")
 
     # High‑level stats
-    total = len(labels)
+    total = int(weights.sum())
     num_clusters = len(cluster_ids) - (1 if -1 in cluster_ids else 0)
     lines.append("\n## Overview\n")
     lines.append(f"* Total prompts: **{total}**")
+    if total != len(labels):
+        lines.append(f"* Unique prompts: **{len(labels)}**")
     lines.append(f"* Clustering method: **{outputs['method']}**")
     if outputs.get("k"):
         lines.append(f"* k (K‑Means): **{outputs['k']}**")
-        lines.append(f"* Silhouette score: **{outputs['silhouette']:.3f}**")
+        lines.append(f"* {outputs['score_name']}: **{outputs['score']:.3f}**")
     lines.append(f"* Final clusters (excluding noise): **{num_clusters}**\n")
 
     # Summary table
@@ -374,7 +752,7 @@ def generate_markdown_report(
         lines.append(f"{meta_lbl['description']}\n")
 
         # Show a handful of illustrative prompts.
-        sample_n = min(5, counts[lbl])
+        sample_n = min(5, unique_counts[lbl])
         examples = df.loc[labels == lbl, "prompt"].sample(sample_n, random_state=42).tolist()
         lines.append("\nExamples:\n")
         lines.extend([f"* {t}" for t in examples])
@@ -384,7 +762,7 @@ def generate_markdown_report(
         lines.append("\n---\n")
         lines.append(f"### Noise / outliers ({counts[-1]} prompts)\n")
         examples = (
-            df.loc[labels == -1, "prompt"].sample(min(10, counts[-1]), random_state=42).tolist()
+            df.loc[labels == -1, "prompt"].sample(min(10, unique_counts[-1]), random_state=42).tolist()
         )
         lines.extend([f"* {t}" for t in examples])
 
@@ -399,9 +777,19 @@ def generate_markdown_report(
     lines.append("\n---\n")
     lines.append("## Plots\n")
     lines.append(
-        "The directory `plots/` contains a bar chart of the cluster sizes and a t‑SNE scatter plot coloured by cluster.\n"
+        "The directory `plots/` contains a bar chart of the cluster sizes and a 2‑D (t‑SNE, UMAP or PCA) scatter plot coloured by cluster.\n"
     )
 
+    # Where the time went
+    if timings:
+        lines.append("\n---\n")
+        lines.append("## Run profile\n")
+        lines.append("| stage | wall time (s) | peak RSS (MB) | source |")
+        lines.append("|-------|--------------:|--------------:|--------|")
+        for t in timings:
+            source = "checkpoint" if t.from_checkpoint else "computed"
+            lines.append(f"| {t.name} | {t.seconds:.2f} | {t.peak_rss_mb:.0f} | {source} |")
+
     path_md.write_text("\n".join(lines))
 
 
@@ -410,21 +798,39 @@ def generate_markdown_report(
 # ---------------------------------------------------------------------------
 
 
+PROJECTION_TITLES = {
+    "tsne": "t‑SNE projection",
+    "opentsne": "t‑SNE projection",
+    "umap": "UMAP projection",
+    "pca": "PCA projection",
+}
+PROJECTION_FILES = {"tsne": "tsne", "opentsne": "tsne", "umap": "umap", "pca": "pca"}
+
+
 def create_plots(
     matrix: np.ndarray,
     labels: np.ndarray,
     for_devs: pd.Series | None,
     plots_dir: Path,
+    *,
+    projection: str = "auto",
+    max_points: int = 20_000,
+    cache_dir: Path | None = None,
+    weights: np.ndarray | None = None,
 ):
-    """Generate cluster size and t‑SNE plots."""
+    """Generate cluster size and 2‑D projection plots.
+
+    The projection backend, subsampling and coordinate cache are described in
+    ``projection.py``.
+    """
 
     import matplotlib.pyplot as plt  # type: ignore – heavy, lazy import.
-    from sklearn.manifold import TSNE  # type: ignore – heavy, lazy import.
 
     plots_dir.mkdir(parents=True, exist_ok=True)
 
     # Bar chart with cluster sizes
-    unique, counts = np.unique(labels, return_counts=True)
+    unique, inverse = np.unique(labels, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights).astype(np.int64)
     order = np.argsort(-counts)  # descending
     unique, counts = unique[order], counts[order]
 
@@ -438,21 +844,24 @@ def create_plots(
     plt.savefig(bar_path, dpi=150)
     plt.close()
 
-    # t‑SNE scatter
-    tsne = TSNE(
-        n_components=2, perplexity=min(30, len(matrix) // 3), random_state=42, init="random"
+    # 2‑D scatter (t‑SNE unless another backend was picked)
+    xy, rows, backend = project_2d(
+        matrix, labels, backend=projection, max_points=max_points, cache_dir=cache_dir
     )
-    xy = tsne.fit_transform(matrix)
 
     plt.figure(figsize=(7, 6))
-    scatter = plt.scatter(xy[:, 0], xy[:, 1], c=labels, cmap="tab20", s=20, alpha=0.8)
-    plt.title("t‑SNE projection")
+    size = 20 if len(rows) <= 5_000 else 4
+    scatter = plt.scatter(xy[:, 0], xy[:, 1], c=labels[rows], cmap="tab20", s=size, alpha=0.8)
+    title = PROJECTION_TITLES[backend]
+    if len(rows) < len(matrix):
+        title += f" ({len(rows)} of {len(matrix)} prompts)"
+    plt.title(title)
     plt.xticks([])
     plt.yticks([])
 
     if for_devs is not None:
         # Overlay dev prompts as black edge markers
-        dev_mask = for_devs.astype(bool).values
+        dev_mask = for_devs.astype(bool).values[rows]
         plt.scatter(
             xy[dev_mask, 0],
             xy[dev_mask, 1],
@@ -464,9 +873,9 @@ def create_plots(
         )
         plt.legend(loc="best")
 
-    tsne_path = plots_dir / "tsne.png"
+    scatter_path = plots_dir / f"{PROJECTION_FILES[backend]}.png"
     plt.tight_layout()
-    plt.savefig(tsne_path, dpi=150)
+    plt.savefig(scatter_path, dpi=150)
     plt.close()
 
 
@@ -478,70 +887,246 @@ def create_plots(
 def main() -> None:  # noqa: D401
     args = parse_cli()
 
-    # Read CSV – require a 'prompt' column.
-    df = pd.read_csv(args.csv)
-    if "prompt" not in df.columns:
-        raise SystemExit("Input CSV must contain a 'prompt' column.")
+    checkpoint_dir = args.checkpoint_dir
+    if checkpoint_dir is None and args.cache:
+        checkpoint_dir = cache_root(args.cache) / "checkpoints"
+    runner = StageRunner(checkpoint_dir, resume=not args.no_resume)
 
-    # Keep relevant columns only for clarity.
-    df = df[[c for c in df.columns if c in {"act", "prompt", "for_devs"}]]
+    # ---------------------------------------------------------------------
+    # 0. Input
+    # ---------------------------------------------------------------------
+    # Read the CSV in chunks – require a 'prompt' column – and collapse
+    # duplicate prompts. Everything below works on the unique prompts, with
+    # the number of input rows behind each one as its weight.
+    table = runner.run(
+        "ingest",
+        {"csv": file_digest(args.csv), "near_duplicates": args.near_duplicates},
+        lambda: read_prompts(args.csv, chunksize=args.chunksize, near_duplicates=args.near_duplicates),
+    )
+    df, weights = table.unique, table.counts
+    if len(df) < table.n_rows:
+        print(f"Collapsed {table.n_rows} rows into {len(df)} unique prompt(s).", flush=True)
 
     # ---------------------------------------------------------------------
     # 1. Embeddings (may be cached)
     # ---------------------------------------------------------------------
-    embeddings_df = load_or_create_embeddings(
-        df["prompt"], cache_path=args.cache, model=args.embedding_model
+    def embed() -> tuple[np.ndarray, Reducer | None]:
+        if args.reduce_dim:
+            return load_reduced_embeddings(
+                df["prompt"],
+                cache_path=args.cache,
+                model=args.embedding_model,
+                n_components=args.reduce_dim,
+                method=args.reduce_method,
+                limits=_embed_limits(args),
+                dtype=args.embedding_dtype,
+            )
+        embeddings_df = load_or_create_embeddings(
+            df["prompt"],
+            cache_path=args.cache,
+            model=args.embedding_model,
+            limits=_embed_limits(args),
+            dtype=args.embedding_dtype,
+        )
+        return embeddings_df.values.astype(np.float32), None
+
+    mat, reducer = runner.run(
+        "embed",
+        {
+            "model": args.embedding_model,
+            "dtype": args.embedding_dtype,
+            "reduce_dim": args.reduce_dim,
+            "reduce_method": args.reduce_method,
+        },
+        embed,
+        # The embedding cache already holds the vectors (memory-mapped and in
+        # the chosen dtype); pickling a float32 copy would duplicate it on disk
+        # and load it whole into RAM. A reduced matrix is small enough to keep.
+        checkpoint=not args.cache or bool(args.reduce_dim),
     )
 
     # ---------------------------------------------------------------------
     # 2. Clustering
     # ---------------------------------------------------------------------
-    mat = embeddings_df.values.astype(np.float32)
-
-    if args.cluster_method == "kmeans":
-        labels = cluster_kmeans(mat, k_max=args.k_max)
-    else:
-        labels = cluster_dbscan(mat, min_samples=args.dbscan_min_samples)
-
-    # Identify potentially ambiguous prompts (only meaningful for kmeans).
-    outputs: dict[str, Any] = {"method": args.cluster_method}
-    if args.cluster_method == "kmeans":
-        from sklearn.cluster import KMeans  # type: ignore – lazy
-
-        best_k = len(set(labels))
-        # Re‑fit KMeans with the chosen k to get distances.
-        kmeans = KMeans(n_clusters=best_k, random_state=42, n_init="auto").fit(mat)
-        outputs["k"] = best_k
-        # Silhouette score (again) – not super efficient but okay.
-        from sklearn.metrics import silhouette_score  # type: ignore
-
-        outputs["silhouette"] = silhouette_score(mat, labels)
-
-        distances = kmeans.transform(mat)
-        # Ambiguous if the ratio between 1st and 2nd closest centroid < 1.1
-        sorted_dist = np.sort(distances, axis=1)
-        ratio = sorted_dist[:, 0] / (sorted_dist[:, 1] + 1e-9)
-        ambiguous_mask = ratio > 0.9  # tunes threshold – close centroids.
-        outputs["ambiguous"] = df.loc[ambiguous_mask, "prompt"].tolist()
+    def cluster() -> tuple[KMeansResult | DensityResult, dict[str, Any]]:
+        outputs: dict[str, Any] = {"method": args.cluster_method}
+        if args.cluster_method == "kmeans":
+            result = cluster_kmeans(
+                mat,
+                k_max=args.k_max,
+                criterion=args.k_criterion,
+                silhouette_sample=args.silhouette_sample,
+                minibatch=args.minibatch,
+                sample_weight=weights,
+            )
+            outputs["k"] = result.k
+            outputs["score_name"] = K_CRITERIA[result.criterion][0]
+            outputs["score"] = result.score
+
+            # Identify potentially ambiguous prompts (only meaningful for kmeans).
+            distances = result.distances
+            # Ambiguous if the ratio between 1st and 2nd closest centroid < 1.1
+            sorted_dist = np.sort(distances, axis=1)
+            ratio = sorted_dist[:, 0] / (sorted_dist[:, 1] + 1e-9)
+            ambiguous_mask = ratio > AMBIGUOUS_RATIO  # tunes threshold – close centroids.
+            outputs["ambiguous"] = df.loc[ambiguous_mask, "prompt"].tolist()
+        else:
+            result = cluster_dbscan(
+                mat,
+                min_samples=args.dbscan_min_samples,
+                method=args.cluster_method,
+                ann=args.ann,
+                eps_sample=args.eps_sample,
+                graph_neighbors=args.graph_neighbors,
+                sample_weight=weights,
+            )
+        return result, outputs
+
+    cluster_options = ("cluster_method", "k_max", "k_criterion", "silhouette_sample", "minibatch",
+                       "dbscan_min_samples", "ann", "eps_sample", "graph_neighbors")
+    result, outputs = runner.run(
+        "cluster", {name: getattr(args, name) for name in cluster_options}, cluster
+    )
+    labels = result.labels
 
     # ---------------------------------------------------------------------
     # 3. LLM naming / description
     # ---------------------------------------------------------------------
-    meta = label_clusters(df, labels, chat_model=args.chat_model)
+    meta = runner.run(
+        "label",
+        {"chat_model": args.chat_model, "prompt_version": PROMPT_VERSION},
+        lambda: label_clusters(
+            df,
+            labels,
+            chat_model=args.chat_model,
+            limits=LabelLimits(concurrency=args.label_concurrency, batch_size=args.label_batch_size),
+            cache_path=cache_root(args.cache) / "labels.json" if args.cache else None,
+        ),
+    )
 
     # ---------------------------------------------------------------------
     # 4. Plots
     # ---------------------------------------------------------------------
-    create_plots(mat, labels, df.get("for_devs"), args.plots_dir)
+    runner.run(
+        "plot",
+        {},
+        lambda: create_plots(
+            mat,
+            labels,
+            df.get("for_devs"),
+            args.plots_dir,
+            projection=args.projection,
+            max_points=args.plot_max_points,
+            cache_dir=cache_root(args.cache) if args.cache else None,
+            weights=weights,
+        ),
+        checkpoint=False,
+    )
+
+    # ---------------------------------------------------------------------
+    # 5. Per‑row labels and cluster model for ``assign``
+    # ---------------------------------------------------------------------
+    def save_outputs() -> None:
+        if args.labels_csv:
+            row_labels = labels[table.row_index]
+            names = np.array([meta[lbl]["name"] for lbl in labels], dtype=object)[table.row_index]
+            write_row_labels(args.csv, args.labels_csv, row_labels, names, chunksize=args.chunksize)
+            print(f"Row labels written to {args.labels_csv}", flush=True)
+
+        if args.model_out and (labels != -1).any():
+            if isinstance(result, KMeansResult):
+                cluster_model = ClusterModel.fit(
+                    mat,
+                    labels,
+                    method="kmeans",
+                    embedding_model=args.embedding_model,
+                    centroids=result.model.cluster_centers_,
+                    meta=meta,
+                    weights=weights,
+                    reducer=reducer,
+                )
+            else:
+                cluster_model = ClusterModel.fit(
+                    mat,
+                    labels,
+                    method=args.cluster_method,
+                    embedding_model=args.embedding_model,
+                    scaler=result.scaler,
+                    meta=meta,
+                    weights=weights,
+                    reducer=reducer,
+                )
+            cluster_model.save(args.model_out)
+            print(f"Cluster model saved to {args.model_out}", flush=True)
+
+    runner.run("save", {}, save_outputs, checkpoint=False)
 
     # ---------------------------------------------------------------------
-    # 5. Markdown report
+    # 6. Markdown report
     # ---------------------------------------------------------------------
-    generate_markdown_report(df, labels, meta, outputs, path_md=args.output_md)
+    generate_markdown_report(
+        df, labels, meta, outputs, path_md=args.output_md, weights=weights, timings=runner.timings
+    )
 
     print(f"✅ Done. Report written to {args.output_md} – plots in {args.plots_dir}/", flush=True)
 
 
+def assign(argv: Sequence[str]) -> None:
+    """``cluster_prompts.py assign`` – place new prompts into saved clusters."""
+
+    args = parse_assign_cli(argv)
+    cluster_model = ClusterModel.load(args.model)
+
+    df = pd.read_csv(args.csv)
+    if "prompt" not in df.columns:
+        raise SystemExit("Input CSV must contain a 'prompt' column.")
+
+    embeddings_df = load_or_create_embeddings(
+        df["prompt"],
+        cache_path=args.cache,
+        model=cluster_model.embedding_model,
+        limits=_embed_limits(args),
+    )
+    result = cluster_model.assign(embeddings_df.values)
+
+    def name(lbl: int) -> str:
+        if lbl in cluster_model.meta:
+            return cluster_model.meta[lbl]["name"]
+        return "Noise / Outlier" if lbl == -1 else f"Cluster {lbl}"
+
+    args.output_csv.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        {
+            "prompt": df["prompt"],
+            "cluster": result.labels,
+            "name": [name(int(lbl)) for lbl in result.labels],
+            "distance": result.distances,
+            "flagged": result.flagged,
+        }
+    ).to_csv(args.output_csv, index=False)
+
+    kind = "ambiguous" if cluster_model.method == "kmeans" else "noise"
+    baseline = cluster_model.baseline_flagged_rate
+    print(
+        f"Assigned {len(df)} prompt(s) to {len(cluster_model.cluster_ids)} cluster(s) – "
+        f"{result.flagged_rate:.1%} {kind} (baseline {baseline:.1%}). "
+        f"Written to {args.output_csv}",
+        flush=True,
+    )
+    if result.flagged_rate > baseline + args.drift_tolerance:
+        print(
+            f"⚠️  Drift: {result.flagged_rate:.1%} of the new prompts are {kind}, "
+            f"more than {baseline:.1%} + {args.drift_tolerance:.1%} – consider rerunning the "
+            "full clustering.",
+            file=sys.stderr,
+        )
+        if args.fail_on_drift:
+            raise SystemExit(2)
+
+
 if __name__ == "__main__":
     # Guard the main block to allow safe import elsewhere.
-    main()
+    if sys.argv[1:2] == ["assign"]:
+        assign(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,139 @@
+"""Concurrent, rate‑limit‑aware embedding fetcher used by ``cluster_prompts.py``.
+
+Batches are sent through ``openai.AsyncOpenAI`` with a bounded number of
+requests in flight. Two token buckets keep the client under the account's
+requests‑per‑minute and tokens‑per‑minute limits. 429s, 5xx responses and
+connection errors are retried with jittered exponential backoff, and
+``Retry-After`` is honoured when the server sends one. Every finished batch
+is handed to an ``on_batch`` callback straight away, so callers can
+checkpoint it into the embedding cache before the rest of the run completes.
+
+Point ``OPENAI_BASE_URL`` at ``stub_openai_server.py`` to exercise the client
+without network access or API cost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from openai_retry import is_retryable, lazy_import_openai, retry_after
+
+OnBatch = Callable[[list[int], list[list[float]]], None]
+
+
+@dataclass
+class EmbedLimits:
+    """Client‑side limits for one embedding run (``None`` = unlimited)."""
+
+    batch_size: int = 100
+    concurrency: int = 4
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+    max_retries: int = 6
+    backoff_base: float = 0.5
+    backoff_cap: float = 30.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for rate limiting."""
+
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at *per_minute* / 60 per second."""
+
+    def __init__(self, per_minute: float | None):
+        self.rate = per_minute / 60.0 if per_minute else None
+        self.capacity = per_minute or 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.rate is None:
+            return
+        # A single request larger than the bucket waits for a full bucket.
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+async def embed_batches(
+    texts: Sequence[str],
+    model: str,
+    limits: EmbedLimits,
+    on_batch: OnBatch | None = None,
+) -> list[list[float]] | int:
+    """Embed *texts* and return the vectors in input order.
+
+    With *on_batch*, each batch is handed over as it arrives and not kept
+    here, so memory does not grow with the corpus; the number of texts
+    embedded is returned instead.
+    """
+
+    openai = lazy_import_openai()
+    client = openai.AsyncOpenAI(max_retries=0)  # retries are handled here
+
+    requests = TokenBucket(limits.requests_per_minute)
+    tokens = TokenBucket(limits.tokens_per_minute)
+    in_flight = asyncio.Semaphore(max(1, limits.concurrency))
+    results: list[list[float] | None] = [None] * len(texts) if on_batch is None else []
+
+    async def run_batch(start: int) -> None:
+        indices = list(range(start, min(start + limits.batch_size, len(texts))))
+        batch = [texts[i] for i in indices]
+        cost = sum(estimate_tokens(t) for t in batch)
+
+        for attempt in range(limits.max_retries + 1):
+            async with in_flight:
+                await requests.acquire(1)
+                await tokens.acquire(cost)
+                try:
+                    response = await client.embeddings.create(input=batch, model=model)
+                except Exception as exc:  # noqa: BLE001 – filtered below.
+                    if attempt == limits.max_retries or not is_retryable(openai, exc):
+                        raise
+                    error = exc
+                else:
+                    vectors = [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+                    if on_batch is not None:
+                        on_batch(indices, vectors)
+                    else:
+                        for i, vector in zip(indices, vectors):
+                            results[i] = vector
+                    return
+
+            # Full jitter, but never earlier than the server asked for.
+            delay = random.uniform(0, min(limits.backoff_cap, limits.backoff_base * 2**attempt))
+            delay = max(delay, retry_after(error) or 0.0)
+            await asyncio.sleep(delay)
+
+    try:
+        await asyncio.gather(*(run_batch(s) for s in range(0, len(texts), limits.batch_size)))
+    finally:
+        await client.close()
+
+    return len(texts) if on_batch is not None else results  # type: ignore[return-value]
+
+
+def embed_texts_concurrently(
+    texts: Sequence[str],
+    model: str,
+    limits: EmbedLimits | None = None,
+    on_batch: OnBatch | None = None,
+) -> list[list[float]] | int:
+    """Synchronous wrapper around :func:`embed_batches`."""
+
+    return asyncio.run(embed_batches(texts, model, limits or EmbedLimits(), on_batch))
@@ -0,0 +1,277 @@
+"""Append‑only, memory‑mapped embedding cache used by ``cluster_prompts.py``.
+
+The cache replaces the original single JSON dict of float lists. Vectors are
+keyed by *(model, text hash)* and stored per model:
+
+    <cache-dir>/
+      <model>/
+        meta.json     {"format": 1, "model": …, "dim": 1536, "dtype": "float32"}
+        vectors.bin   row‑major matrix, new rows are appended in place
+        scales.bin    int8 caches only: one float32 scale per row
+        index.txt     one text hash per line – line *n* describes matrix row *n*
+
+Vectors are stored as ``float32`` (default), ``float16`` (half the size,
+differences of ~1e‑3 on unit‑norm embeddings) or ``int8`` (a quarter,
+symmetric per‑row quantisation: ``row ≈ q * scale / 127``). The storage type
+is fixed when a model's cache is created; :meth:`EmbeddingCache.take` always
+returns float32.
+
+Reading the cache is a memory map plus one pass over ``index.txt``; adding
+vectors appends to both files instead of rewriting them. Vectors are written
+before their index lines, so a crash can at worst leave orphaned rows that are
+trimmed on the next open.
+
+The cache assumes a single writer at a time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+CACHE_FORMAT = 1
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize(mat: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Convert float vectors to the storage *dtype*; int8 also returns the
+    per‑row scales."""
+
+    mat = np.asarray(mat, dtype=np.float32)
+    if dtype != "int8":
+        return mat.astype(dtype), None
+    scales = np.abs(mat).max(axis=1)
+    scales[scales == 0] = 1.0
+    q = np.rint(mat / scales[:, None] * 127).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+
+def dequantize(stored: np.ndarray, scales: np.ndarray | None = None) -> np.ndarray:
+    """Inverse of :func:`quantize`, always float32."""
+
+    mat = np.asarray(stored, dtype=np.float32)
+    if scales is not None:
+        mat *= np.asarray(scales, dtype=np.float32)[:, None] / 127
+    return mat
+
+
+def text_hash(text: str) -> str:
+    """Stable 128‑bit hash of *text* used as the cache key."""
+
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _model_dirname(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+class EmbeddingCache:
+    """Embeddings for one model, backed by ``vectors.bin`` and ``index.txt``."""
+
+    def __init__(self, root: Path, model: str, dtype: str = "float32"):
+        self.model = model
+        self.dir = Path(root) / _model_dirname(model)
+        self.meta_path = self.dir / "meta.json"
+        self.vectors_path = self.dir / "vectors.bin"
+        self.scales_path = self.dir / "scales.bin"
+        self.index_path = self.dir / "index.txt"
+
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported cache dtype {dtype!r}")
+        self.dim: int | None = None
+        self.dtype = np.dtype(dtype)
+        self.rows: dict[str, int] = {}
+        self._matrix: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+
+        if self.meta_path.exists():
+            meta = json.loads(self.meta_path.read_text())
+            if meta.get("format") != CACHE_FORMAT:
+                raise SystemExit(
+                    f"Unsupported embedding cache format in {self.meta_path}: {meta.get('format')}"
+                )
+            self.dim = int(meta["dim"])
+            if meta["dtype"] != self.dtype.name and dtype != "float32":
+                print(
+                    f"⚠️  {self.dir} stores {meta['dtype']} vectors – ignoring the "
+                    f"requested {dtype}. Start a new cache directory to change it.",
+                    file=sys.stderr,
+                )
+            self.dtype = np.dtype(meta["dtype"])
+            self._load_index()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_index(self) -> None:
+        hashes = self.index_path.read_text().split() if self.index_path.exists() else []
+        row_bytes = self.dim * self.dtype.itemsize
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        n_rows = min(len(hashes), size // row_bytes)
+        if self.quantized:
+            scales_size = self.scales_path.stat().st_size if self.scales_path.exists() else 0
+            n_rows = min(n_rows, scales_size // 4)
+
+        # Trim whatever an interrupted append left behind.
+        if size != n_rows * row_bytes:
+            with self.vectors_path.open("r+b") as fh:
+                fh.truncate(n_rows * row_bytes)
+        if self.quantized and scales_size != n_rows * 4:
+            with self.scales_path.open("r+b") as fh:
+                fh.truncate(n_rows * 4)
+        if len(hashes) != n_rows:
+            self.index_path.write_text("".join(f"{h}\n" for h in hashes[:n_rows]))
+
+        self.rows = {h: i for i, h in enumerate(hashes[:n_rows])}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def lookup(self, hashes: Sequence[str]) -> np.ndarray:
+        """Return the matrix row for every hash (``-1`` when missing)."""
+
+        get = self.rows.get
+        return np.fromiter((get(h, -1) for h in hashes), dtype=np.int64, count=len(hashes))
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read‑only memory map over all cached vectors, in storage dtype."""
+
+        if self._matrix is None:
+            if not self.rows:
+                return np.empty((0, self.dim or 0), dtype=self.dtype)
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=self.dtype, mode="r", shape=(len(self.rows), self.dim)
+            )
+        return self._matrix
+
+    @property
+    def scales(self) -> np.ndarray | None:
+        """Per‑row scales of an int8 cache (``None`` otherwise)."""
+
+        if not self.quantized:
+            return None
+        if self._scales is None:
+            if not self.rows:
+                return np.empty(0, dtype=np.float32)
+            self._scales = np.memmap(
+                self.scales_path, dtype=np.float32, mode="r", shape=(len(self.rows),)
+            )
+        return self._scales
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Materialise the given rows as a float32 array."""
+
+        scales = self.scales
+        return dequantize(self.matrix[rows], None if scales is None else scales[rows])
+
+    # ------------------------------------------------------------------
+    # Appending
+    # ------------------------------------------------------------------
+
+    def append(self, hashes: Sequence[str], vectors: Iterable[Sequence[float]] | np.ndarray) -> None:
+        """Append new vectors; hashes that are already cached are ignored."""
+
+        mat = np.asarray(vectors, dtype=np.float32)
+        if mat.ndim != 2 or len(mat) != len(hashes):
+            raise ValueError("append() expects one vector per hash")
+
+        keep = [i for i, h in enumerate(hashes) if h not in self.rows]
+        keep = list({hashes[i]: i for i in keep}.values())  # de‑duplicate within the batch
+        if not keep:
+            return
+        mat = mat[keep]
+
+        if self.dim is None:
+            self.dim = int(mat.shape[1])
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self.meta_path.write_text(
+                json.dumps(
+                    {
+                        "format": CACHE_FORMAT,
+                        "model": self.model,
+                        "dim": self.dim,
+                        "dtype": self.dtype.name,
+                    }
+                )
+            )
+        elif mat.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {mat.shape[1]}")
+
+        stored, scales = quantize(mat, self.dtype.name)
+        with self.vectors_path.open("ab") as fh:
+            fh.write(np.ascontiguousarray(stored).tobytes())
+        if scales is not None:
+            with self.scales_path.open("ab") as fh:
+                fh.write(scales.tobytes())
+        new_hashes = [hashes[i] for i in keep]
+        with self.index_path.open("a") as fh:
+            fh.write("".join(f"{h}\n" for h in new_hashes))
+
+        start = len(self.rows)
+        for offset, h in enumerate(new_hashes):
+            self.rows[h] = start + offset
+        self._matrix = self._scales = None  # the memory maps no longer cover every row
+
+
+# ---------------------------------------------------------------------------
+# Legacy JSON cache
+# ---------------------------------------------------------------------------
+
+
+def migrate_json_cache(json_path: Path, cache: EmbeddingCache, batch_size: int = 10_000) -> int:
+    """Copy a legacy ``{text: vector}`` JSON cache into *cache*.
+
+    The JSON format carries no model name, so every vector is attributed to
+    ``cache.model``. Returns the number of vectors migrated.
+    """
+
+    legacy: dict[str, list[float]] = json.loads(Path(json_path).read_text())
+    items = list(legacy.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start : start + batch_size]
+        cache.append([text_hash(t) for t, _ in batch], [v for _, v in batch])
+    return len(items)
+
+
+def cache_root(cache_path: Path) -> Path:
+    """Directory behind a ``--cache`` value (``foo.json`` maps to ``foo/``)."""
+
+    cache_path = Path(cache_path)
+    return cache_path.with_suffix("") if cache_path.suffix == ".json" else cache_path
+
+
+def open_cache(cache_path: Path, model: str, dtype: str = "float32") -> EmbeddingCache:
+    """Open the cache for *model*, migrating a legacy JSON file once.
+
+    ``--cache foo.json`` (the old flag value) maps to the directory ``foo/``;
+    if ``foo.json`` still exists and the directory has nothing for *model*
+    yet, its contents are migrated.
+    """
+
+    cache_path = Path(cache_path)
+    cache = EmbeddingCache(cache_root(cache_path), model, dtype)
+
+    if cache_path.suffix == ".json" and cache_path.is_file() and not len(cache):
+        try:
+            n = migrate_json_cache(cache_path, cache)
+        except json.JSONDecodeError:  # pragma: no cover – unlikely.
+            print("⚠️  Legacy cache file is not valid JSON – ignoring.", file=sys.stderr)
+        else:
+            print(f"Migrated {n} embedding(s) from {cache_path} to {cache.dir}/", flush=True)
+    return cache
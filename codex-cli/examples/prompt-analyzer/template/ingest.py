@@ -0,0 +1,112 @@
+"""Chunked CSV ingestion with duplicate collapsing for ``cluster_prompts.py``.
+
+Prompt logs are often highly repetitive. The input CSV is read in chunks and
+every row is mapped to a *unique prompt*: rows with the same text (or, with
+``near_duplicates``, the same normalised text – case, Unicode form,
+punctuation and whitespace ignored) collapse into the first such row. The
+pipeline then embeds, clusters and plots the unique prompts only, using the
+per‑prompt row counts as weights, and broadcasts the labels back to the
+original rows at the end.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from embedding_cache import text_hash
+
+KEEP_COLUMNS = ("act", "prompt", "for_devs")
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Key used for near‑duplicate collapsing."""
+
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_PUNCT_RE.sub(" ", text).split())
+
+
+@dataclass
+class PromptTable:
+    """Unique prompts plus the mapping back to the input rows."""
+
+    unique: pd.DataFrame  # first row of every distinct prompt, RangeIndex
+    counts: np.ndarray  # input rows collapsed into each unique prompt
+    row_index: np.ndarray  # position in ``unique`` for every input row
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.row_index)
+
+
+def read_prompts(
+    path: Path, *, chunksize: int = 100_000, near_duplicates: bool = False
+) -> PromptTable:
+    """Read *path* chunk by chunk and collapse duplicate prompts."""
+
+    header = pd.read_csv(path, nrows=0).columns
+    if "prompt" not in header:
+        raise SystemExit("Input CSV must contain a 'prompt' column.")
+    usecols = [c for c in header if c in KEEP_COLUMNS]
+
+    position: dict[str, int] = {}
+    counts: list[int] = []
+    firsts: list[pd.DataFrame] = []
+    row_index: list[np.ndarray] = []
+
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        texts = chunk["prompt"].astype(str)
+        if near_duplicates:
+            texts = texts.map(normalize_prompt)
+
+        idx = np.empty(len(chunk), dtype=np.int64)
+        new_rows: list[int] = []
+        for i, key in enumerate(map(text_hash, texts)):
+            pos = position.get(key)
+            if pos is None:
+                pos = position[key] = len(counts)
+                counts.append(0)
+                new_rows.append(i)
+            counts[pos] += 1
+            idx[i] = pos
+
+        firsts.append(chunk.iloc[new_rows])
+        row_index.append(idx)
+
+    unique = pd.concat(firsts, ignore_index=True) if firsts else pd.DataFrame(columns=usecols)
+    return PromptTable(
+        unique=unique,
+        counts=np.asarray(counts, dtype=np.int64),
+        row_index=np.concatenate(row_index) if row_index else np.empty(0, dtype=np.int64),
+    )
+
+
+def write_row_labels(
+    path_in: Path,
+    path_out: Path,
+    row_labels: np.ndarray,
+    names: Sequence[str],
+    *,
+    chunksize: int = 100_000,
+) -> None:
+    """Stream *path_in* to *path_out* with ``cluster`` / ``cluster_name`` columns.
+
+    *names* holds one cluster name per input row.
+    """
+
+    Path(path_out).parent.mkdir(parents=True, exist_ok=True)
+    start = 0
+    for chunk in pd.read_csv(path_in, chunksize=chunksize):
+        stop = start + len(chunk)
+        chunk["cluster"] = row_labels[start:stop]
+        chunk["cluster_name"] = names[start:stop]
+        chunk.to_csv(path_out, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        start = stop
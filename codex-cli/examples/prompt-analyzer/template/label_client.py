@@ -0,0 +1,217 @@
+"""Concurrent, cached cluster labelling used by ``cluster_prompts.py``.
+
+Every cluster is described by the sample of example prompts shown to the chat
+model. Replies are cached on disk under a key derived from *(chat model,
+sorted hashes of those examples)*, so a rerun whose clusters did not change
+makes no LLM calls at all. Uncached clusters are sent through
+``openai.AsyncOpenAI`` with a bounded number of requests in flight, optionally
+several clusters per request (``batch_size``), and retried like embedding
+requests (see ``embed_client.py``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from embedding_cache import text_hash
+from openai_retry import is_retryable, lazy_import_openai, retry_after
+
+# Bump when the prompt below changes so stale cached labels are not reused.
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = "You are an expert analyst, competent in summarising text clusters succinctly."
+
+SINGLE_INSTRUCTIONS = (
+    "The following text snippets are all part of the same semantic cluster.\n"
+    "Please propose \n"
+    "1. A very short *title* for the cluster (≤ 4 words).\n"
+    "2. A concise 2–3 sentence *description* that explains the common theme.\n\n"
+    "Answer **strictly** as valid JSON with the keys 'name' and 'description'.\n\n"
+    "Snippets:\n"
+)
+
+BATCH_INSTRUCTIONS = (
+    "Below are several clusters of text snippets, each introduced by a "
+    "'### Cluster <id>' heading. For every cluster propose\n"
+    "1. A very short *title* for the cluster (≤ 4 words).\n"
+    "2. A concise 2–3 sentence *description* that explains the common theme.\n\n"
+    "Answer **strictly** as one valid JSON object that maps each cluster id (as a "
+    "string) to an object with the keys 'name' and 'description'.\n"
+)
+
+Label = dict[str, str]
+
+
+@dataclass
+class LabelLimits:
+    """Client‑side limits for one labelling run."""
+
+    concurrency: int = 4
+    batch_size: int = 1  # clusters per chat request
+    max_retries: int = 6
+    backoff_base: float = 0.5
+    backoff_cap: float = 30.0
+
+
+def cluster_key(chat_model: str, examples: Sequence[str]) -> str:
+    """Cache key for a cluster described by *examples*."""
+
+    payload = json.dumps([PROMPT_VERSION, chat_model, sorted(text_hash(t) for t in examples)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LabelCache:
+    """``{key: {"name": …, "description": …}}`` persisted as one JSON file."""
+
+    def __init__(self, path: Path | None):
+        self.path = Path(path) if path is not None else None
+        self.entries: dict[str, Label] = {}
+        if self.path is not None and self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except json.JSONDecodeError:
+                print(f"⚠️  Label cache {self.path} is not valid JSON – ignoring.", file=sys.stderr)
+
+    def get(self, key: str) -> Label | None:
+        return self.entries.get(key)
+
+    def put(self, key: str, label: Label) -> None:
+        self.entries[key] = label
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, ensure_ascii=False, indent=0))
+        os.replace(tmp, self.path)
+
+
+def _extract_json(reply: str) -> dict:
+    # The model may wrap the JSON object in markdown fences or add other
+    # text – take the substring between the first "{" and the last "}".
+    start, end = reply.find("{"), reply.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("No JSON object found in model reply.")
+    return json.loads(reply[start : end + 1])
+
+
+def _clean(data: dict) -> Label:
+    return {
+        "name": str(data.get("name", "Unnamed"))[:60],
+        "description": str(data.get("description", "")).strip(),
+    }
+
+
+def _messages(clusters: Sequence[tuple[int, list[str]]]) -> list[dict[str, str]]:
+    if len(clusters) == 1:
+        content = SINGLE_INSTRUCTIONS + "\n".join(f"- {t}" for t in clusters[0][1])
+    else:
+        content = BATCH_INSTRUCTIONS + "".join(
+            f"\n### Cluster {lbl}\n" + "\n".join(f"- {t}" for t in examples)
+            for lbl, examples in clusters
+        )
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": content}]
+
+
+async def label_batches(
+    clusters: Sequence[tuple[int, list[str]]],
+    chat_model: str,
+    limits: LabelLimits,
+) -> dict[int, Label]:
+    """Ask *chat_model* for a label per ``(cluster id, examples)`` pair.
+
+    Clusters whose request fails for good get a placeholder label (and are
+    therefore not cached by the caller).
+    """
+
+    openai = lazy_import_openai()
+    client = openai.AsyncOpenAI(max_retries=0)  # retries are handled here
+    in_flight = asyncio.Semaphore(max(1, limits.concurrency))
+    out: dict[int, Label] = {}
+
+    async def run_batch(batch: Sequence[tuple[int, list[str]]]) -> None:
+        for attempt in range(limits.max_retries + 1):
+            async with in_flight:
+                try:
+                    resp = await client.chat.completions.create(
+                        model=chat_model, messages=_messages(batch)
+                    )
+                    data = _extract_json(resp.choices[0].message.content.strip())
+                    if len(batch) == 1:
+                        out[batch[0][0]] = _clean(data)
+                    else:
+                        for lbl, _ in batch:
+                            entry = data.get(str(lbl))
+                            if isinstance(entry, dict):
+                                out[lbl] = _clean(entry)
+                            else:
+                                print(f"⚠️  No label returned for cluster {lbl}.", file=sys.stderr)
+                    return
+                except Exception as exc:  # noqa: BLE001 – network / runtime errors.
+                    if attempt == limits.max_retries or not is_retryable(openai, exc):
+                        ids = ", ".join(str(lbl) for lbl, _ in batch)
+                        print(f"⚠️  Failed to label cluster(s) {ids}: {exc}", file=sys.stderr)
+                        return
+                    error = exc
+
+            delay = random.uniform(0, min(limits.backoff_cap, limits.backoff_base * 2**attempt))
+            delay = max(delay, retry_after(error) or 0.0)
+            await asyncio.sleep(delay)
+
+    size = max(1, limits.batch_size)
+    try:
+        await asyncio.gather(
+            *(run_batch(clusters[s : s + size]) for s in range(0, len(clusters), size))
+        )
+    finally:
+        await client.close()
+    return out
+
+
+def label_with_cache(
+    clusters: dict[int, list[str]],
+    chat_model: str,
+    *,
+    limits: LabelLimits | None = None,
+    cache_path: Path | None = None,
+) -> dict[int, Label]:
+    """Labels for every cluster, from *cache_path* where possible."""
+
+    cache = LabelCache(cache_path)
+    keys = {lbl: cluster_key(chat_model, examples) for lbl, examples in clusters.items()}
+
+    out: dict[int, Label] = {}
+    todo: list[tuple[int, list[str]]] = []
+    for lbl, examples in clusters.items():
+        cached = cache.get(keys[lbl])
+        if cached is not None:
+            out[lbl] = cached
+        else:
+            todo.append((lbl, examples))
+
+    if todo:
+        print(
+            f"Labelling {len(todo)} cluster(s) with {chat_model} "
+            f"({len(out)} cached)…",
+            flush=True,
+        )
+        fresh = asyncio.run(label_batches(todo, chat_model, limits or LabelLimits()))
+        for lbl, label in fresh.items():
+            cache.put(keys[lbl], label)
+            out[lbl] = label
+        cache.save()
+    elif out:
+        print(f"All {len(out)} cluster label(s) served from cache.", flush=True)
+
+    for lbl, _ in todo:
+        out.setdefault(lbl, {"name": f"Cluster {lbl}", "description": "<LLM call failed>"})
+    return out
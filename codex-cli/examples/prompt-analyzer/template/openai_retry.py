@@ -0,0 +1,40 @@
+"""OpenAI import and retry helpers shared by ``embed_client.py`` and ``label_client.py``.
+
+The ``openai`` package is imported lazily so the rest of the pipeline (and
+``--help``) works without it. 429s, 5xx responses and connection errors count
+as retryable; ``Retry-After`` is read from the error's response when the
+server sends one.
+"""
+
+from __future__ import annotations
+
+
+def lazy_import_openai():
+    try:
+        import openai  # type: ignore
+
+        return openai
+    except ImportError as exc:  # pragma: no cover – we do not test missing deps.
+        raise SystemExit(
+            "The 'openai' package is required but not installed.\n"
+            "Run 'pip install openai' and try again."
+        ) from exc
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait, or ``None``."""
+
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(openai, exc: Exception) -> bool:
+    """Whether *exc* is a rate limit, connection error or 5xx worth retrying."""
+
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
@@ -0,0 +1,142 @@
+"""2‑D projection of the embedding matrix for the scatter plot.
+
+Backends (``--projection``):
+
+* ``tsne``     – scikit‑learn t‑SNE on the raw vectors (the original plot)
+* ``opentsne`` – PCA to 50 dimensions, then FFT‑accelerated t‑SNE from
+  ``openTSNE`` (``pip install openTSNE``)
+* ``umap``     – PCA to 50 dimensions, then ``umap-learn``
+* ``pca``      – the first two principal components; instant, but crude
+* ``auto``     – ``opentsne`` or ``umap`` when installed, else ``tsne``
+
+Corpora larger than ``max_points`` are subsampled per cluster first, so every
+cluster – including small ones and the noise label – stays visible.
+
+Coordinates are cached as ``<cache-dir>/projections/<key>.npz`` where the key
+covers the projected vectors and every parameter, so re‑rendering the plots
+of an unchanged corpus skips the projection entirely.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+BACKENDS = ("auto", "tsne", "opentsne", "umap", "pca")
+PCA_DIMS = 50
+MIN_PER_CLUSTER = 50
+
+
+def resolve_backend(backend: str) -> str:
+    if backend == "auto":
+        for name, module in (("opentsne", "openTSNE"), ("umap", "umap")):
+            if importlib.util.find_spec(module) is not None:
+                return name
+        return "tsne"
+    module = {"opentsne": "openTSNE", "umap": "umap"}.get(backend)
+    if module and importlib.util.find_spec(module) is None:
+        package = {"openTSNE": "openTSNE", "umap": "umap-learn"}[module]
+        raise SystemExit(
+            f"The '{package}' package is required for --projection {backend} but not installed."
+        )
+    return backend
+
+
+def stratified_sample(labels: np.ndarray, max_points: int, seed: int = 42) -> np.ndarray:
+    """Sorted row indices: every cluster keeps its share of *max_points*
+    (at least ``MIN_PER_CLUSTER`` rows, or all of them if it is smaller)."""
+
+    n = len(labels)
+    if not max_points or n <= max_points:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    picked = []
+    for lbl in np.unique(labels):
+        members = np.flatnonzero(labels == lbl)
+        quota = max(MIN_PER_CLUSTER, round(max_points * len(members) / n))
+        picked.append(members if quota >= len(members) else rng.choice(members, quota, replace=False))
+    return np.sort(np.concatenate(picked))
+
+
+def _reduce(matrix: np.ndarray) -> np.ndarray:
+    if matrix.shape[1] <= PCA_DIMS or len(matrix) <= PCA_DIMS:
+        return matrix
+    from sklearn.decomposition import PCA  # type: ignore – heavy, lazy import.
+
+    return PCA(n_components=PCA_DIMS, random_state=42).fit_transform(matrix)
+
+
+def _project(matrix: np.ndarray, backend: str) -> np.ndarray:
+    perplexity = min(30, len(matrix) // 3)
+
+    if backend == "tsne":
+        from sklearn.manifold import TSNE  # type: ignore – heavy, lazy import.
+
+        tsne = TSNE(n_components=2, perplexity=perplexity, random_state=42, init="random")
+        return tsne.fit_transform(matrix)
+    if backend == "opentsne":
+        from openTSNE import TSNE  # type: ignore – optional dependency.
+
+        tsne = TSNE(
+            n_components=2,
+            perplexity=perplexity,
+            negative_gradient_method="fft",
+            n_jobs=-1,
+            random_state=42,
+        )
+        return np.asarray(tsne.fit(_reduce(matrix)))
+    if backend == "umap":
+        import umap  # type: ignore – optional dependency.
+
+        return umap.UMAP(n_components=2, random_state=42).fit_transform(_reduce(matrix))
+
+    from sklearn.decomposition import PCA  # type: ignore – heavy, lazy import.
+
+    return PCA(n_components=2, random_state=42).fit_transform(matrix)
+
+
+def _cache_key(matrix: np.ndarray, backend: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([backend, PCA_DIMS, list(matrix.shape), str(matrix.dtype)]).encode())
+    digest.update(np.ascontiguousarray(matrix).data)
+    return digest.hexdigest()
+
+
+def project_2d(
+    matrix: np.ndarray,
+    labels: np.ndarray,
+    *,
+    backend: str = "auto",
+    max_points: int = 20_000,
+    cache_dir: Path | None = None,
+) -> tuple[np.ndarray, np.ndarray, str]:
+    """Return ``(xy, rows, backend)``: coordinates for ``matrix[rows]`` and
+    the backend that produced them."""
+
+    backend = resolve_backend(backend)
+    rows = stratified_sample(labels, max_points)
+    sub = np.asarray(matrix[rows], dtype=np.float32)
+
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / "projections" / f"{_cache_key(sub, backend)}.npz"
+        if path.exists():
+            print(f"2‑D projection ({backend}) loaded from cache.", flush=True)
+            return np.load(path)["xy"], rows, backend
+
+    if len(rows) < len(matrix):
+        print(f"Projecting {len(rows)} of {len(matrix)} prompts with {backend}…", flush=True)
+    xy = _project(sub, backend).astype(np.float32)
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, xy=xy)
+        os.replace(tmp, path)
+    return xy, rows, backend
@@ -0,0 +1,89 @@
+"""Linear dimensionality reduction of the embedding matrix.
+
+Both methods are stored as one affine map, ``(x - mean) @ components.T``, so
+the cluster model can apply the same reduction to new prompts:
+
+* ``pca``    – principal components fitted on a random sample of at most
+  ``fit_sample`` rows (scikit‑learn)
+* ``random`` – Gaussian random projection (Johnson–Lindenstrauss); nothing to
+  fit, distances are preserved in expectation
+
+:func:`reduce_rows` reads the source a block at a time, so the full‑width
+float32 matrix never has to exist in memory.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+METHODS = ("pca", "random")
+
+
+@dataclass
+class Reducer:
+    method: str
+    mean: np.ndarray  # (dim,)
+    components: np.ndarray  # (n_components, dim)
+
+    @property
+    def n_components(self) -> int:
+        return len(self.components)
+
+    def transform(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        return (block - self.mean) @ self.components.T
+
+
+def fit_reducer(
+    sample: np.ndarray, n_components: int, method: str = "pca", *, seed: int = 42
+) -> Reducer:
+    """Fit a reducer to *n_components* dimensions on *sample* rows."""
+
+    sample = np.asarray(sample, dtype=np.float32)
+    dim = sample.shape[1]
+    if method == "random":
+        rng = np.random.default_rng(seed)
+        components = rng.standard_normal((n_components, dim)).astype(np.float32)
+        components /= np.sqrt(n_components)
+        return Reducer(method, np.zeros(dim, dtype=np.float32), components)
+
+    from sklearn.decomposition import PCA  # type: ignore – heavy, lazy import.
+
+    n_components = min(n_components, *sample.shape)
+    pca = PCA(n_components=n_components, random_state=seed).fit(sample)
+    return Reducer(
+        method,
+        pca.mean_.astype(np.float32),
+        pca.components_.astype(np.float32),
+    )
+
+
+def reduce_rows(
+    take: Callable[[np.ndarray], np.ndarray],
+    rows: np.ndarray,
+    n_components: int,
+    method: str = "pca",
+    *,
+    fit_sample: int = 20_000,
+    block: int = 16_384,
+    seed: int = 42,
+) -> tuple[np.ndarray, Reducer]:
+    """Reduce the vectors ``take(rows)`` blockwise.
+
+    *take* maps row ids to a float32 block (e.g. ``EmbeddingCache.take``).
+    Returns the reduced float32 matrix and the fitted reducer.
+    """
+
+    rng = np.random.default_rng(seed)
+    sample_rows = rows
+    if len(rows) > fit_sample:
+        sample_rows = np.sort(rng.choice(rows, size=fit_sample, replace=False))
+    reducer = fit_reducer(take(sample_rows), n_components, method, seed=seed)
+
+    out = np.empty((len(rows), reducer.n_components), dtype=np.float32)
+    for start in range(0, len(rows), block):
+        out[start : start + block] = reducer.transform(take(rows[start : start + block]))
+    return out, reducer
@@ -0,0 +1,120 @@
+"""Checkpointed, profiled pipeline stages for ``cluster_prompts.py``.
+
+:class:`StageRunner` runs each stage of the pipeline as
+``runner.run(name, inputs, fn)``. The stage key hashes *inputs* (file
+digests, relevant CLI options) together with the key of the previous stage,
+so changing anything upstream invalidates everything after it. With a
+checkpoint directory set, a stage's return value is pickled to
+``<dir>/<name>-<key>.pkl`` once it succeeds, replacing older checkpoints of
+that stage. A rerun with the same inputs loads it instead of recomputing, so
+a crash in a late stage resumes from the last good one.
+
+Every stage records its wall time and peak resident set size. On Linux the
+peak is reset before each stage (``/proc/self/clear_refs``), elsewhere it is
+the process‑wide peak so far.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def file_digest(path: Path, chunk: int = 1 << 20) -> str:
+    """blake2b digest of the file at *path*."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    with Path(path).open("rb") as fh:
+        while block := fh.read(chunk):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes vs KiB
+
+
+@dataclass
+class StageTiming:
+    name: str
+    seconds: float
+    peak_rss_mb: float
+    from_checkpoint: bool
+
+
+class StageRunner:
+    """Run named stages with optional checkpointing and record their cost."""
+
+    def __init__(self, checkpoint_dir: Path | None = None, *, resume: bool = True):
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir is not None else None
+        self.resume = resume
+        self.timings: list[StageTiming] = []
+        self._key = ""
+
+    def _stage_key(self, name: str, inputs: dict[str, Any]) -> str:
+        payload = json.dumps([self._key, name, inputs], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def run(self, name: str, inputs: dict[str, Any], fn: Callable[[], T], *, checkpoint: bool = True) -> T:
+        """Return ``fn()``, or the checkpointed result for the same inputs.
+
+        Stages with ``checkpoint=False`` (e.g. ones that only write files) are
+        always executed but still timed.
+        """
+
+        self._key = key = self._stage_key(name, inputs)
+        path = None
+        if checkpoint and self.checkpoint_dir is not None:
+            path = self.checkpoint_dir / f"{name}-{key}.pkl"
+
+        _reset_peak_rss()
+        start = time.perf_counter()
+        if path is not None and self.resume and path.exists():
+            with path.open("rb") as fh:
+                result = pickle.load(fh)
+            print(f"↻ {name}: resumed from checkpoint", flush=True)
+            cached = True
+        else:
+            result = fn()
+            cached = False
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                with tmp.open("wb") as fh:
+                    pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+                # Only the newest checkpoint of a stage is kept.
+                for stale in self.checkpoint_dir.glob(f"{name}-*.pkl"):
+                    if stale != path:
+                        stale.unlink(missing_ok=True)
+
+        self.timings.append(
+            StageTiming(name, time.perf_counter() - start, _peak_rss_mb(), cached)
+        )
+        return result
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Local stand‑in for the OpenAI endpoints used by ``cluster_prompts.py``.
+
+Serves ``POST /v1/embeddings`` and ``POST /v1/chat/completions`` with
+deterministic answers, so the pipeline can be run and tested offline:
+
+    python stub_openai_server.py --port 8765 --fail-rate 0.1 &
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub \
+        python cluster_prompts.py --cache .cache/stub
+
+Embeddings are hashed bag‑of‑words vectors (similar prompts end up close to
+each other), chat replies name a cluster after its most frequent words.
+``--fail-rate`` answers that share of requests with ``429`` + ``Retry-After``
+to exercise retry handling. ``GET /stats`` returns request counters.
+
+For in‑process use (e.g. from a test) call :func:`start_stub_server`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {
+    "a", "an", "and", "as", "be", "by", "for", "i", "in", "is", "it", "me", "my",
+    "of", "on", "or", "the", "to", "will", "with", "you", "your", "want", "act",
+}
+
+
+def stub_embedding(text: str, dim: int) -> list[float]:
+    """Signed feature hashing of the lower‑cased words, L2‑normalised."""
+
+    vec = np.zeros(dim, dtype=np.float64)
+    for word in _WORD_RE.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        vec[0] = 1.0
+        norm = 1.0
+    return (vec / norm).tolist()
+
+
+_CLUSTER_HEADING_RE = re.compile(r"^### Cluster (-?\d+)\s*$", re.MULTILINE)
+
+
+def _describe(snippets: str) -> dict[str, str]:
+    words = Counter(
+        w for w in _WORD_RE.findall(snippets.lower()) if w not in _STOPWORDS and len(w) > 3
+    )
+    top = [w for w, _ in words.most_common(3)] or ["misc"]
+    return {
+        "name": " ".join(w.title() for w in top[:2]),
+        "description": f"Prompts that mostly mention {', '.join(top)}.",
+    }
+
+
+def stub_cluster_reply(content: str) -> str:
+    """JSON name/description derived from the snippets in a labelling prompt.
+
+    Batched prompts (one ``### Cluster <id>`` section per cluster) get one
+    object per cluster id.
+    """
+
+    parts = _CLUSTER_HEADING_RE.split(content)
+    if len(parts) > 1:
+        return json.dumps({lbl: _describe(text) for lbl, text in zip(parts[1::2], parts[2::2])})
+    snippets = content.split("Snippets:", 1)[-1]
+    return json.dumps(_describe(snippets))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+
+    def log_message(self, *args) -> None:  # keep test output quiet
+        pass
+
+    def _send(self, status: int, payload: dict, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.server.lock:
+                self._send(200, dict(self.server.stats))
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        route = self.path.rstrip("/").rsplit("/", 1)[-1]
+
+        with self.server.lock:
+            self.server.stats[f"{route}_requests"] += 1
+            fail = self.server.rng.random() < self.server.fail_rate
+            if fail:
+                self.server.stats[f"{route}_429"] += 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if fail:
+            self._send(
+                429,
+                {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}},
+                {"Retry-After": "0.05"},
+            )
+            return
+
+        if route == "embeddings":
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            tokens = sum(max(1, len(t) // 4) for t in inputs)
+            self._send(
+                200,
+                {
+                    "object": "list",
+                    "model": body.get("model", "stub"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": stub_embedding(t, self.server.dim)}
+                        for i, t in enumerate(inputs)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                },
+            )
+        elif route == "completions":
+            content = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            self._send(
+                200,
+                {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": stub_cluster_reply(content)},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                },
+            )
+        else:
+            self._send(404, {"error": {"message": f"unknown route {self.path}"}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, *, dim: int = 64, fail_rate: float = 0.0, latency: float = 0.0, seed: int = 0):
+        super().__init__(address, _Handler)
+        self.dim = dim
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Counter[str] = Counter()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_stub_server(port: int = 0, **options) -> StubServer:
+    """Start a stub server on a background thread; ``server.base_url`` is ready to use."""
+
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve stub OpenAI embedding/chat endpoints.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=64, help="Embedding dimensionality.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), dim=args.dim, fail_rate=args.fail_rate, latency=args.latency)
+    print(f"Stub OpenAI API on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Tests for the embedding client, run against ``stub_openai_server.py``.
+
+    python -m pytest -q test_embed_client.py
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from cluster_prompts import load_or_create_embeddings
+from embed_client import EmbedLimits, embed_texts_concurrently
+from embedding_cache import open_cache, text_hash
+from stub_openai_server import start_stub_server, stub_embedding
+
+MODEL = "text-embedding-3-small"
+FAST_RETRIES = dict(backoff_base=0.01, backoff_cap=0.05)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = start_stub_server(dim=16)
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def texts(n: int) -> list[str]:
+    return [f"prompt number {i} about topic {i % 7}" for i in range(n)]
+
+
+def test_vectors_come_back_in_input_order(stub):
+    inputs = texts(45)
+    vectors = embed_texts_concurrently(inputs, MODEL, EmbedLimits(batch_size=10, concurrency=3))
+
+    assert vectors == [stub_embedding(t, 16) for t in inputs]
+    assert stub.stats["embeddings_requests"] == 5
+
+
+def test_rate_limited_batches_are_retried(stub):
+    stub.fail_rate = 0.5
+    inputs = texts(60)
+    vectors = embed_texts_concurrently(inputs, MODEL, EmbedLimits(batch_size=5, max_retries=20, **FAST_RETRIES))
+
+    assert stub.stats["embeddings_429"] > 0
+    assert vectors == [stub_embedding(t, 16) for t in inputs]
+
+
+def test_token_bucket_delays_requests_past_the_limit(stub):
+    # 40-character prompts cost 10 tokens; a 1200 tokens/minute bucket holds
+    # 120 of them, and refills at 20 tokens/s.
+    inputs = [f"{i:04d}".ljust(40, "x") for i in range(121)]
+    started = time.monotonic()
+    embed_texts_concurrently(inputs, MODEL, EmbedLimits(batch_size=10, tokens_per_minute=1200))
+
+    assert time.monotonic() - started >= 0.4
+
+
+def test_on_batch_streams_vectors_without_keeping_them(stub):
+    seen: dict[int, list[float]] = {}
+
+    def on_batch(indices, vectors):
+        seen.update(zip(indices, vectors))
+
+    inputs = texts(33)
+    result = embed_texts_concurrently(inputs, MODEL, EmbedLimits(batch_size=8), on_batch)
+
+    assert result == len(inputs)
+    assert [seen[i] for i in range(len(inputs))] == [stub_embedding(t, 16) for t in inputs]
+
+
+def test_interrupted_run_resumes_from_the_cache(stub, tmp_path):
+    prompts = texts(40)
+    cache = open_cache(tmp_path / "cache", MODEL)
+
+    def store_then_go_offline(indices, vectors):
+        cache.append([text_hash(prompts[i]) for i in indices], vectors)
+        stub.fail_rate = 1.0  # every later request is rejected
+
+    with pytest.raises(openai.RateLimitError):
+        embed_texts_concurrently(
+            prompts, MODEL, EmbedLimits(batch_size=10, concurrency=1, max_retries=0), store_then_go_offline
+        )
+
+    stub.fail_rate = 0.0
+    before = stub.stats["embeddings_requests"]
+    frame = load_or_create_embeddings(
+        pd.Series(prompts), cache_path=tmp_path / "cache", model=MODEL, limits=EmbedLimits(batch_size=10)
+    )
+
+    assert stub.stats["embeddings_requests"] - before == 3  # only the batches that were lost
+    expected = np.array([stub_embedding(t, 16) for t in prompts], dtype=np.float32)
+    np.testing.assert_allclose(frame.to_numpy(), expected, rtol=1e-6)
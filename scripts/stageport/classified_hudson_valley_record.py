@@ -4,14 +4,11 @@ from __future__ import annotations
 import argparse
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import List, Mapping, Optional
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.platypus import ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer
+
+from stageport_pdf import Document, StyleSpec, Theme, build, bullets, fill_template, paragraph, spacer
 
 
 @dataclass
@@ -102,99 +99,69 @@ USE_LIMITATION = (
 DEFAULT_OUTPUT = Path("Classified_Hudson_Valley_Ballet_Bardavon_2002_2006.pdf")
 
 
-def build_styles() -> dict:
-    pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
-    styles = getSampleStyleSheet()
-    styles.add(
-        ParagraphStyle(
-            name="Title",
-            parent=styles["Title"],
-            fontName="HeiseiMin-W3",
-            leading=22,
-            spaceAfter=8,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Subtitle",
-            parent=styles["Heading2"],
-            fontName="HeiseiMin-W3",
-            leading=16,
-            spaceAfter=10,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Body",
-            parent=styles["BodyText"],
-            fontName="HeiseiMin-W3",
-            leading=15,
-            spaceAfter=8,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="SectionHeader",
-            parent=styles["Heading3"],
-            fontName="HeiseiMin-W3",
-            spaceBefore=6,
-            spaceAfter=4,
-        )
-    )
-    return styles
-
-
-def build_bullet_list(items: Iterable[str], styles: dict) -> ListFlowable:
-    bullet_items = [ListItem(Paragraph(text, styles["Body"]), leftIndent=10) for text in items]
-    return ListFlowable(bullet_items, bulletType="bullet", start="•", leftIndent=14)
-
-
-def build_story(styles: dict) -> list:
-    story: list = []
-    story.append(Paragraph(TITLE, styles["Title"]))
-    story.append(Paragraph(SUBTITLE, styles["Subtitle"]))
-    story.append(Paragraph(METHOD_LINE, styles["Body"]))
-
-    story.append(Paragraph("Institutional Spine", styles["SectionHeader"]))
-    for paragraph in INSTITUTIONAL_SPINE:
-        story.append(Paragraph(paragraph, styles["Body"]))
-    story.append(build_bullet_list(OWNERSHIP_LINEAGE.bullets, styles))
-    story.append(Paragraph(CURRICULUM_NOTE, styles["Body"]))
-
-    story.append(Paragraph(PRIMARY_WORK_NODE.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(PRIMARY_WORK_NODE.bullets, styles))
-
-    story.append(Paragraph(NAMED_ADULTS.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(NAMED_ADULTS.bullets, styles))
-
-    story.append(Paragraph(PEERS.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(PEERS.bullets, styles))
-
-    story.append(Paragraph("Key Structural Event", styles["SectionHeader"]))
-    story.append(Paragraph(KEY_EVENT, styles["Body"]))
+# Per-document fields for bulk generation (stageport_bulk.py); the defaults
+# are the content above.
+TEMPLATE_FIELDS = {
+    "title": TITLE,
+    "subtitle": SUBTITLE,
+    "method_line": METHOD_LINE,
+    "institutional_spine": INSTITUTIONAL_SPINE,
+    "ownership_lineage": OWNERSHIP_LINEAGE.bullets,
+    "curriculum_note": CURRICULUM_NOTE,
+    "primary_work_node": PRIMARY_WORK_NODE.bullets,
+    "named_adults": NAMED_ADULTS.bullets,
+    "peers": PEERS.bullets,
+    "key_event": KEY_EVENT,
+    "evidence_status": EVIDENCE_STATUS.bullets,
+    "use_limitation": USE_LIMITATION,
+}
+
+THEME = Theme(
+    styles=(
+        # Replaces the sample "Title" style.
+        StyleSpec.of("Title", "Title", leading=22, spaceAfter=8),
+        StyleSpec.of("Subtitle", "Heading2", leading=16, spaceAfter=10),
+        StyleSpec.of("Body", "BodyText", leading=15, spaceAfter=8),
+        StyleSpec.of("SectionHeader", "Heading3", spaceBefore=6, spaceAfter=4),
+    ),
+    margins=(0.5, 0.5, 0.6, 0.6),
+)
 
-    story.append(Paragraph(EVIDENCE_STATUS.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(EVIDENCE_STATUS.bullets, styles))
 
-    story.append(Paragraph("Use Limitation", styles["SectionHeader"]))
-    story.append(Paragraph(USE_LIMITATION, styles["Body"]))
-    story.append(Spacer(1, 0.1 * inch))
-    return story
+def build_document(fields: Optional[Mapping[str, object]] = None) -> Document:
+    """Describe the record as renderable blocks, with *fields* (see
+    ``TEMPLATE_FIELDS``) replacing the default content."""
+
+    f = fill_template(TEMPLATE_FIELDS, fields)
+    blocks = [
+        paragraph(f["title"], "Title"),
+        paragraph(f["subtitle"], "Subtitle"),
+        paragraph(f["method_line"]),
+        paragraph("Institutional Spine", "SectionHeader"),
+        *(paragraph(text) for text in f["institutional_spine"]),
+        bullets(f["ownership_lineage"]),
+        paragraph(f["curriculum_note"]),
+    ]
+    for section, key in (
+        (PRIMARY_WORK_NODE, "primary_work_node"),
+        (NAMED_ADULTS, "named_adults"),
+        (PEERS, "peers"),
+    ):
+        blocks += [paragraph(section.title, "SectionHeader"), bullets(f[key])]
+    blocks += [
+        paragraph("Key Structural Event", "SectionHeader"),
+        paragraph(f["key_event"]),
+        paragraph(EVIDENCE_STATUS.title, "SectionHeader"),
+        bullets(f["evidence_status"]),
+        paragraph("Use Limitation", "SectionHeader"),
+        paragraph(f["use_limitation"]),
+        spacer(0.1 * inch),
+    ]
+    return Document(THEME, blocks, title=f["title"])
 
 
 def create_pdf(output_path: Path) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    styles = build_styles()
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=letter,
-        leftMargin=0.5 * inch,
-        rightMargin=0.5 * inch,
-        topMargin=0.6 * inch,
-        bottomMargin=0.6 * inch,
-    )
-    doc.build(build_story(styles))
-    return output_path
+    return build(build_document(), output_path)[0]
 
 
 def parse_args() -> argparse.Namespace:
@@ -208,13 +175,21 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OUTPUT,
         help="Destination path for the generated PDF (directories will be created).",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render even when an identical PDF already exists at the destination.",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    pdf_path = create_pdf(args.output)
-    print(f"Created CLASSIFIED record at {pdf_path.resolve()}")
+    pdf_path, rendered = build(build_document(), args.output, force=args.force)
+    if rendered:
+        print(f"Created CLASSIFIED record at {pdf_path.resolve()}")
+    else:
+        print(f"CLASSIFIED record at {pdf_path.resolve()} is up to date")
 
 
 if __name__ == "__main__":
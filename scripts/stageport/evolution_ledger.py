@@ -0,0 +1,409 @@
+"""Buffered, rotating evaluation ledger with a queryable sidecar index.
+
+The ledger stays plain JSONL so existing tools can keep tailing it, but
+writes are batched and the file is split into size-bounded segments:
+
+* ``ledger.jsonl``         – the active segment, appended to
+* ``ledger.000001.jsonl``  – sealed segments, oldest first
+* ``ledger.index.sqlite``  – one row per entry: segment, byte offset and
+  the fields we query by (user, curriculum path, credential level, score,
+  timestamp)
+
+Appends are buffered in memory and flushed when ``flush_every`` entries are
+waiting or ``flush_interval`` seconds have passed, whichever comes first; the
+segment is fsync'd at most every ``fsync_interval`` seconds and on close.
+Queries such as "latest score per curriculum" or "MASTER runs this week" hit
+the index and read only the matching lines. If the process dies between a
+segment write and the index commit, the next open indexes the missing tail.
+
+Several processes may write the same ledger. Every flush, rotation and query
+holds an exclusive ``flock`` on ``ledger.lock``; a writer first reopens the
+active segment if another one rotated it away and indexes any tail it left
+unindexed, then takes its offsets from the segment's current size. Without
+``fcntl`` (Windows) only one process may write a ledger at a time.
+
+    python evolution_ledger.py metadata/ledger.jsonl latest
+    python evolution_ledger.py metadata/ledger.jsonl runs --level MASTER --since 7d
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: single writer only
+    fcntl = None
+
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    timestamp REAL,
+    user_id TEXT,
+    curriculum TEXT,
+    credential_level TEXT,
+    overall_score REAL,
+    PRIMARY KEY (segment, offset)
+);
+CREATE INDEX IF NOT EXISTS entries_level_time ON entries (credential_level, timestamp);
+CREATE INDEX IF NOT EXISTS entries_user_time ON entries (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS entries_curriculum_time ON entries (curriculum, timestamp);
+"""
+
+
+def _index_row(segment: str, offset: int, length: int, entry: dict) -> tuple:
+    return (
+        segment,
+        offset,
+        length,
+        entry.get("timestamp"),
+        entry.get("user_id"),
+        entry.get("path"),
+        entry.get("credential_level"),
+        entry.get("overall_score"),
+    )
+
+
+class Ledger:
+    """Append-only JSONL ledger split into segments, with a SQLite index."""
+
+    def __init__(
+        self,
+        path: str | Path = "metadata/ledger.jsonl",
+        *,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        flush_every: int = 256,
+        flush_interval: float = 1.0,
+        fsync_interval: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_handle = self.path.with_suffix(".lock").open("ab")
+        self._buffer: List[dict] = []
+        self._handle = self.path.open("ab")
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+
+        self._db = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        with self._exclusive():
+            self._catch_up(self.segments())
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_suffix(".index.sqlite")
+
+    def segments(self) -> List[Path]:
+        """Sealed segments oldest first, then the active one."""
+
+        pattern = re.compile(re.escape(self.path.stem) + r"\.(\d+)" + re.escape(self.path.suffix) + "$")
+        sealed = sorted(
+            (int(match.group(1)), candidate)
+            for candidate in self.path.parent.iterdir()
+            if (match := pattern.match(candidate.name))
+        )
+        return [candidate for _, candidate in sealed] + [self.path]
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the thread lock and the cross-process ``ledger.lock`` (re-entrant)."""
+
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+
+    def _follow(self) -> None:
+        """Reopen the active segment if another writer rotated it away."""
+
+        try:
+            active = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            active = None
+        if active != os.fstat(self._handle.fileno()).st_ino:
+            self._handle.close()
+            self._handle = self.path.open("ab")
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._handle.close()
+        sealed = self.segments()[:-1]
+        number = int(sealed[-1].name.split(".")[-2]) + 1 if sealed else 1
+        target = self.path.with_name(f"{self.path.stem}.{number:06d}{self.path.suffix}")
+        os.replace(self.path, target)
+        with self._db:
+            self._db.execute("UPDATE entries SET segment = ? WHERE segment = ?", (target.name, self.path.name))
+        self._handle = self.path.open("ab")
+
+    def _sync(self) -> None:
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _catch_up(self, segments: Iterable[Path]) -> None:
+        """Index entries that reached *segments* but not the index."""
+
+        for segment in segments:
+            if not segment.exists():
+                continue
+            (end,) = self._db.execute(
+                "SELECT COALESCE(MAX(offset + length), 0) FROM entries WHERE segment = ?", (segment.name,)
+            ).fetchone()
+            if segment.stat().st_size <= end:
+                continue
+            rows = []
+            with segment.open("rb") as handle:
+                handle.seek(end)
+                offset = end
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write
+                    try:
+                        rows.append(_index_row(segment.name, offset, len(line), json.loads(line)))
+                    except ValueError:
+                        pass
+                    offset += len(line)
+            self._index(rows)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, entry: dict) -> None:
+        """Queue *entry*; it is written on the next flush."""
+
+        self.extend((entry,))
+
+    def extend(self, entries: Iterable[dict]) -> None:
+        """Queue all of *entries* at once; a large batch is flushed in one write."""
+
+        with self._lock:
+            if self._closed:
+                raise ValueError("Ledger is closed")
+            self._buffer.extend(entries)
+            if len(self._buffer) >= self.flush_every:
+                self.flush()
+            elif self._buffer and self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="ledger-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._wake.wait(self.flush_interval):
+            with self._lock:
+                if self._buffer:
+                    self.flush()
+
+    def flush(self, *, fsync: bool = False) -> int:
+        """Write buffered entries to the segment and the index."""
+
+        with self._exclusive():
+            entries, self._buffer = self._buffer, []
+            rows = []
+            if entries:
+                self._follow()
+                self._catch_up([self.path])
+                offset = os.fstat(self._handle.fileno()).st_size
+            for entry in entries:
+                line = (json.dumps(entry) + "\n").encode("utf-8")
+                if offset and offset + len(line) > self.max_segment_bytes:
+                    self._index(rows)  # before the rename re-points them
+                    rows = []
+                    self._rotate()
+                    offset = 0
+                self._handle.write(line)
+                rows.append(_index_row(self.path.name, offset, len(line), entry))
+                offset += len(line)
+            self._handle.flush()
+            if fsync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+            self._index(rows)
+            return len(entries)
+
+    def _index(self, rows: List[tuple]) -> None:
+        if rows:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.flush(fsync=True)
+            self._closed = True
+            self._wake.set()
+            self._handle.close()
+            self._lock_handle.close()
+            self._db.close()
+
+    def __enter__(self) -> "Ledger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _read(self, rows: Iterable[tuple]) -> Iterator[dict]:
+        handles: Dict[str, object] = {}
+        try:
+            for segment, offset, length in rows:
+                handle = handles.get(segment)
+                if handle is None:
+                    handle = handles[segment] = (self.path.parent / segment).open("rb")
+                handle.seek(offset)
+                yield json.loads(handle.read(length))
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def query(
+        self,
+        *,
+        level: Optional[str] = None,
+        user_id: Optional[str] = None,
+        curriculum: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Entries matching every given filter, newest first."""
+
+        clauses, params = [], []
+        for column, value in (("credential_level", level), ("user_id", user_id), ("curriculum", curriculum)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        sql = "SELECT segment, offset, length FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._exclusive():  # no rotation between lookup and read
+            self.flush()
+            rows = self._db.execute(sql, params).fetchall()
+            return list(self._read(rows))
+
+    def latest_per_curriculum(self) -> List[dict]:
+        """The most recent entry for every curriculum path, newest first."""
+
+        with self._exclusive():
+            self.flush()
+            # SQLite returns the other columns from the row holding MAX().
+            rows = self._db.execute(
+                "SELECT segment, offset, length, MAX(timestamp) AS ts FROM entries"
+                " WHERE curriculum IS NOT NULL GROUP BY curriculum ORDER BY ts DESC"
+            ).fetchall()
+            return list(self._read(row[:3] for row in rows))
+
+
+_OPEN: Dict[Path, Ledger] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_ledger(path: str | Path = "metadata/ledger.jsonl") -> Ledger:
+    """Process-wide :class:`Ledger` for *path*, closed at interpreter exit."""
+
+    key = Path(path).resolve()
+    with _OPEN_LOCK:
+        ledger = _OPEN.get(key)
+        if ledger is None or ledger._closed:
+            ledger = _OPEN[key] = Ledger(path)
+        return ledger
+
+
+@atexit.register
+def _close_all() -> None:
+    for ledger in list(_OPEN.values()):
+        ledger.close()
+
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def _since(value: str) -> float:
+    """Parse ``7d``/``12h``-style durations (ago) or a UNIX timestamp."""
+
+    match = _DURATION.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        raise SystemExit(f"Invalid --since value: {value} (use e.g. 7d, 12h or a UNIX timestamp)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query a Stageport evaluation ledger through its index.")
+    parser.add_argument("ledger", help="Path to the active ledger segment (e.g. metadata/ledger.jsonl).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("latest", help="Latest evaluation per curriculum.")
+    runs = commands.add_parser("runs", help="Evaluations matching filters, newest first.")
+    runs.add_argument("--level", choices=("MASTER", "JOURNEY", "APPRENTICE"))
+    runs.add_argument("--user-id")
+    runs.add_argument("--curriculum", help="Curriculum path as recorded in the ledger.")
+    runs.add_argument("--since", type=_since, help="Duration ago (7d, 12h, 30m) or UNIX timestamp.")
+    runs.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    if not Path(args.ledger).exists():
+        raise SystemExit(f"Ledger not found: {args.ledger}")
+    with Ledger(args.ledger) as ledger:
+        if args.command == "latest":
+            entries = ledger.latest_per_curriculum()
+        else:
+            entries = ledger.query(
+                level=args.level,
+                user_id=args.user_id,
+                curriculum=args.curriculum,
+                since=args.since,
+                limit=args.limit,
+            )
+    for entry in entries:
+        print(json.dumps(entry))
+
+
+if __name__ == "__main__":
+    main()
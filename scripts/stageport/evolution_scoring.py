@@ -0,0 +1,223 @@
+"""Declarative scoring rules for Stageport evaluation dimensions.
+
+Dimensions live in a JSON file (``dimensions.json`` next to this module by
+default, or ``STAGEPORT_DIMENSIONS``)::
+
+    {
+      "keywords": {"safety": ["avoid", "do not", "harm", "ethic"], ...},
+      "dimensions": [
+        {"name": "safety", "description": "...", "weight": 0.2,
+         "offset": 0.85, "cap": 1.0,
+         "terms": [{"features": {"safety": 1}, "scale": 0.05}]},
+        ...
+      ]
+    }
+
+Every keyword group becomes a feature counting the distinct keywords of the
+group present in the text (substring match, case-insensitive), next to the
+built-in ``word_count`` and ``paragraph_count``. A dimension scores
+
+    100 × min(offset + Σ_terms scale × min(Σ weight × feature / divide, cap), cap)
+
+where a missing ``cap`` means no cap, ``divide`` and ``scale`` default to 1
+and ``offset`` to 0. A dimension without terms scores ``offset``.
+
+:func:`compile_scorer` turns the config into a :class:`Scorer`. It scores one
+document in pure Python, or a whole corpus at once with :meth:`Scorer.score_matrix`
+(NumPy): the documents' feature rows times the term weights, then the terms
+summed per dimension, i.e. two matrix multiplies.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AbstractSet, Dict, FrozenSet, List, Sequence, Tuple
+
+DEFAULT_CONFIG = Path(__file__).with_name("dimensions.json")
+BUILTIN_FEATURES = ("word_count", "paragraph_count")
+
+
+@dataclass
+class TextFeatures:
+    """Everything the dimension scorers read, extracted in one pass."""
+
+    word_count: int
+    paragraph_count: int
+    keyword_hits: Dict[str, int]  # distinct keywords present, per group
+
+
+@dataclass(frozen=True)
+class Term:
+    weights: Dict[str, float]
+    divide: float = 1.0
+    cap: float = math.inf
+    scale: float = 1.0
+
+
+@dataclass(frozen=True)
+class DimensionRule:
+    name: str
+    description: str = ""
+    weight: float = 0.0
+    offset: float = 0.0
+    cap: float = math.inf
+    terms: Tuple[Term, ...] = field(default_factory=tuple)
+
+
+class Scorer:
+    """Keyword scanner and dimension formulas compiled from a config."""
+
+    def __init__(self, keyword_groups: Dict[str, Sequence[str]], rules: Sequence[DimensionRule]) -> None:
+        self.keyword_groups = {group: tuple(kw.lower() for kw in keywords) for group, keywords in keyword_groups.items()}
+        self.rules = list(rules)
+        self.feature_names = [*BUILTIN_FEATURES, *self.keyword_groups]
+        for rule in self.rules:
+            for term in rule.terms:
+                unknown = set(term.weights) - set(self.feature_names)
+                if unknown:
+                    raise SystemExit(
+                        f"Dimension {rule.name!r} uses unknown feature(s) {sorted(unknown)}; "
+                        f"available: {self.feature_names}"
+                    )
+
+        self._keywords = sorted({kw for group in self.keyword_groups.values() for kw in group}, key=len, reverse=True)
+        # A zero-width lookahead tries every position, so overlapping keywords
+        # are all seen; longest-first alternation means a keyword missed at a
+        # position is a prefix of the one matched there (recovered in `scan`).
+        self._keyword_re = (
+            re.compile("(?=(" + "|".join(re.escape(kw) for kw in self._keywords) + "))") if self._keywords else None
+        )
+        self._matrices = None
+
+    @property
+    def dimension_names(self) -> List[str]:
+        return [rule.name for rule in self.rules]
+
+    # ------------------------------------------------------------------
+    # Features
+    # ------------------------------------------------------------------
+
+    def scan(self, text: str) -> Tuple[int, FrozenSet[str]]:
+        """Word count and the set of keywords present in *text*."""
+
+        found = set(self._keyword_re.findall(text.lower())) if self._keyword_re else set()
+        # Keywords contained in a found keyword are present too.
+        present = frozenset(kw for kw in self._keywords if kw in found or any(kw in hit for hit in found))
+        return len(text.split()), present
+
+    def build_features(self, word_count: int, paragraph_breaks: int, present: AbstractSet[str]) -> TextFeatures:
+        return TextFeatures(
+            word_count=word_count,
+            paragraph_count=max(paragraph_breaks, 1),
+            keyword_hits={
+                group: sum(1 for kw in keywords if kw in present) for group, keywords in self.keyword_groups.items()
+            },
+        )
+
+    def extract(self, text: str) -> TextFeatures:
+        """Tokenize, lowercase and scan *text* once for all keyword groups."""
+
+        word_count, present = self.scan(text)
+        return self.build_features(word_count, text.count("\n\n"), present)
+
+    def feature_row(self, features: TextFeatures) -> List[float]:
+        return [
+            float(features.word_count),
+            float(features.paragraph_count),
+            *(float(features.keyword_hits[group]) for group in self.keyword_groups),
+        ]
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def score(self, features: TextFeatures) -> Dict[str, float]:
+        """Raw (unrounded) score per dimension for one document."""
+
+        values = dict(zip(self.feature_names, self.feature_row(features)))
+        scores = {}
+        for rule in self.rules:
+            total = rule.offset
+            for term in rule.terms:
+                raw = 0.0
+                for name, weight in term.weights.items():
+                    raw += weight * values[name]
+                total += min(raw / term.divide, term.cap) * term.scale
+            scores[rule.name] = min(total, rule.cap) * 100
+        return scores
+
+    def _compile_matrices(self):
+        import numpy as np  # only batch scoring needs NumPy
+
+        terms = [(d, term) for d, rule in enumerate(self.rules) for term in rule.terms]
+        column = {name: i for i, name in enumerate(self.feature_names)}
+        weights = np.zeros((len(self.feature_names), len(terms)))
+        assign = np.zeros((len(terms), len(self.rules)))
+        for t, (d, term) in enumerate(terms):
+            for name, weight in term.weights.items():
+                weights[column[name], t] = weight
+            assign[t, d] = 1.0
+        divide = np.array([term.divide for _, term in terms], dtype=float)
+        term_cap = np.array([term.cap for _, term in terms], dtype=float)
+        scale = np.array([term.scale for _, term in terms], dtype=float)
+        offset = np.array([rule.offset for rule in self.rules], dtype=float)
+        cap = np.array([rule.cap for rule in self.rules], dtype=float)
+        self._matrices = (weights, divide, term_cap, scale, assign, offset, cap)
+        return self._matrices
+
+    def score_matrix(self, features):
+        """Raw scores for a ``(documents × features)`` matrix, one column per
+        dimension (in ``dimension_names`` order)."""
+
+        import numpy as np
+
+        weights, divide, term_cap, scale, assign, offset, cap = self._matrices or self._compile_matrices()
+        terms = np.minimum((np.asarray(features, dtype=float) @ weights) / divide, term_cap) * scale
+        return np.minimum(terms @ assign + offset, cap) * 100
+
+
+def _number(value, default: float) -> float:
+    return default if value is None else float(value)
+
+
+def compile_scorer(config: dict) -> Scorer:
+    """Build a :class:`Scorer` from a parsed dimension config."""
+
+    try:
+        rules = [
+            DimensionRule(
+                name=dimension["name"],
+                description=dimension.get("description", ""),
+                weight=_number(dimension.get("weight"), 0.0),
+                offset=_number(dimension.get("offset"), 0.0),
+                cap=_number(dimension.get("cap"), math.inf),
+                terms=tuple(
+                    Term(
+                        weights={name: float(weight) for name, weight in term["features"].items()},
+                        divide=_number(term.get("divide"), 1.0),
+                        cap=_number(term.get("cap"), math.inf),
+                        scale=_number(term.get("scale"), 1.0),
+                    )
+                    for term in dimension.get("terms", ())
+                ),
+            )
+            for dimension in config["dimensions"]
+        ]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise SystemExit(f"Invalid dimension config: {exc!r}")
+    return Scorer(config.get("keywords", {}), rules)
+
+
+def load_scorer(path: str | Path = DEFAULT_CONFIG) -> Scorer:
+    """Read and compile the dimension config at *path*."""
+
+    try:
+        config = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise SystemExit(f"Dimension config not found: {path}")
+    except json.JSONDecodeError as exc:
+        raise SystemExit(f"Dimension config {path} is not valid JSON: {exc}")
+    return compile_scorer(config)
@@ -0,0 +1,222 @@
+"""Background, batched Firestore logging for MASTER evaluations.
+
+``commit_to_evolution`` used to call Firestore synchronously, so one slow
+network round trip stalled the watcher or a batch run. Reports now go
+through an :class:`EvolutionUploader`:
+
+* ``submit`` only enqueues the document and returns
+* a daemon thread groups queued documents into Firestore batch commits
+  (at most ``batch_size`` writes, or whatever arrived within ``linger``
+  seconds)
+* each batch is written to ``spool_dir`` as JSONL before it is committed
+  and the file is removed once the commit succeeds, so a batch that is in
+  flight when the interpreter exits is not lost; failed commits are retried
+  with exponential backoff, oldest batch first
+* every document gets its id when it is submitted, so retrying a commit
+  whose outcome was unknown overwrites instead of duplicating
+* at exit the queue is drained for up to ``close_timeout`` seconds; whatever
+  is still queued after that is spooled, and anything unsent stays in the
+  spool for the next run
+
+Point ``FIRESTORE_EMULATOR_HOST`` at the Firestore emulator to exercise the
+real client locally; ``test_evolution_uploader.py`` runs the uploader against
+an in-process fake client.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+COLLECTION = "evolution_logs"
+DEFAULT_SPOOL_DIR = "metadata/evolution_spool"
+# Firestore rejects batches with more than 500 writes.
+MAX_BATCH_SIZE = 500
+
+Document = Tuple[str, dict]
+
+
+class EvolutionUploader:
+    """Queue documents and commit them to Firestore from a background thread."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        *,
+        spool_dir: str | Path = DEFAULT_SPOOL_DIR,
+        collection: str = COLLECTION,
+        batch_size: int = 200,
+        linger: float = 0.5,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 300.0,
+        close_timeout: float = 10.0,
+    ) -> None:
+        self.client_factory = client_factory
+        self.spool_dir = Path(spool_dir)
+        self.collection = collection
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.linger = linger
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.close_timeout = close_timeout
+
+        self._queue: "queue.Queue[Optional[Document]]" = queue.Queue()
+        self._client = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="evolution-uploader", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, document: dict) -> str:
+        """Queue *document* for upload and return its Firestore id."""
+
+        if self._closing.is_set():
+            raise ValueError("Uploader is closed")
+        doc_id = uuid.uuid4().hex
+        self._queue.put((doc_id, document))
+        return doc_id
+
+    def pending_spool(self) -> List[Path]:
+        """Spooled batches waiting for a successful commit, oldest first."""
+
+        if not self.spool_dir.exists():
+            return []
+        return sorted(self.spool_dir.glob("*.jsonl"))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush what can be flushed within *timeout*; spool the rest."""
+
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._queue.put(None)
+        self._thread.join(self.close_timeout if timeout is None else timeout)
+        if self._thread.is_alive():
+            # Still committing: keep the rest of the queue on disk instead.
+            leftover = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    leftover.append(item)
+            if leftover:
+                self._spool(leftover)
+            self._queue.put(None)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                # Committed from the spool, after any older batches.
+                self._spool(batch)
+            if not self._backing_off():
+                self._drain_spool()
+            if stop:
+                return
+
+    def _collect(self) -> Tuple[List[Document], bool]:
+        """Block for the first document, then gather more for ``linger`` s."""
+
+        wait = None
+        if self.pending_spool():
+            wait = max(self._retry_at - time.monotonic(), 0.05)
+        try:
+            item = self._queue.get(timeout=wait)
+        except queue.Empty:
+            return [], False
+        if item is None:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _backing_off(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+    def _commit(self, batch: List[Document]) -> bool:
+        try:
+            if self._client is None:
+                self._client = self.client_factory()
+            if self._client is None:
+                raise RuntimeError("Firestore client unavailable")
+            collection = self._client.collection(self.collection)
+            for start in range(0, len(batch), self.batch_size):
+                writes = self._client.batch()
+                for doc_id, document in batch[start : start + self.batch_size]:
+                    writes.set(collection.document(doc_id), document)
+                writes.commit()
+        except Exception:  # network, auth or quota errors – retry later
+            self._failures += 1
+            delay = min(self.backoff_cap, self.backoff_base * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+            return False
+        self._failures = 0
+        self._retry_at = 0.0
+        return True
+
+    def _spool(self, batch: List[Document]) -> None:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.jsonl"
+        tmp = self.spool_dir / (name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            for doc_id, document in batch:
+                handle.write(json.dumps({"id": doc_id, "doc": document}) + "\n")
+        os.replace(tmp, self.spool_dir / name)
+
+    def _drain_spool(self) -> None:
+        for path in self.pending_spool():
+            with path.open(encoding="utf-8") as handle:
+                batch = [(item["id"], item["doc"]) for item in map(json.loads, handle)]
+            if not self._commit(batch):
+                return
+            path.unlink(missing_ok=True)
+
+
+_UPLOADERS: Dict[Tuple[str, str], EvolutionUploader] = {}
+_UPLOADERS_LOCK = threading.Lock()
+
+
+def get_uploader(
+    client_factory: Callable[[], Any], key: str, spool_dir: str | Path = DEFAULT_SPOOL_DIR
+) -> EvolutionUploader:
+    """Process-wide uploader per *key* (e.g. the credentials path)."""
+
+    cache_key = (key, str(Path(spool_dir).resolve()))
+    with _UPLOADERS_LOCK:
+        uploader = _UPLOADERS.get(cache_key)
+        if uploader is None:
+            uploader = _UPLOADERS[cache_key] = EvolutionUploader(client_factory, spool_dir=spool_dir)
+        return uploader
+
+
+@atexit.register
+def _close_all() -> None:
+    for uploader in list(_UPLOADERS.values()):
+        uploader.close()
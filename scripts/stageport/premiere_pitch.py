@@ -9,15 +9,11 @@ from __future__ import annotations
 import argparse
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import List, Mapping, Optional
 
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.platypus import ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer
+
+from stageport_pdf import Document, StyleSpec, Theme, build, bullets, fill_template, paragraph, spacer
 
 
 @dataclass
@@ -76,130 +72,72 @@ FOOTER = "Private ceremonial invitation — not for public distribution."
 DEFAULT_OUTPUT = Path("Founding_Faculty_Premiere_Invitation.pdf")
 
 
-def build_styles() -> dict:
-    """Create ReportLab styles tailored for the one-page invitation."""
-
-    pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
-    styles = getSampleStyleSheet()
-    styles.add(
-        ParagraphStyle(
-            name="TitleCenter",
-            parent=styles["Title"],
-            alignment=TA_CENTER,
-            fontName="HeiseiMin-W3",
-            leading=24,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Subtitle",
-            parent=styles["Heading2"],
-            alignment=TA_CENTER,
-            fontName="HeiseiMin-W3",
-            textColor="#444444",
-            leading=18,
-            spaceAfter=4,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="DocId",
-            parent=styles["BodyText"],
-            alignment=TA_CENTER,
-            fontName="HeiseiMin-W3",
-            leading=14,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Body",
-            parent=styles["BodyText"],
-            fontName="HeiseiMin-W3",
-            leading=17,
-            spaceAfter=10,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="SectionHeader",
-            parent=styles["Heading3"],
-            fontName="HeiseiMin-W3",
-            spaceBefore=6,
-            spaceAfter=4,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Footer",
-            parent=styles["BodyText"],
-            alignment=TA_CENTER,
-            fontName="HeiseiMin-W3",
-            leading=14,
-            textColor="#555555",
-        )
-    )
-    return styles
-
-
-def build_bullet_list(items: Iterable[str], styles: dict) -> ListFlowable:
-    bullet_items = [ListItem(Paragraph(text, styles["Body"]), leftIndent=10) for text in items]
-    return ListFlowable(bullet_items, bulletType="bullet", start="•", leftIndent=14)
-
-
-def build_story(styles: dict) -> list:
-    story: list = []
-
-    story.append(Spacer(1, 0.4 * inch))
-    story.append(Paragraph(TITLE, styles["TitleCenter"]))
-    story.append(Paragraph(SUBTITLE, styles["Subtitle"]))
-    story.append(Paragraph(DOC_ID, styles["DocId"]))
-    story.append(Spacer(1, 0.2 * inch))
-
-    story.append(Paragraph("Lead line", styles["SectionHeader"]))
-    story.append(Paragraph(LEAD_LINE, styles["Body"]))
-
-    story.append(Paragraph("Founder statement", styles["SectionHeader"]))
-    story.append(Paragraph(FOUNDER_STATEMENT, styles["Body"]))
-
-    story.append(Paragraph(PACKET_CONTENTS.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(PACKET_CONTENTS.bullets, styles))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Founding Faculty Covenant", styles["SectionHeader"]))
-    story.append(Paragraph(COVENANT, styles["Body"]))
-    story.append(Paragraph("Signature ____________________", styles["Body"]))
-    story.append(Paragraph("Name / Role / Institution ____________________", styles["Body"]))
-    story.append(Paragraph("Date ____________________", styles["Body"]))
-
-    story.append(Paragraph(CORRIDOR_ACTIONS.title, styles["SectionHeader"]))
-    story.append(build_bullet_list(CORRIDOR_ACTIONS.bullets, styles))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Contact", styles["SectionHeader"]))
-    story.append(Paragraph(CONTACT_LINE, styles["Body"]))
+# Per-client fields for bulk generation (stageport_bulk.py); the defaults are
+# the content above.
+TEMPLATE_FIELDS = {
+    "title": TITLE,
+    "subtitle": SUBTITLE,
+    "doc_id": DOC_ID,
+    "lead_line": LEAD_LINE,
+    "founder_statement": FOUNDER_STATEMENT,
+    "packet_contents": PACKET_CONTENTS.bullets,
+    "covenant": COVENANT,
+    "corridor_actions": CORRIDOR_ACTIONS.bullets,
+    "contact_line": CONTACT_LINE,
+    "footer": FOOTER,
+}
+
+THEME = Theme(
+    styles=(
+        StyleSpec.of("TitleCenter", "Title", alignment="center", leading=24),
+        StyleSpec.of("Subtitle", "Heading2", alignment="center", textColor="#444444", leading=18, spaceAfter=4),
+        StyleSpec.of("DocId", "BodyText", alignment="center", leading=14),
+        StyleSpec.of("Body", "BodyText", leading=17, spaceAfter=10),
+        StyleSpec.of("SectionHeader", "Heading3", spaceBefore=6, spaceAfter=4),
+        StyleSpec.of("Footer", "BodyText", alignment="center", leading=14, textColor="#555555"),
+    ),
+    margins=(0.9, 0.9, 0.8, 0.8),
+)
 
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph(FOOTER, styles["Footer"]))
 
-    return story
+def build_document(fields: Optional[Mapping[str, object]] = None) -> Document:
+    """Describe the invitation as renderable blocks, with *fields* (see
+    ``TEMPLATE_FIELDS``) replacing the default content."""
+
+    f = fill_template(TEMPLATE_FIELDS, fields)
+    blocks = [
+        spacer(0.4 * inch),
+        paragraph(f["title"], "TitleCenter"),
+        paragraph(f["subtitle"], "Subtitle"),
+        paragraph(f["doc_id"], "DocId"),
+        spacer(0.2 * inch),
+        paragraph("Lead line", "SectionHeader"),
+        paragraph(f["lead_line"]),
+        paragraph("Founder statement", "SectionHeader"),
+        paragraph(f["founder_statement"]),
+        paragraph(PACKET_CONTENTS.title, "SectionHeader"),
+        bullets(f["packet_contents"]),
+        spacer(0.1 * inch),
+        paragraph("Founding Faculty Covenant", "SectionHeader"),
+        paragraph(f["covenant"]),
+        paragraph("Signature ____________________"),
+        paragraph("Name / Role / Institution ____________________"),
+        paragraph("Date ____________________"),
+        paragraph(CORRIDOR_ACTIONS.title, "SectionHeader"),
+        bullets(f["corridor_actions"]),
+        spacer(0.1 * inch),
+        paragraph("Contact", "SectionHeader"),
+        paragraph(f["contact_line"]),
+        spacer(0.2 * inch),
+        paragraph(f["footer"], "Footer"),
+    ]
+    return Document(THEME, blocks, title=f["title"])
 
 
 def create_pdf(output_path: Path) -> Path:
     """Render the invitation to the requested path."""
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    styles = build_styles()
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=letter,
-        leftMargin=0.9 * inch,
-        rightMargin=0.9 * inch,
-        topMargin=0.8 * inch,
-        bottomMargin=0.8 * inch,
-    )
-    story = build_story(styles)
-    doc.build(story)
-    return output_path
+    return build(build_document(), output_path)[0]
 
 
 def parse_args() -> argparse.Namespace:
@@ -213,13 +151,21 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OUTPUT,
         help="Destination path for the generated PDF (directories will be created).",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render even when an identical PDF already exists at the destination.",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    pdf_path = create_pdf(args.output)
-    print(f"Created Founding Faculty Premiere Invitation at {pdf_path.resolve()}")
+    pdf_path, rendered = build(build_document(), args.output, force=args.force)
+    if rendered:
+        print(f"Created Founding Faculty Premiere Invitation at {pdf_path.resolve()}")
+    else:
+        print(f"Founding Faculty Premiere Invitation at {pdf_path.resolve()} is up to date")
 
 
 if __name__ == "__main__":
@@ -12,12 +12,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, List
 
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+from stageport_pdf import Document, StyleSpec, Theme, build, paragraph, spacer
 
 
 @dataclass
@@ -142,58 +137,33 @@ SECTIONS: List[Section] = [
 ]
 
 
-def build_styles() -> dict:
-    """Create ReportLab styles with a Unicode-friendly font."""
-
-    pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
-    styles = getSampleStyleSheet()
-    styles.add(
-        ParagraphStyle(
-            name="TitleCenter",
-            parent=styles["Title"],
-            alignment=TA_CENTER,
-            fontName="HeiseiMin-W3",
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Body",
-            parent=styles["BodyText"],
-            fontName="HeiseiMin-W3",
-            leading=16,
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="Section",
-            parent=styles["Heading2"],
-            fontName="HeiseiMin-W3",
-        )
+THEME = Theme(
+    styles=(
+        StyleSpec.of("TitleCenter", "Title", alignment="center"),
+        StyleSpec.of("Body", "BodyText", leading=16),
+        StyleSpec.of("Section", "Heading2"),
     )
-    return styles
+)
 
 
-def build_story(styles: dict, sections: Iterable[Section]) -> list:
-    """Create the flowable story for the PDF."""
+def build_document(sections: Iterable[Section] = SECTIONS) -> Document:
+    """Describe the Bible as renderable blocks."""
 
-    story: list = [Paragraph(TITLE, styles["TitleCenter"]), Spacer(1, 24)]
+    blocks = [paragraph(TITLE, "TitleCenter"), spacer(24)]
     for section in sections:
-        story.append(Paragraph(section.title, styles["Section"]))
-        story.append(Spacer(1, 6))
-        story.append(Paragraph(section.body, styles["Body"]))
-        story.append(Spacer(1, 18))
-    return story
+        blocks += [
+            paragraph(section.title, "Section"),
+            spacer(6),
+            paragraph(section.body, "Body"),
+            spacer(18),
+        ]
+    return Document(THEME, blocks, title=TITLE)
 
 
 def create_pdf(output_path: Path, sections: Iterable[Section] = SECTIONS) -> Path:
     """Render the StagePort Bible content to ``output_path``."""
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    styles = build_styles()
-    doc = SimpleDocTemplate(str(output_path), pagesize=letter)
-    story = build_story(styles, sections)
-    doc.build(story)
-    return output_path
+    return build(build_document(sections), output_path)[0]
 
 
 def parse_args() -> argparse.Namespace:
@@ -207,13 +177,21 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OUTPUT,
         help="Destination path for the generated PDF (directories will be created).",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render even when an identical PDF already exists at the destination.",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    pdf_path = create_pdf(args.output)
-    print(f"Created StagePort System Bible at {pdf_path.resolve()}")
+    pdf_path, rendered = build(build_document(), args.output, force=args.force)
+    if rendered:
+        print(f"Created StagePort System Bible at {pdf_path.resolve()}")
+    else:
+        print(f"StagePort System Bible at {pdf_path.resolve()} is up to date")
 
 
 if __name__ == "__main__":
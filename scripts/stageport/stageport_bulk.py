@@ -0,0 +1,215 @@
+"""Render per-client variants of a StagePort document from a data file.
+
+Each record of a JSONL or CSV file fills the fields of a document template
+(``TEMPLATE_FIELDS`` in ``premiere_pitch.py`` or
+``classified_hudson_valley_record.py``); fields a record leaves out keep the
+template's default content. The optional ``output`` column names the PDF,
+otherwise records are numbered. In CSV cells, list fields are written as a
+JSON array or separated by ``|``.
+
+    python stageport_bulk.py premiere_pitch clients.csv --out-dir dist/clients
+    python stageport_bulk.py premiere_pitch clients.jsonl --zip dist/clients.zip
+    python stageport_bulk.py premiere_pitch clients.jsonl --zip - > clients.zip
+
+Records are read lazily and rendered in a process pool with a bounded number
+of documents in flight; each PDF is written to disk as soon as it is done
+(and, with ``--zip``, copied into the archive and removed), so memory stays
+flat however many documents the file holds. Directory output goes through
+the content‑hash build cache, so unchanged variants are not re-rendered.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import json
+import re
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from stageport_pdf import BuildManifest, Document, document_digest, render
+
+TEMPLATES = ("premiere_pitch", "classified_hudson_valley_record")
+OUTPUT_FIELD = "output"
+
+_SAFE_NAME = re.compile(r"[^\w.\- ]+")
+
+
+def read_records(path: Path) -> Iterator[Dict[str, object]]:
+    """Yield one dict per JSONL line or CSV row, without loading the file."""
+
+    with path.open(encoding="utf-8", newline="") as handle:
+        if path.suffix.lower() == ".csv":
+            yield from csv.DictReader(handle)
+            return
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise SystemExit(f"{path}:{number}: invalid JSON ({exc.msg})")
+            if not isinstance(record, dict):
+                raise SystemExit(f"{path}:{number}: expected a JSON object")
+            yield record
+
+
+def output_name(record: Dict[str, object], template: str, index: int) -> str:
+    """File name for a record: its ``output`` field, or a numbered default."""
+
+    name = str(record.get(OUTPUT_FIELD) or "").strip()
+    name = _SAFE_NAME.sub("_", Path(name).name) if name else f"{template}-{index:05d}"
+    return name if name.lower().endswith(".pdf") else name + ".pdf"
+
+
+def _documents(template: str, data: Path) -> Iterator[Tuple[str, Document]]:
+    module = importlib.import_module(template)
+    names: Set[str] = set()
+    for index, record in enumerate(read_records(data), 1):
+        name = output_name(record, template, index)
+        if name in names:
+            raise SystemExit(f"Record {index}: duplicate output name {name}")
+        names.add(name)
+        fields = {key: value for key, value in record.items() if key != OUTPUT_FIELD}
+        try:
+            yield name, module.build_document(fields)
+        except ValueError as exc:
+            raise SystemExit(f"Record {index}: {exc}")
+
+
+class _Window:
+    """A process pool with at most *limit* renders in flight."""
+
+    def __init__(self, workers: int) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.limit = workers * 2
+        self.pending: Dict[Future, Tuple[str, Path, Optional[str]]] = {}
+
+    def submit(self, name: str, document: Document, path: Path, digest: Optional[str] = None):
+        """Queue a render; yields renders that finished while waiting for room."""
+
+        while len(self.pending) >= self.limit:
+            yield from self._collect(FIRST_COMPLETED)
+        self.pending[self.pool.submit(render, document, path)] = (name, path, digest)
+
+    def drain(self):
+        while self.pending:
+            yield from self._collect(FIRST_COMPLETED)
+        self.pool.shutdown()
+
+    def cancel(self) -> None:
+        """Drop renders that have not started and stop the pool."""
+
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+
+    def _collect(self, how):
+        done, _ = wait(self.pending, return_when=how)
+        for future in done:
+            name, path, digest = self.pending.pop(future)
+            future.result()  # re-raise render errors
+            yield name, path, digest
+
+
+def to_directory(template: str, data: Path, out_dir: Path, *, workers: int, force: bool) -> Tuple[int, int]:
+    """Render into *out_dir*, skipping up-to-date PDFs. Returns (rendered, skipped)."""
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = BuildManifest(out_dir)
+    window = _Window(workers)
+    rendered = skipped = 0
+
+    def finished(results):
+        nonlocal rendered
+        for _name, path, digest in results:
+            manifest.record(path, digest)
+            rendered += 1
+            if rendered % 100 == 0:
+                manifest.save()
+
+    try:
+        for name, document in _documents(template, data):
+            path = out_dir / name
+            digest = document_digest(document)
+            if not force and manifest.is_fresh(path, digest):
+                skipped += 1
+                continue
+            finished(window.submit(name, document, path, digest))
+        finished(window.drain())
+    except SystemExit:
+        # A bad record: keep the renders already in flight, and record them.
+        finished(window.drain())
+        raise
+    finally:
+        window.cancel()
+        if rendered:
+            manifest.save()
+    return rendered, skipped
+
+
+def to_zip(template: str, data: Path, target: str, *, workers: int) -> int:
+    """Render into a zip archive at *target* (``-`` for stdout). Returns the count."""
+
+    if target == "-":
+        stream = sys.stdout.buffer
+    else:
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        stream = open(target, "wb")
+    count = 0
+    window = _Window(workers)
+    try:
+        with tempfile.TemporaryDirectory(prefix="stageport-bulk-") as scratch, zipfile.ZipFile(
+            stream, "w", compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+
+            def finished(results):
+                nonlocal count
+                for name, path, _digest in results:
+                    archive.write(path, arcname=name)
+                    path.unlink()
+                    count += 1
+
+            try:
+                for name, document in _documents(template, data):
+                    finished(window.submit(name, document, Path(scratch) / name))
+                finished(window.drain())
+            finally:
+                window.cancel()  # before the scratch directory goes away
+    except BaseException:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+            Path(target).unlink(missing_ok=True)  # no truncated archive
+        raise
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render per-client StagePort PDFs from a JSONL or CSV file.")
+    parser.add_argument("template", choices=TEMPLATES, help="Document template to fill.")
+    parser.add_argument("data", type=Path, help="JSONL or CSV file with one document's fields per record.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out-dir", type=Path, help="Write PDFs into this directory.")
+    target.add_argument("--zip", help="Write PDFs into this zip archive ('-' streams it to stdout).")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes.")
+    parser.add_argument("--force", action="store_true", help="Re-render PDFs that are already up to date.")
+    args = parser.parse_args()
+
+    if not args.data.exists():
+        raise SystemExit(f"Data file not found: {args.data}")
+    if args.out_dir is not None:
+        rendered, skipped = to_directory(args.template, args.data, args.out_dir, workers=args.workers, force=args.force)
+        print(f"Rendered {rendered} PDF(s), {skipped} up to date, in {args.out_dir.resolve()}", file=sys.stderr)
+    else:
+        count = to_zip(args.template, args.data, args.zip, workers=args.workers)
+        print(f"Rendered {count} PDF(s) into {args.zip}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,29 @@
 
 This module is intentionally lightweight so it can run on mobile Python
 launchers like Juno or PyDroid. It performs heuristic scoring of a curriculum
-string, writes local ledgers, and—when Firebase credentials are provided—logs
-MASTER-level evaluations to Firestore.
+string, writes local ledgers, and—when Firebase credentials are provided—queues
+MASTER-level evaluations for a background Firestore uploader.
 """
 from __future__ import annotations
 
 import argparse
+import glob
 import importlib
+import importlib.util
 import json
+import os
 import statistics
+import sys
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from evolution_ledger import open_ledger
+from evolution_scoring import DEFAULT_CONFIG, Scorer, TextFeatures, load_scorer
+from evolution_uploader import DEFAULT_SPOOL_DIR, get_uploader
 
 
 @dataclass
@@ -26,43 +36,92 @@ class EvaluationDimension:
     weight: float
 
 
-DIMENSIONS: List[EvaluationDimension] = [
-    EvaluationDimension("clarity", "Clear learning goals and action verbs", 0.3),
-    EvaluationDimension("coverage", "Concrete steps, examples, and checks", 0.3),
-    EvaluationDimension("safety", "Avoids harmful instructions and keeps scope narrow", 0.2),
-    EvaluationDimension("flow", "Logical ordering with short paragraphs", 0.2),
-]
+# Dimensions and keyword groups come from a declarative config (see
+# ``evolution_scoring``), read on first use so importing this module stays
+# cheap; ``use_dimensions`` swaps in another one. ``DIMENSIONS`` and
+# ``KEYWORD_GROUPS`` are served by the module ``__getattr__`` below.
+_SCORER: Optional[Scorer] = None
+_DIMENSIONS: List[EvaluationDimension] = []
+_KEYWORD_GROUPS: Dict[str, Tuple[str, ...]] = {}
 
 
-def _detect_keywords(text: str, keywords: Iterable[str]) -> int:
-    lowered = text.lower()
-    return sum(1 for keyword in keywords if keyword in lowered)
+def _activate(scorer: Scorer) -> Scorer:
+    global _SCORER
+    _SCORER = scorer
+    _DIMENSIONS[:] = [EvaluationDimension(rule.name, rule.description, rule.weight) for rule in scorer.rules]
+    _KEYWORD_GROUPS.clear()
+    _KEYWORD_GROUPS.update(scorer.keyword_groups)
+    return scorer
 
 
-def _score_dimension(text: str, dimension: EvaluationDimension) -> float:
-    word_count = len(text.split())
-    paragraph_count = max(text.count("\n\n"), 1)
-    checklist_hits = _detect_keywords(text, ("task", "check", "verify", "test"))
-    example_hits = _detect_keywords(text, ("example", "sample", "snippet", "code"))
+def _scorer() -> Scorer:
+    """The active scorer, compiled from ``STAGEPORT_DIMENSIONS`` on first use."""
+
+    return _SCORER or _activate(load_scorer(os.environ.get("STAGEPORT_DIMENSIONS", DEFAULT_CONFIG)))
+
+
+def use_dimensions(config_path: str | Path) -> Scorer:
+    """Score with the dimension config at *config_path* from now on."""
+
+    return _activate(load_scorer(config_path))
+
 
-    if dimension.name == "clarity":
-        base = min(word_count / 120, 1.2)
-        clarity_bonus = _detect_keywords(text, ("objective", "goal", "outcome")) * 0.05
-        return (base + clarity_bonus) * 100
+def __getattr__(name: str):
+    if name == "DIMENSIONS":
+        _scorer()
+        return _DIMENSIONS
+    if name == "KEYWORD_GROUPS":
+        _scorer()
+        return _KEYWORD_GROUPS
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    if dimension.name == "coverage":
-        base = min((checklist_hits + example_hits) / 6, 1.0)
-        return (0.6 + base * 0.4) * 100
 
-    if dimension.name == "safety":
-        safety_hits = _detect_keywords(text, ("avoid", "do not", "harm", "ethic"))
-        return min(0.85 + safety_hits * 0.05, 1.0) * 100
+def extract_features(text: str) -> TextFeatures:
+    """Tokenize, lowercase and scan *text* once for all keyword groups."""
 
-    if dimension.name == "flow":
-        base = min(paragraph_count / 4, 1.0)
-        return (0.5 + base * 0.5) * 100
+    return _scorer().extract(text)
 
-    return 70.0
+
+class IncrementalEvaluator:
+    """Score successive versions of a document, re-scanning only the
+    paragraphs that changed.
+
+    No keyword spans a blank line, so features are exactly the sum (word
+    count) and union (keywords) of the per-paragraph features, which are
+    cached by paragraph text. Scores always equal ``evaluate_text``.
+    """
+
+    def __init__(self, max_cached: int = 4096) -> None:
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, Tuple[int, FrozenSet[str]]]" = OrderedDict()
+        self._scorer: Optional[Scorer] = None
+
+    def features(self, text: str) -> TextFeatures:
+        scorer = _scorer()
+        if self._scorer is not scorer:  # config changed; cached scans are stale
+            self._cache.clear()
+            self._scorer = scorer
+        paragraphs = text.split("\n\n")
+        word_count = 0
+        present: set = set()
+        for paragraph in paragraphs:
+            scanned = self._cache.get(paragraph)
+            if scanned is None:
+                scanned = self._cache[paragraph] = scorer.scan(paragraph)
+            else:
+                self._cache.move_to_end(paragraph)
+            word_count += scanned[0]
+            present |= scanned[1]
+        while len(self._cache) > max(self.max_cached, len(paragraphs)):
+            self._cache.popitem(last=False)
+        return scorer.build_features(word_count, len(paragraphs) - 1, present)
+
+    def __call__(self, text: str) -> Dict[str, float]:
+        return score_features(self.features(text))
+
+
+def _score_dimension(text: str, dimension: EvaluationDimension) -> float:
+    return _scorer().score(extract_features(text)).get(dimension.name, 70.0)
 
 
 def _normalize_score(raw_score: float) -> float:
@@ -72,10 +131,28 @@ def _normalize_score(raw_score: float) -> float:
 def evaluate_text(text: str) -> Dict[str, float]:
     """Return weighted dimension scores for the curriculum text."""
 
-    scores = {}
-    for dimension in DIMENSIONS:
-        scores[dimension.name] = _normalize_score(_score_dimension(text, dimension))
-    return scores
+    return score_features(extract_features(text))
+
+
+def score_features(features: TextFeatures) -> Dict[str, float]:
+    """Weighted dimension scores for already extracted features."""
+
+    return {name: _normalize_score(raw) for name, raw in _scorer().score(features).items()}
+
+
+def evaluate_many(texts: Sequence[str]) -> List[Dict[str, float]]:
+    """Scores for many texts, computed as one feature matrix (NumPy).
+
+    Falls back to scoring one text at a time when NumPy is unavailable.
+    """
+
+    features = [extract_features(text) for text in texts]
+    if importlib.util.find_spec("numpy") is None or not features:
+        return [score_features(item) for item in features]
+    scorer = _scorer()
+    raw = scorer.score_matrix([scorer.feature_row(item) for item in features])
+    names = scorer.dimension_names
+    return [{name: _normalize_score(float(value)) for name, value in zip(names, row)} for row in raw.tolist()]
 
 
 def _overall_score(dimension_scores: Dict[str, float]) -> float:
@@ -93,12 +170,19 @@ def _credential_level(overall_score: float) -> str:
 
 
 def write_ledger(metadata: dict, ledger_path: str = "metadata/ledger.jsonl") -> None:
-    """Append evaluation metadata to a local ledger file."""
+    """Queue evaluation metadata on the (buffered, indexed) local ledger."""
+
+    open_ledger(ledger_path).append(metadata)
+
+
+def write_ledger_many(entries: Iterable[dict], ledger_path: str = "metadata/ledger.jsonl") -> int:
+    """Append several ledger entries and flush them in one write."""
 
-    ledger_file = Path(ledger_path)
-    ledger_file.parent.mkdir(parents=True, exist_ok=True)
-    with ledger_file.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(metadata) + "\n")
+    entries = list(entries)
+    ledger = open_ledger(ledger_path)
+    ledger.extend(entries)
+    ledger.flush()
+    return len(entries)
 
 
 def _load_firebase_clients(credentials_path: str):
@@ -116,22 +200,28 @@ def _load_firebase_clients(credentials_path: str):
     return firestore.client()
 
 
-def commit_to_evolution(report: dict, user_id: str = "dev-user", credentials_path: str | None = None) -> bool:
-    """Log MASTER credential evaluations to Firestore when configured.
+def commit_to_evolution(
+    report: dict,
+    user_id: str = "dev-user",
+    credentials_path: str | None = None,
+    *,
+    spool_dir: str = DEFAULT_SPOOL_DIR,
+) -> bool:
+    """Queue MASTER credential evaluations for Firestore when configured.
 
-    Returns True if a log was written, False otherwise.
+    The upload happens on a background thread (see ``evolution_uploader``);
+    this returns True once the log is queued, False if it was not eligible.
     """
 
     if report.get("credential_level") != "MASTER":
         return False
     if not credentials_path:
         return False
-
-    firestore_client = _load_firebase_clients(credentials_path)
-    if firestore_client is None:
+    if importlib.util.find_spec("firebase_admin") is None:
         return False
 
-    firestore_client.collection("evolution_logs").add(
+    uploader = get_uploader(lambda: _load_firebase_clients(credentials_path), credentials_path, spool_dir)
+    uploader.submit(
         {
             "score": report.get("overall_score"),
             "dimensions": report.get("dimension_scores"),
@@ -142,6 +232,16 @@ def commit_to_evolution(report: dict, user_id: str = "dev-user", credentials_pat
     return True
 
 
+def _build_report(dimension_scores: Dict[str, float]) -> dict:
+    overall_score = _overall_score(dimension_scores)
+    return {
+        "overall_score": overall_score,
+        "dimension_scores": dimension_scores,
+        "credential_level": _credential_level(overall_score),
+        "timestamp": time.time(),
+    }
+
+
 def validate(
     curriculum: str,
     *,
@@ -149,22 +249,21 @@ def validate(
     log_master: bool = False,
     user_id: str = "dev-user",
     firebase_credentials: str | None = None,
+    source: str | None = None,
+    scorer: Callable[[str], Dict[str, float]] | None = None,
 ) -> dict:
-    """Validate a curriculum string and optionally log results."""
+    """Validate a curriculum string and optionally log results.
 
-    dimension_scores = evaluate_text(curriculum)
-    overall_score = _overall_score(dimension_scores)
-    credential_level = _credential_level(overall_score)
+    *source* (the curriculum's path) is recorded in the ledger so it can be
+    queried per curriculum. *scorer* replaces ``evaluate_text``, e.g. with an
+    :class:`IncrementalEvaluator` that remembers earlier versions.
+    """
 
-    report = {
-        "overall_score": overall_score,
-        "dimension_scores": dimension_scores,
-        "credential_level": credential_level,
-        "timestamp": time.time(),
-    }
+    report = _build_report((scorer or evaluate_text)(curriculum))
+    credential_level = report["credential_level"]
 
     if ledger_path:
-        write_ledger(report, ledger_path=ledger_path)
+        write_ledger({**report, "path": source, "user_id": user_id}, ledger_path=ledger_path)
 
     if log_master and credential_level == "MASTER":
         commit_to_evolution(report, user_id=user_id, credentials_path=firebase_credentials)
@@ -172,16 +271,160 @@ def validate(
     return report
 
 
+CREDENTIAL_LEVELS = ("MASTER", "JOURNEY", "APPRENTICE")
+DEFAULT_PATTERNS = ("*.txt", "*.md")
+
+
+def iter_curriculum_paths(inputs: Sequence[str], patterns: Sequence[str] = DEFAULT_PATTERNS) -> Iterator[Path]:
+    """Expand files, directories (searched recursively for *patterns*) and globs.
+
+    Each file is yielded once, in a stable order.
+    """
+
+    seen = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            matches = sorted({match for pattern in patterns for match in path.rglob(pattern)})
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = sorted(Path(match) for match in glob.glob(item, recursive=True))
+            if not matches:
+                print(f"No curriculum files match {item}", file=sys.stderr)
+        for match in matches:
+            if match.is_file() and match not in seen:
+                seen.add(match)
+                yield match
+
+
+def _evaluate_chunk(paths: Sequence[str]) -> List[dict]:
+    """Worker for batch mode: score a chunk of files in one matrix (no side effects)."""
+
+    texts: Dict[str, str] = {}
+    reports: Dict[str, dict] = {}
+    for path in paths:
+        try:
+            texts[path] = Path(path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as exc:
+            reports[path] = {"path": path, "error": str(exc)}
+    for path, scores in zip(texts, evaluate_many(list(texts.values()))):
+        reports[path] = {"path": path, **_build_report(scores)}
+    return [reports[path] for path in paths]
+
+
+def evaluate_paths(
+    paths: Sequence[Path],
+    *,
+    workers: int | None = None,
+    chunksize: int = 64,
+    dimensions: Optional[str] = None,
+) -> Iterator[dict]:
+    """Yield one report per path, in input order, scored by a process pool.
+
+    *dimensions* is a dimension config path the workers load as well.
+    """
+
+    names = [str(path) for path in paths]
+    chunks = [names[start : start + chunksize] for start in range(0, len(names), chunksize)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) < 2:
+        for chunk in chunks:
+            yield from _evaluate_chunk(chunk)
+        return
+    initargs = (dimensions,) if dimensions else ()
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        initializer=use_dimensions if dimensions else None,
+        initargs=initargs,
+    ) as pool:
+        for reports in pool.map(_evaluate_chunk, chunks):
+            yield from reports
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Evaluate every matched file and stream JSONL reports to stdout."""
+
+    paths = list(iter_curriculum_paths(args.paths, args.pattern or DEFAULT_PATTERNS))
+    if not paths:
+        raise SystemExit("No curriculum files to evaluate.")
+
+    levels = set(args.level or ())
+    ledger_entries = []
+    selected = []
+    errors = 0
+    for report in evaluate_paths(paths, workers=args.workers, dimensions=args.dimensions):
+        if "error" in report:
+            errors += 1
+            print(f"Skipping {report['path']}: {report['error']}", file=sys.stderr)
+            continue
+        ledger_entries.append({**report, "user_id": args.user_id})
+        if args.log_master and report["credential_level"] == "MASTER":
+            commit_to_evolution(report, user_id=args.user_id, credentials_path=args.firebase_credentials)
+        if levels and report["credential_level"] not in levels:
+            continue
+        if args.min_score is not None and report["overall_score"] < args.min_score:
+            continue
+        if args.sort:
+            selected.append(report)
+        else:
+            print(json.dumps(report), flush=True)
+
+    if args.sort == "score":
+        selected.sort(key=lambda report: (-report["overall_score"], report["path"]))
+    elif args.sort == "path":
+        selected.sort(key=lambda report: report["path"])
+    for report in selected:
+        print(json.dumps(report))
+
+    if args.ledger:
+        write_ledger_many(ledger_entries, ledger_path=args.ledger)
+    print(f"Evaluated {len(ledger_entries)} of {len(paths)} files.", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _is_batch(args: argparse.Namespace) -> bool:
+    if args.batch or args.level or args.sort or args.min_score is not None or len(args.paths) != 1:
+        return True
+    path = args.paths[0]
+    return Path(path).is_dir() or (not Path(path).exists() and glob.has_magic(path))
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Evaluate curriculum drafts for Stageport evolution workflows.")
-    parser.add_argument("path", nargs="?", default="your_curriculum.txt", help="Path to the curriculum file to evaluate.")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["your_curriculum.txt"],
+        help="Curriculum file to evaluate, or several files, directories and globs for batch mode.",
+    )
     parser.add_argument("--ledger", help="Optional JSONL ledger path for saving evaluation history.")
     parser.add_argument("--log-master", action="store_true", help="Log MASTER-level runs to Firestore when credentials are provided.")
     parser.add_argument("--firebase-credentials", help="Path to a Firebase service account JSON file.")
     parser.add_argument("--user-id", default="dev-user", help="User ID recorded when logging to Firestore.")
+    parser.add_argument(
+        "--dimensions",
+        help="Dimension config (JSON keywords, weights and formulas; default: dimensions.json or $STAGEPORT_DIMENSIONS).",
+    )
+    batch = parser.add_argument_group("batch mode", "Stream one JSON report per line for many files.")
+    batch.add_argument("--batch", action="store_true", help="Force JSONL batch output even for a single file.")
+    batch.add_argument(
+        "--pattern",
+        action="append",
+        help="Filename glob used inside directories (repeatable; default: *.txt and *.md).",
+    )
+    batch.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    batch.add_argument("--level", action="append", choices=CREDENTIAL_LEVELS, help="Only report these credential levels (repeatable).")
+    batch.add_argument("--min-score", type=float, default=None, help="Only report files scoring at least this much.")
+    batch.add_argument("--sort", choices=("path", "score"), help="Sort the report instead of streaming it in input order.")
     args = parser.parse_args()
 
-    curriculum_path = Path(args.path)
+    if args.dimensions:
+        use_dimensions(args.dimensions)
+    if _is_batch(args):
+        raise SystemExit(run_batch(args))
+
+    curriculum_path = Path(args.paths[0])
     if not curriculum_path.exists():
         raise FileNotFoundError(f"Curriculum file not found: {curriculum_path}")
 
@@ -192,6 +435,7 @@ def main() -> None:
         log_master=args.log_master,
         user_id=args.user_id,
         firebase_credentials=args.firebase_credentials,
+        source=str(curriculum_path),
     )
 
     print(json.dumps(report, indent=2))
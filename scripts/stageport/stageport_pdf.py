@@ -0,0 +1,377 @@
+"""Shared ReportLab rendering for StagePort documents.
+
+The PDF scripts (``stageport_bible.py``, ``premiere_pitch.py``,
+``classified_hudson_valley_record.py``) describe their content as data – a
+:class:`Document` made of :class:`Block` s plus a :class:`Theme` – and hand it
+to :func:`render`. Fonts are registered and stylesheets built once per
+process (per theme), so rendering many documents in one interpreter, or in
+a pool of worker processes with :func:`render_many`, does not pay for a font
+load per PDF.
+
+:func:`build` / :func:`build_many` add a content-hash cache on top: the key
+covers the document's blocks and theme, the ReportLab version and
+``RENDER_VERSION``. A PDF is only rendered when no identical artifact exists;
+outputs are written to a temporary file and renamed into place, and each
+output directory keeps a ``stageport-manifest.json`` with the key and the
+SHA-256 of every PDF it holds.
+
+Render the whole document set in one go:
+
+    python stageport_pdf.py --out-dir ./dist
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+import reportlab
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, StyleSheet1, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.platypus import ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer
+
+DEFAULT_FONT = "HeiseiMin-W3"
+# Bump when a change to the rendering code alters the PDFs it produces.
+RENDER_VERSION = 1
+MANIFEST_NAME = "stageport-manifest.json"
+ALIGNMENTS = {"left": 0, "center": 1, "right": 2, "justify": 4}
+
+# Scripts that expose ``build_document()``; rendered by ``main``.
+DOCUMENT_MODULES = ("stageport_bible", "premiere_pitch", "classified_hudson_valley_record")
+
+
+# ----------------------------------------------------------------------
+# Content model
+# ----------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class StyleSpec:
+    """A paragraph style derived from a sample stylesheet style.
+
+    *options* are ``ParagraphStyle`` keyword arguments; ``alignment`` may be
+    given by name (``"center"``). A spec named like a sample style replaces it.
+    """
+
+    name: str
+    parent: str
+    options: Tuple[Tuple[str, object], ...] = ()
+
+    @classmethod
+    def of(cls, name: str, parent: str, **options) -> "StyleSpec":
+        return cls(name, parent, tuple(sorted(options.items())))
+
+
+@dataclass(frozen=True)
+class Theme:
+    """Font, page margins (inches) and paragraph styles of a document."""
+
+    styles: Tuple[StyleSpec, ...]
+    font: str = DEFAULT_FONT
+    margins: Optional[Tuple[float, float, float, float]] = None  # left, right, top, bottom
+
+
+@dataclass(frozen=True)
+class Block:
+    """One piece of content: ``paragraph`` (text in *style*), ``bullets``
+    (items in *style*) or ``spacer`` (*size* points of vertical space)."""
+
+    kind: str
+    text: Union[str, Tuple[str, ...]] = ""
+    style: str = "Body"
+    size: float = 0.0
+
+
+def paragraph(text: str, style: str = "Body") -> Block:
+    return Block("paragraph", text, style)
+
+
+def bullets(items: Iterable[str], style: str = "Body") -> Block:
+    return Block("bullets", tuple(items), style)
+
+
+def spacer(size: float) -> Block:
+    return Block("spacer", size=size)
+
+
+def fill_template(defaults: Mapping[str, object], fields: Optional[Mapping[str, object]] = None) -> Dict[str, object]:
+    """Merge per-document *fields* over a template's *defaults*.
+
+    Field values are plain text (escaped for ReportLab's paragraph markup).
+    Fields whose default is a list take a list, a JSON array string or a
+    ``|``-separated string (the form that fits in a CSV cell).
+    """
+
+    merged = dict(defaults)
+    for name, value in (fields or {}).items():
+        if name not in defaults:
+            raise ValueError(f"Unknown template field {name!r}; expected one of {sorted(defaults)}")
+        if value is None or value == "":
+            continue  # keep the default
+        if isinstance(defaults[name], (list, tuple)):
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value) if value.lstrip().startswith("[") else value.split("|")
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"Field {name!r} is not a valid JSON array ({exc.msg})")
+            if not isinstance(value, (list, tuple)):
+                raise ValueError(f"Field {name!r} takes a list or a string, not {type(value).__name__}")
+            merged[name] = [escape(str(item).strip()) for item in value if str(item).strip()]
+        else:
+            merged[name] = escape(str(value))
+    return merged
+
+
+@dataclass
+class Document:
+    theme: Theme
+    blocks: List[Block] = field(default_factory=list)
+    title: str = ""  # PDF metadata
+
+
+# ----------------------------------------------------------------------
+# Per-process caches
+# ----------------------------------------------------------------------
+
+_REGISTERED_FONTS: set = set()
+
+
+def ensure_font(name: str) -> None:
+    """Register the CID font *name* once per process."""
+
+    if name not in _REGISTERED_FONTS:
+        pdfmetrics.registerFont(UnicodeCIDFont(name))
+        _REGISTERED_FONTS.add(name)
+
+
+@lru_cache(maxsize=None)
+def build_stylesheet(theme: Theme) -> StyleSheet1:
+    """Sample stylesheet plus the theme's styles, built once per theme."""
+
+    ensure_font(theme.font)
+    styles = getSampleStyleSheet()
+    for spec in theme.styles:
+        options = dict(spec.options)
+        options.setdefault("fontName", theme.font)
+        if isinstance(options.get("alignment"), str):
+            options["alignment"] = ALIGNMENTS[options["alignment"]]
+        style = ParagraphStyle(name=spec.name, parent=styles[spec.parent], **options)
+        if spec.name in styles:
+            styles.byName[spec.name] = style
+        else:
+            styles.add(style)
+    return styles
+
+
+# ----------------------------------------------------------------------
+# Rendering
+# ----------------------------------------------------------------------
+
+
+def build_story(document: Document) -> list:
+    """Create the flowables for *document*."""
+
+    styles = build_stylesheet(document.theme)
+    story: list = []
+    for block in document.blocks:
+        if block.kind == "paragraph":
+            story.append(Paragraph(block.text, styles[block.style]))
+        elif block.kind == "bullets":
+            items = [ListItem(Paragraph(text, styles[block.style]), leftIndent=10) for text in block.text]
+            story.append(ListFlowable(items, bulletType="bullet", start="•", leftIndent=14))
+        elif block.kind == "spacer":
+            story.append(Spacer(1, block.size))
+        else:
+            raise ValueError(f"Unknown block kind: {block.kind!r}")
+    return story
+
+
+def render(document: Document, output: Union[Path, BinaryIO]) -> Union[Path, BinaryIO]:
+    """Render *document* to a path or a binary file object.
+
+    Paths are written atomically (temporary file, then rename) and their
+    parent directories are created.
+    """
+
+    if isinstance(output, (str, Path)):
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        try:
+            _render_to(document, str(tmp))
+            os.replace(tmp, output)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return output
+    _render_to(document, output)
+    return output
+
+
+def _render_to(document: Document, target: Union[str, BinaryIO]) -> None:
+    margins = {}
+    if document.theme.margins is not None:
+        left, right, top, bottom = document.theme.margins
+        margins = dict(leftMargin=left * inch, rightMargin=right * inch, topMargin=top * inch, bottomMargin=bottom * inch)
+    doc = SimpleDocTemplate(target, pagesize=letter, title=document.title, **margins)
+    doc.build(build_story(document))
+
+
+def _render_job(job: Tuple[Document, Path]) -> Path:
+    document, output = job
+    return render(document, output)
+
+
+def render_many(
+    jobs: Sequence[Tuple[Document, Path]], *, workers: int = 1
+) -> List[Path]:
+    """Render ``(document, output_path)`` pairs in this process or a pool.
+
+    Each worker registers fonts and builds stylesheets once, however many
+    documents it renders.
+    """
+
+    if workers <= 1 or len(jobs) < 2:
+        return [render(document, output) for document, output in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_render_job, jobs))
+
+
+# ----------------------------------------------------------------------
+# Build cache
+# ----------------------------------------------------------------------
+
+
+def document_digest(document: Document) -> str:
+    """Cache key: content, theme, ReportLab version and ``RENDER_VERSION``."""
+
+    payload = json.dumps(
+        {"engine": RENDER_VERSION, "reportlab": reportlab.Version, "document": asdict(document)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """``stageport-manifest.json`` of one output directory."""
+
+    def __init__(self, directory: Path) -> None:
+        self.path = Path(directory) / MANIFEST_NAME
+        try:
+            self.entries: Dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8"))["outputs"]
+        except (FileNotFoundError, ValueError, KeyError):
+            self.entries = {}
+
+    def is_fresh(self, output: Path, digest: str) -> bool:
+        """True when *output* exists and is the artifact built for *digest*."""
+
+        entry = self.entries.get(output.name)
+        if not entry or entry.get("digest") != digest or not output.exists():
+            return False
+        return _file_sha256(output) == entry.get("sha256")
+
+    def record(self, output: Path, digest: str) -> None:
+        self.entries[output.name] = {
+            "digest": digest,
+            "sha256": _file_sha256(output),
+            "bytes": output.stat().st_size,
+            "reportlab": reportlab.Version,
+            "built_at": time.time(),
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"outputs": self.entries}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def build_many(
+    jobs: Sequence[Tuple[Document, Path]], *, workers: int = 1, force: bool = False
+) -> List[Tuple[Path, bool]]:
+    """Render the jobs whose output is missing or stale.
+
+    Returns ``(output, rendered)`` per job, in order; ``rendered`` is False
+    when an identical artifact was already in place.
+    """
+
+    manifests: Dict[Path, BuildManifest] = {}
+    digests, stale = [], []
+    for document, output in jobs:
+        output = Path(output)
+        manifest = manifests.setdefault(output.parent.resolve(), BuildManifest(output.parent))
+        digest = document_digest(document)
+        digests.append(digest)
+        if force or not manifest.is_fresh(output, digest):
+            stale.append((document, output))
+
+    rendered = {Path(path) for path in render_many(stale, workers=workers)}
+    touched = set()
+    for (_, output), digest in zip(jobs, digests):
+        output = Path(output)
+        if output in rendered:
+            directory = output.parent.resolve()
+            manifests[directory].record(output, digest)
+            touched.add(directory)
+    for directory in touched:
+        manifests[directory].save()
+    return [(Path(output), Path(output) in rendered) for _, output in jobs]
+
+
+def build(document: Document, output: Path, *, force: bool = False) -> Tuple[Path, bool]:
+    """Cached :func:`render` of one document; see :func:`build_many`."""
+
+    return build_many([(document, output)], force=force)[0]
+
+
+def document_set(modules: Iterable[str] = DOCUMENT_MODULES) -> Dict[str, Tuple[Document, Path]]:
+    """``module -> (document, default output name)`` for the StagePort scripts."""
+
+    documents = {}
+    for name in modules:
+        module = importlib.import_module(name)
+        documents[name] = (module.build_document(), module.DEFAULT_OUTPUT)
+    return documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render the StagePort PDF document set in one process.")
+    parser.add_argument("--out-dir", type=Path, default=Path("dist"), help="Directory for the generated PDFs.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: render in this process).")
+    parser.add_argument("--force", action="store_true", help="Render even when an identical PDF exists.")
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=DOCUMENT_MODULES,
+        help="Render only these documents (repeatable).",
+    )
+    args = parser.parse_args()
+
+    documents = document_set(args.only or DOCUMENT_MODULES)
+    jobs = [(document, args.out_dir / output.name) for document, output in documents.values()]
+    for path, rendered in build_many(jobs, workers=args.workers, force=args.force):
+        print(f"{'Created' if rendered else 'Up to date'} {path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
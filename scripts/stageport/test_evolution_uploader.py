@@ -0,0 +1,223 @@
+"""Tests for the background Firestore uploader, against an in-process fake.
+
+    cd scripts/stageport && python -m pytest -q test_evolution_uploader.py
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import time
+from typing import Dict, List, Tuple
+
+import pytest
+
+import evolution_uploader
+import stageport_evolution
+from evolution_uploader import COLLECTION, EvolutionUploader
+
+
+class FakeFirestore:
+    """Stand-in for ``firestore.client()`` covering the calls the uploader
+    makes. ``offline`` makes commits fail; ``lost_acks`` commits that many
+    batches but raises anyway, as when the connection drops before the reply."""
+
+    def __init__(self, *, offline: bool = False, latency: float = 0.0, lost_acks: int = 0) -> None:
+        self.offline = offline
+        self.latency = latency
+        self.lost_acks = lost_acks
+        self.collections: Dict[str, Dict[str, dict]] = {}
+        self.written: List[str] = []  # document ids in commit order, repeats included
+        self.commits = 0
+
+    def collection(self, name: str) -> "_FakeCollection":
+        return _FakeCollection(self.collections.setdefault(name, {}))
+
+    def batch(self) -> "_FakeBatch":
+        return _FakeBatch(self)
+
+    @property
+    def documents(self) -> Dict[str, dict]:
+        return self.collections.get(COLLECTION, {})
+
+
+class _FakeCollection:
+    def __init__(self, documents: Dict[str, dict]) -> None:
+        self.documents = documents
+
+    def document(self, doc_id: str) -> Tuple[Dict[str, dict], str]:
+        return self.documents, doc_id
+
+
+class _FakeBatch:
+    def __init__(self, store: FakeFirestore) -> None:
+        self.store = store
+        self.writes: List[Tuple[Tuple[Dict[str, dict], str], dict]] = []
+
+    def set(self, ref: Tuple[Dict[str, dict], str], document: dict) -> None:
+        self.writes.append((ref, dict(document)))
+
+    def commit(self) -> None:
+        time.sleep(self.store.latency)
+        if self.store.offline:
+            raise ConnectionError("Firestore unreachable")
+        for (documents, doc_id), document in self.writes:
+            documents[doc_id] = document
+            self.store.written.append(doc_id)
+        self.store.commits += 1
+        if self.store.lost_acks:
+            self.store.lost_acks -= 1
+            raise ConnectionError("connection reset before the commit was acknowledged")
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_uploader(tmp_path):
+    uploaders = []
+
+    def make(store: FakeFirestore, **options) -> EvolutionUploader:
+        options = {"spool_dir": tmp_path / "spool", "linger": 0.01, **options}
+        uploader = EvolutionUploader(lambda: store, **options)
+        uploaders.append(uploader)
+        return uploader
+
+    yield make
+    for uploader in uploaders:
+        uploader.close(timeout=1.0)
+
+
+def test_offline_commit_spools_batch_and_backs_off(make_uploader):
+    store = FakeFirestore(offline=True)
+    uploader = make_uploader(store, linger=0.5, backoff_base=60.0)
+    ids = [uploader.submit({"n": n}) for n in range(3)]
+
+    wait_for(lambda: uploader.pending_spool())
+    (spooled,) = uploader.pending_spool()
+    lines = [json.loads(line) for line in spooled.read_text(encoding="utf-8").splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert [line["doc"] for line in lines] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert uploader._backing_off()
+    assert store.documents == {}
+
+
+def test_spool_drains_in_order_once_online(make_uploader):
+    store = FakeFirestore(offline=True)
+    uploader = make_uploader(store, backoff_base=0.05, backoff_cap=0.05)
+    first = uploader.submit({"n": 1})
+    wait_for(lambda: len(uploader.pending_spool()) == 1)
+    second = uploader.submit({"n": 2})
+    wait_for(lambda: len(uploader.pending_spool()) == 2)
+
+    store.offline = False
+    wait_for(lambda: not uploader.pending_spool())
+    assert store.written == [first, second]
+    assert list(uploader.spool_dir.glob("*.jsonl*")) == []
+
+
+def test_retried_commit_keeps_document_ids(make_uploader):
+    store = FakeFirestore(lost_acks=1)
+    uploader = make_uploader(store, linger=0.5, backoff_base=0.05, backoff_cap=0.05)
+    ids = [uploader.submit({"n": n}) for n in range(5)]
+
+    wait_for(lambda: store.commits >= 2 and not uploader.pending_spool())
+    assert store.written == ids + ids  # committed, acknowledgement lost, retried
+    assert sorted(store.documents) == sorted(ids)
+
+
+def test_close_drains_queue_within_timeout(make_uploader):
+    store = FakeFirestore(latency=0.05)
+    uploader = make_uploader(store, linger=0.2, batch_size=10)
+    ids = [uploader.submit({"n": n}) for n in range(50)]
+
+    started = time.monotonic()
+    uploader.close(timeout=5.0)
+    assert time.monotonic() - started < 5.0
+    assert not uploader._thread.is_alive()
+    assert sorted(store.documents) == sorted(ids)
+    assert uploader.pending_spool() == []
+
+
+def test_close_timeout_leaves_unsent_documents_in_spool(make_uploader):
+    slow = FakeFirestore(latency=2.0)
+    uploader = make_uploader(slow, batch_size=2)
+    ids = [uploader.submit({"n": n}) for n in range(6)]
+    wait_for(lambda: uploader.pending_spool())  # first batch in flight
+
+    uploader.close(timeout=0.5)
+    assert uploader._thread.is_alive()
+    spooled = [
+        json.loads(line)["id"]
+        for path in uploader.pending_spool()
+        for line in path.read_text(encoding="utf-8").splitlines()
+    ]
+    assert sorted(spooled) == sorted(ids)
+
+    store = FakeFirestore()
+    rerun = make_uploader(store, batch_size=2)
+    wait_for(lambda: not rerun.pending_spool())
+    assert sorted(store.documents) == sorted(ids)
+
+
+def test_submit_does_not_wait_for_firestore(make_uploader):
+    store = FakeFirestore(latency=1.0)
+    uploader = make_uploader(store)
+
+    started = time.monotonic()
+    for n in range(20):
+        uploader.submit({"n": n})
+    assert time.monotonic() - started < 0.2
+
+
+@pytest.fixture
+def slow_firebase(tmp_path, monkeypatch):
+    """Make ``commit_to_evolution`` see firebase_admin and a slow client."""
+
+    store = FakeFirestore(latency=1.0)
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: object() if name == "firebase_admin" else find_spec(name, *args),
+    )
+    monkeypatch.setattr(stageport_evolution, "_load_firebase_clients", lambda credentials_path: store)
+    monkeypatch.chdir(tmp_path)
+    credentials = str(tmp_path / "credentials.json")
+    yield store, credentials
+    for key in [key for key in evolution_uploader._UPLOADERS if key[0] == credentials]:
+        evolution_uploader._UPLOADERS.pop(key).close(timeout=2.0)
+
+
+def test_commit_to_evolution_returns_before_upload(slow_firebase, tmp_path):
+    store, credentials = slow_firebase
+    report = {"credential_level": "MASTER", "overall_score": 95.0, "dimension_scores": {}}
+
+    started = time.monotonic()
+    assert stageport_evolution.commit_to_evolution(report, "u1", credentials, spool_dir=str(tmp_path / "spool"))
+    assert time.monotonic() - started < 0.2
+    assert store.commits == 0
+
+    wait_for(lambda: store.commits == 1)
+    (document,) = store.documents.values()
+    assert document["uid"] == "u1" and document["score"] == 95.0
+
+
+def test_validate_returns_before_upload(slow_firebase):
+    store, credentials = slow_firebase
+    perfect = dict.fromkeys(stageport_evolution.evaluate_text("draft"), 100.0)
+
+    started = time.monotonic()
+    report = stageport_evolution.validate(
+        "draft", log_master=True, user_id="u2", firebase_credentials=credentials, scorer=lambda text: perfect
+    )
+    assert time.monotonic() - started < 0.2
+    assert report["credential_level"] == "MASTER"
+
+    wait_for(lambda: store.commits == 1)
+    (document,) = store.documents.values()
+    assert document["uid"] == "u2"
@@ -1,52 +1,428 @@
-"""Watch a curriculum file and stream validation reports."""
+"""Watch curricula and stream validation reports.
+
+Two modes, configured through environment variables:
+
+* single file (default) – ``STAGEPORT_TARGET`` is watched and each report is
+  printed for a human
+* directory tree – set ``STAGEPORT_WATCH_DIR`` to watch every file below it
+  that matches ``STAGEPORT_INCLUDE`` and none of ``STAGEPORT_EXCLUDE``
+  (comma-separated globs, matched against the path relative to the root and
+  against the file name). One observer covers the whole tree. Evaluations
+  run on a pool of ``STAGEPORT_WORKERS`` threads, one at a time per file
+  (a file edited while it is being scored is scored once more afterwards).
+  Reports stream as NDJSON to ``STAGEPORT_OUTPUT``: ``stdout`` (default),
+  ``unix:/path/to.sock`` or ``tcp:127.0.0.1:PORT``. For the socket forms
+  the watcher listens and every connected client (e.g. the dashboard)
+  receives each line.
+
+Editors fire several events per save (truncate, write, rename, chmod), so
+events are debounced: a file is scored ``STAGEPORT_DEBOUNCE_MS`` after the
+last event of a burst. Only events that can change content count (created,
+modified, moved, closed after a write): watchdog also reports ``opened`` and
+``closed_no_write`` for every read, including the watcher's own. Saves that
+leave the content unchanged are skipped by hash, and an
+:class:`IncrementalEvaluator` per file re-scans only the paragraphs that
+changed since its previous version.
+"""
 from __future__ import annotations
 
+import hashlib
+import heapq
+import json
 import os
+import queue
+import socket
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
-from stageport_evolution import validate
+from stageport_evolution import IncrementalEvaluator, validate
 
 TARGET_FILE = os.environ.get("STAGEPORT_TARGET", "your_curriculum.txt")
 LEDGER_PATH = os.environ.get("STAGEPORT_LEDGER")
 LOG_MASTER = os.environ.get("STAGEPORT_LOG_MASTER") == "1"
 FIREBASE_CREDENTIALS = os.environ.get("STAGEPORT_FIREBASE_CREDENTIALS")
 USER_ID = os.environ.get("STAGEPORT_USER_ID", "dev-user")
+DEBOUNCE_SECONDS = float(os.environ.get("STAGEPORT_DEBOUNCE_MS", "25")) / 1000
 
+WATCH_DIR = os.environ.get("STAGEPORT_WATCH_DIR")
+INCLUDE = os.environ.get("STAGEPORT_INCLUDE", "*.txt,*.md")
+EXCLUDE = os.environ.get("STAGEPORT_EXCLUDE", ".*,*~,*.swp,*.tmp")
+WORKERS = int(os.environ.get("STAGEPORT_WORKERS", "4"))
+OUTPUT = os.environ.get("STAGEPORT_OUTPUT", "stdout")
 
-class DanceNoteHandler(FileSystemEventHandler):
-    def on_modified(self, event):
+# Reads fire opened/closed_no_write; reacting to them would re-read forever.
+CONTENT_EVENTS = frozenset({"created", "modified", "moved", "closed"})
+
+
+class CurriculumState:
+    """Last seen content hash and cached paragraph features of one file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.evaluator = IncrementalEvaluator()
+        self.lock = threading.Lock()
+        self._last_digest: bytes | None = None
+
+    def evaluate(self) -> dict | None:
+        """Score the file unless it is gone or its content is unchanged."""
+
+        with self.lock:
+            try:
+                data = self.path.read_bytes()
+            except (FileNotFoundError, IsADirectoryError):
+                return None  # mid-rename; the next event reschedules
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            if digest == self._last_digest:
+                return None
+            self._last_digest = digest
+
+            started = time.perf_counter()
+            report = validate(
+                data.decode("utf-8", errors="replace"),
+                ledger_path=LEDGER_PATH,
+                log_master=LOG_MASTER,
+                user_id=USER_ID,
+                firebase_credentials=FIREBASE_CREDENTIALS,
+                source=str(self.path),
+                scorer=self.evaluator,
+            )
+            report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return report
+
+
+class Debouncer:
+    """Call ``callback(key)`` once, *delay* seconds after the last ``touch(key)``.
+
+    A single thread serves every key, so watching hundreds of files does not
+    mean hundreds of timers.
+    """
+
+    def __init__(self, delay: float, callback: Callable[[str], None]) -> None:
+        self.delay = delay
+        self.callback = callback
+        self._deadlines: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, name="stageport-debounce", daemon=True).start()
+
+    def touch(self, key: str) -> None:
+        deadline = time.monotonic() + self.delay
+        with self._cond:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                deadline, key = self._heap[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._cond.wait(deadline - now)
+                    continue
+                heapq.heappop(self._heap)
+                # Stale heap entries are skipped; only the latest deadline fires.
+                if self._deadlines.get(key) != deadline:
+                    continue
+                del self._deadlines[key]
+            self.callback(key)
+
+
+class SerialPool:
+    """Bounded thread pool that runs at most one job per key at a time.
+
+    Submitting a key that is already running marks it dirty instead of
+    queueing a second job; the job is rerun once when the first finishes.
+    """
+
+    def __init__(self, workers: int, job: Callable[[str], None]) -> None:
+        self.job = job
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="stageport-eval")
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        self._dirty: Set[str] = set()
+
+    def submit(self, key: str) -> None:
+        with self._lock:
+            if key in self._running:
+                self._dirty.add(key)
+                return
+            self._running.add(key)
+        self._executor.submit(self._run, key)
+
+    def _run(self, key: str) -> None:
+        while True:
+            try:
+                self.job(key)
+            except Exception as exc:  # keep the worker alive for other files
+                print(f"Evaluation of {key} failed: {exc}", file=sys.stderr)
+            with self._lock:
+                if key not in self._dirty:
+                    self._running.discard(key)
+                    return
+                self._dirty.discard(key)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class _Client:
+    """One socket client, fed from a bounded backlog by its own writer thread."""
+
+    def __init__(self, sock: socket.socket, backlog: int, send_timeout: float) -> None:
+        self.sock = sock
+        self.sock.settimeout(send_timeout)
+        self.alive = True
+        self._backlog: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=backlog)
+        threading.Thread(target=self._write, name="stageport-sink-client", daemon=True).start()
+
+    def offer(self, payload: bytes) -> bool:
+        """Queue *payload*; False if the client is gone or too far behind."""
+
+        if not self.alive:
+            return False
+        try:
+            self._backlog.put_nowait(payload)
+        except queue.Full:
+            return False
+        return True
+
+    def _write(self) -> None:
+        while self.alive:
+            payload = self._backlog.get()
+            if payload is None:
+                break
+            try:
+                self.sock.sendall(payload)
+            except OSError:  # disconnected, or stalled past the send timeout
+                break
+        self.close()
+
+    def close(self) -> None:
+        self.alive = False
+        try:
+            self._backlog.put_nowait(None)  # wake an idle writer
+        except queue.Full:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # unblocks a pending sendall
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class NdjsonSink:
+    """Write one JSON object per line to stdout or to socket clients.
+
+    Socket clients never slow down evaluation: each has a backlog of
+    *backlog* lines written by its own thread, and a client that lets the
+    backlog fill up or stalls a send for *send_timeout* seconds is dropped.
+    """
+
+    def __init__(self, target: str = "stdout", *, backlog: int = 1024, send_timeout: float = 5.0) -> None:
+        self.backlog = backlog
+        self.send_timeout = send_timeout
+        self._lock = threading.Lock()
+        self._clients: List[_Client] = []
+        self._server: socket.socket | None = None
+        if target == "stdout":
+            return
+        if target.startswith("unix:"):
+            path = target[len("unix:") :]
+            Path(path).unlink(missing_ok=True)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(path)
+        elif target.startswith("tcp:"):
+            host, _, port = target[len("tcp:") :].rpartition(":")
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((host or "127.0.0.1", int(port)))
+        else:
+            raise SystemExit(f"Unsupported STAGEPORT_OUTPUT {target!r}; use stdout, unix:PATH or tcp:HOST:PORT.")
+        self._server.listen()
+        threading.Thread(target=self._accept, name="stageport-sink", daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            client = _Client(sock, self.backlog, self.send_timeout)
+            with self._lock:
+                self._clients.append(client)
+
+    def emit(self, record: dict) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._server is None:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+                return
+            payload = line.encode("utf-8")
+            for client in list(self._clients):
+                if not client.offer(payload):
+                    self._clients.remove(client)
+                    client.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            if self._server is not None:
+                self._server.close()
+
+
+def _patterns(value: str) -> List[str]:
+    return [pattern.strip() for pattern in value.split(",") if pattern.strip()]
+
+
+class TreeHandler(FileSystemEventHandler):
+    """Watch every matching file below *root* and stream NDJSON reports."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        include: Sequence[str] = ("*.txt", "*.md"),
+        exclude: Sequence[str] = (),
+        workers: int = 4,
+        debounce: float = DEBOUNCE_SECONDS,
+        sink: Optional[NdjsonSink] = None,
+    ) -> None:
+        super().__init__()
+        self.root = Path(root).resolve()
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.sink = sink or NdjsonSink()
+        self._states: Dict[str, CurriculumState] = {}
+        self._states_lock = threading.Lock()
+        self._pool = SerialPool(workers, self._evaluate)
+        self._debouncer = Debouncer(debounce, self._pool.submit)
+
+    def matches(self, path: str | Path) -> bool:
+        path = Path(path)
+        try:
+            relative = path.resolve().relative_to(self.root).as_posix()
+        except ValueError:
+            return False
+        candidates = (relative, path.name)
+        if any(fnmatch(candidate, pattern) for pattern in self.exclude for candidate in candidates):
+            return False
+        return any(fnmatch(candidate, pattern) for pattern in self.include for candidate in candidates)
+
+    def scan(self) -> int:
+        """Queue every matching file that already exists."""
+
+        count = 0
+        for path in self.root.rglob("*"):
+            if path.is_file() and self.matches(path):
+                self._pool.submit(str(path.resolve()))
+                count += 1
+        return count
+
+    def on_any_event(self, event):
         if event.is_directory:
             return
-        if Path(event.src_path).name != TARGET_FILE:
+        if event.event_type == "deleted":
+            self._forget(event.src_path)
             return
+        if event.event_type not in CONTENT_EVENTS:
+            return
+        if event.event_type == "moved":
+            self._forget(event.src_path)
+            path = event.dest_path
+        else:
+            path = event.src_path
+        if self.matches(path):
+            self._debouncer.touch(str(Path(path).resolve()))
 
-        curriculum = Path(TARGET_FILE).read_text(encoding="utf-8")
-        report = validate(
-            curriculum,
-            ledger_path=LEDGER_PATH,
-            log_master=LOG_MASTER,
-            user_id=USER_ID,
-            firebase_credentials=FIREBASE_CREDENTIALS,
-        )
+    def _forget(self, path: str) -> None:
+        key = str(Path(path).resolve())
+        with self._states_lock:
+            known = self._states.pop(key, None)
+        if known is not None:
+            self.sink.emit({"path": key, "event": "deleted", "timestamp": time.time()})
+
+    def _evaluate(self, key: str) -> None:
+        with self._states_lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = CurriculumState(Path(key))
+        report = state.evaluate()
+        if report is not None:
+            self.sink.emit({"path": key, "event": "evaluated", **report})
+
+    def close(self) -> None:
+        self._pool.shutdown()
+        self.sink.close()
+
+
+class DanceNoteHandler(FileSystemEventHandler):
+    """Single-file mode: debounce events for *target* and print each report."""
+
+    def __init__(self, target: str = TARGET_FILE, debounce: float = DEBOUNCE_SECONDS) -> None:
+        super().__init__()
+        self.target = Path(target)
+        self.state = CurriculumState(self.target)
+        self._debouncer = Debouncer(debounce, lambda _key: self.evaluate())
+
+    def _is_target(self, path: str) -> bool:
+        return Path(path).name == self.target.name
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CONTENT_EVENTS:
+            return
+        # Atomic saves show up as a move onto the target.
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if not any(path and self._is_target(path) for path in paths):
+            return
+        self._debouncer.touch(str(self.target))
 
-        print("\n--- New Evaluation ---")
-        print(report)
+    def evaluate(self) -> dict | None:
+        """Score the target unless its content is unchanged."""
+
+        report = self.state.evaluate()
+        if report is not None:
+            print(f"\n--- New Evaluation ({report['elapsed_ms']:.1f} ms) ---")
+            print(report)
+        return report
 
 
 if __name__ == "__main__":
-    target_path = Path(TARGET_FILE)
-    print(f"Watching {target_path} for live evolution...")
-    event_handler = DanceNoteHandler()
     observer = Observer()
-    observer.schedule(event_handler, target_path.parent, recursive=False)
-    observer.start()
+    if WATCH_DIR:
+        event_handler = TreeHandler(
+            WATCH_DIR,
+            include=_patterns(INCLUDE),
+            exclude=_patterns(EXCLUDE),
+            workers=WORKERS,
+            sink=NdjsonSink(OUTPUT),
+        )
+        observer.schedule(event_handler, str(event_handler.root), recursive=True)
+        observer.start()
+        print(f"Watching {event_handler.root} ({event_handler.scan()} curricula) → {OUTPUT}", file=sys.stderr)
+    else:
+        target_path = Path(TARGET_FILE)
+        print(f"Watching {target_path} for live evolution...")
+        event_handler = DanceNoteHandler()
+        observer.schedule(event_handler, str(target_path.parent), recursive=False)
+        observer.start()
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    if isinstance(event_handler, TreeHandler):
+        event_handler.close()